@@ -1,14 +1,23 @@
 import argparse
+import json
+import os
 import time
 import unittest
 import sys
 
-from source.insert_data import insert_data
+from source.insert_data import ENCODERS, NODE_STATS, insert_data, insert_data_async, print_insert_stats
+from source.balancer import STRATEGIES, parse_weights, print_distribution
 from tests.test_sql_queries import TestSQLCommands
 from tests.test_anylog_cli import TestAnyLogCommands
 from tests.test_blockchain_policies import TestBlockchainPolicies
+from tests.test_blockchain_scale import TestBlockchainScale
 from tests.test_null_data import TestNullData
-from source.rest_call import flush_buffer
+from source.rest_call import flush_buffer, configure_pool, configure_retries, pool_stats, row_counts, rows_ready
+from source import insert_data as insert_data_module
+from source.metrics import METRICS, print_metrics
+from source.query_cache import QUERY_CACHE, configure_cache, print_cache_stats
+from source import support
+from source.test_runner import run_parallel
 
 def _list_methods(cls_name):
     list_methods = []
@@ -21,6 +30,7 @@ def _print_test_cases():
     test_cases = {
         'anylog':     _list_methods(TestAnyLogCommands),
         'blockchain': _list_methods(TestBlockchainPolicies),
+        'blockchain_scale': _list_methods(TestBlockchainScale),
         'sql':        _list_methods(TestSQLCommands),
         'null_data': _list_methods(TestNullData)
     }
@@ -54,16 +64,9 @@ def _remove_skip_decorators(testcase_cls):
     testcase_cls.__init__ = new_init
 
 
-def anylog_test(query_conn:str, operator_conn:str, db_name:str, test_name:str, ignore_skip:bool=False, verbose:int=2):
-    TestAnyLogCommands.query = query_conn
-    TestAnyLogCommands.operator = operator_conn
-    TestAnyLogCommands.db_name = db_name
-
-    if ignore_skip:
-        _remove_skip_decorators(TestAnyLogCommands)
-
+def _filter_suite(testcase_cls, test_name:str=None)->unittest.TestSuite:
     loader = unittest.TestLoader()
-    suite_all = loader.loadTestsFromTestCase(TestAnyLogCommands)
+    suite_all = loader.loadTestsFromTestCase(testcase_cls)
 
     # Determine which tests to run
     if not test_name:
@@ -72,65 +75,95 @@ def anylog_test(query_conn:str, operator_conn:str, db_name:str, test_name:str, i
         wanted = {name.strip() for name in test_name.split(",")}
 
     # Filter suite while keeping decorators like @skip
-    suite = unittest.TestSuite(
+    return unittest.TestSuite(
         test for test in suite_all
         if test._testMethodName in wanted
     )
 
+
+def _run_suite(suite:unittest.TestSuite, verbose:int=2):
     runner = unittest.TextTestRunner(verbosity=verbose)
-    result = runner.run(suite)
+    return runner.run(suite)
+
+
+def anylog_suite(query_conn:str, operator_conn:str, db_name:str, test_name:str, ignore_skip:bool=False)->unittest.TestSuite:
+    TestAnyLogCommands.query = query_conn
+    TestAnyLogCommands.operator = operator_conn
+    TestAnyLogCommands.db_name = db_name
+
+    if ignore_skip:
+        _remove_skip_decorators(TestAnyLogCommands)
+
+    return _filter_suite(TestAnyLogCommands, test_name)
+
+
+def anylog_test(query_conn:str, operator_conn:str, db_name:str, test_name:str, ignore_skip:bool=False, verbose:int=2):
+    suite = anylog_suite(query_conn=query_conn, operator_conn=operator_conn, db_name=db_name, test_name=test_name, ignore_skip=ignore_skip)
+    result = _run_suite(suite, verbose)
 
     # if not result.wasSuccessful():
     #     sys.exit(1)
 
 
-def blockchain_test(query_conn:str, is_standalone:bool=False, test_name:str=None, ignore_skip:bool=False, verbose:int=2):
+def blockchain_suite(query_conn:str, is_standalone:bool=False, test_name:str=None, ignore_skip:bool=False)->unittest.TestSuite:
     TestBlockchainPolicies.query = query_conn
     TestBlockchainPolicies.is_standalone = is_standalone
+    TestBlockchainPolicies.snapshot = None
 
     if ignore_skip:
         _remove_skip_decorators(TestBlockchainPolicies)
 
-    loader = unittest.TestLoader()
-    suite_all = loader.loadTestsFromTestCase(TestBlockchainPolicies)
+    return _filter_suite(TestBlockchainPolicies, test_name)
 
-    # Determine which tests to run
-    if not test_name:
-        wanted = {test._testMethodName for test in suite_all}
-    else:
-        wanted = {name.strip() for name in test_name.split(",")}
 
-    # Filter suite while keeping decorators like @skip
-    suite = unittest.TestSuite(
-        test for test in suite_all
-        if test._testMethodName in wanted
-    )
+def blockchain_test(query_conn:str, is_standalone:bool=False, test_name:str=None, ignore_skip:bool=False, verbose:int=2):
+    suite = blockchain_suite(query_conn=query_conn, is_standalone=is_standalone, test_name=test_name, ignore_skip=ignore_skip)
+    result = _run_suite(suite, verbose)
 
-    runner = unittest.TextTestRunner(verbosity=verbose)
-    result = runner.run(suite)
 
-def sql_test(query_conn:str, db_name:str, test_name:str=None, ignore_skip:bool=False, verbose:int=2):
+def blockchain_scale_suite(query_conn:str, master_conn:str=None, policy_count:int=1000, test_name:str=None,
+                           ignore_skip:bool=False)->unittest.TestSuite:
+    """
+    Publishes synthetic policies - only run when selected (--select-test blockchain_scale)
+    """
+    TestBlockchainScale.query = query_conn
+    TestBlockchainScale.master = master_conn
+    TestBlockchainScale.policy_count = policy_count
+    TestBlockchainScale.published = None
+
+    if ignore_skip:
+        _remove_skip_decorators(TestBlockchainScale)
+
+    return _filter_suite(TestBlockchainScale, test_name)
+
+
+def sql_suite(query_conn:str, db_name:str, test_name:str=None, ignore_skip:bool=False, query_workers:int=4,
+              write_actual:bool=False, tolerance:float=0.0, rel_tolerance:float=0.0, ignore_order:bool=False)->unittest.TestSuite:
     TestSQLCommands.conn = query_conn
     TestSQLCommands.db_name = db_name
+    TestSQLCommands.max_workers = query_workers
+    TestSQLCommands.write_actual = write_actual
+    TestSQLCommands.tolerance = tolerance
+    TestSQLCommands.rel_tolerance = rel_tolerance
+    TestSQLCommands.ignore_order = ignore_order
 
     if ignore_skip and not test_name:
         _remove_skip_decorators(TestSQLCommands)
 
-    suite = unittest.TestLoader().loadTestsFromTestCase(TestSQLCommands)
-    test_cases =  {test._testMethodName for test in suite} if not test_name else test_name
+    return _filter_suite(TestSQLCommands, test_name)
 
 
-    if not ignore_skip and not isinstance(test_cases, str):
-        suite = unittest.TestSuite(test for test in suite if test._testMethodName in test_cases)
-    elif not ignore_skip:
-        suite = unittest.TestSuite(test_cases)
-
-    runner = unittest.TextTestRunner(verbosity=verbose)
-    result = runner.run(suite)
+def sql_test(query_conn:str, db_name:str, test_name:str=None, ignore_skip:bool=False, query_workers:int=4,
+             write_actual:bool=False, tolerance:float=0.0, rel_tolerance:float=0.0, ignore_order:bool=False, verbose:int=2):
+    suite = sql_suite(query_conn=query_conn, db_name=db_name, test_name=test_name, ignore_skip=ignore_skip,
+                      query_workers=query_workers, write_actual=write_actual, tolerance=tolerance,
+                      rel_tolerance=rel_tolerance, ignore_order=ignore_order)
+    result = _run_suite(suite, verbose)
     # if not result.wasSuccessful():
     #     sys.exit(1)
 
-def null_data_test(query_conn:str, operator_conn:str, db_name:str, test_name:str, skip_insert:bool=False, ignore_skip:bool=False, verbose:int=2):
+
+def null_data_suite(query_conn:str, operator_conn:str, db_name:str, test_name:str, skip_insert:bool=False, ignore_skip:bool=False)->unittest.TestSuite:
     TestNullData.query = query_conn
     TestNullData.operator = operator_conn
     TestNullData.db_name = db_name
@@ -139,23 +172,12 @@ def null_data_test(query_conn:str, operator_conn:str, db_name:str, test_name:str
     if ignore_skip:
         _remove_skip_decorators(TestNullData)
 
-    loader = unittest.TestLoader()
-    suite_all = loader.loadTestsFromTestCase(TestNullData)
-
-    # Determine which tests to run
-    if not test_name:
-        wanted = {test._testMethodName for test in suite_all}
-    else:
-        wanted = {name.strip() for name in test_name.split(",")}
+    return _filter_suite(TestNullData, test_name)
 
-    # Filter suite while keeping decorators like @skip
-    suite = unittest.TestSuite(
-        test for test in suite_all
-        if test._testMethodName in wanted
-    )
 
-    runner = unittest.TextTestRunner(verbosity=verbose)
-    result = runner.run(suite)
+def null_data_test(query_conn:str, operator_conn:str, db_name:str, test_name:str, skip_insert:bool=False, ignore_skip:bool=False, verbose:int=2):
+    suite = null_data_suite(query_conn=query_conn, operator_conn=operator_conn, db_name=db_name, test_name=test_name, skip_insert=skip_insert, ignore_skip=ignore_skip)
+    result = _run_suite(suite, verbose)
 
 
 def main():
@@ -167,56 +189,147 @@ def main():
     :options:
         -h, --help            show this help message and exit
         --sort-timestamps   [SORT_TIMESTAMPS]   Insert values in chronological order
+        --sort-run-size     SORT_RUN_SIZE       Sort using on-disk runs of N rows (for files that do not fit in memory)
         --batch             [BATCH]             Insert a single data batch
+        --batch-size        BATCH_SIZE          Number of rows per PUT request
+        --batch-bytes       BATCH_BYTES         Max payload size (in bytes) per PUT request
         --skip-insert       [SKIP_INSERT]       Skip data insertion
         --skip-test         [SKIP_TEST]         Skip running unit tests
         --verbose           VERBOSE             Test verbosity level (0, 1, 2)
         --select-test       SELECT_TEST         (comma separated) specific test(s) to run
+        --master            MASTER              Master node IP:port the blockchain_scale tests publish policies to
+        --policy-count      POLICY_COUNT        Synthetic policies published by the blockchain_scale tests
+        --workers           WORKERS             Number of tests to run concurrently (default: 1 - one at a time)
+        --query-workers     QUERY_WORKERS       Concurrent queries per increments / period sweep in sql tests
+        --write-actual      [WRITE_ACTUAL]      Write every sql test result into actual/ (by default only results that differ from expect/)
+        --tolerance         TOLERANCE           Max absolute difference between numbers in sql table results (ex. 0.001)
+        --rel-tolerance     REL_TOLERANCE       Max relative difference between numbers in sql table results
+        --ignore-order      [IGNORE_ORDER]      Compare sql table results as a set of rows (row order is not checked)
+        --pool-size         POOL_SIZE           Max keep-alive connections per node
+        --connect-timeout   CONNECT_TIMEOUT     Seconds to wait for a connection to open
+        --read-timeout      READ_TIMEOUT        Seconds to wait for a response
+        --pool-stats        [POOL_STATS]        Print connection pool hit/miss counts per node
+        --flush-timeout     FLUSH_TIMEOUT       Max seconds to wait for inserted data to become visible
+        --async             [ASYNC]             Insert data using asyncio (requires aiohttp)
+        --max-inflight      MAX_INFLIGHT        Max concurrent PUT requests per operator when using --async
+        --retries           RETRIES             Retries per request (GET on connection errors, timeouts and 5xx; PUT / POST only when the node cannot be reached)
+        --breaker-threshold BREAKER_THRESHOLD   Consecutive failures before a node is taken out of rotation
+        --breaker-reset     BREAKER_RESET       Seconds before a node taken out of rotation is tried again
+        --failover-timeout  FAILOVER_TIMEOUT    Max seconds an insert waits for a reachable operator
+        --balancer          BALANCER            How the operator for each PUT is chosen (random, round-robin, weighted, least-outstanding, latency)
+        --weights           WEIGHTS             Operator weights for --balancer weighted (conn=weight,...)
+        --encoder           {json,orjson,auto}  JSON library used to decode / encode rows (auto - orjson when installed)
+        --encode-workers    ENCODE_WORKERS      Decode / encode rows in N processes (0 - in the insert threads)
+        --passthrough       [PASSTHROUGH]       Send the raw (memory-mapped) data file lines without decoding / re-encoding them
+        --data-dir          DATA_DIR            Directory with the JSON data files to insert (default: data/ - the sql tests expect those files)
+        --data-cache        [DATA_CACHE]        Sort inserts using the columnar data cache (~/.cache/anylog-unit-testing/data or under $XDG_CACHE_HOME) instead of decoding every row
+        --cache             [CACHE]             Serve repeated sql queries from the on-disk query cache (.cache/queries) and print its hit rate
+        --cache-size        CACHE_SIZE          Query cache size cap in MB (least recently used replies are evicted)
+        --metrics           [METRICS]           Print request latency / byte / error / retry metrics per node and command
+        --metrics-dir       METRICS_DIR         Store metrics as metrics.json and metrics.prom (Prometheus text format)
     """
     parse = argparse.ArgumentParser(formatter_class=argparse.RawDescriptionHelpFormatter, epilog=f"\nList of Tests {_print_test_cases()}")
     parse.add_argument('--query',           required=False, type=str,                         default=None, help="Query node IP:port")
     parse.add_argument('--operator',        required=False, type=str,                         default=None, help="Comma-separated operator node IPs")
     parse.add_argument('--db-name',         required=False, type=str,                         default=None, help="Logical database name")
     parse.add_argument('--sort-timestamps', required=False, type=bool, nargs='?', const=True, default=False, help='Insert values in chronological order')
+    parse.add_argument('--sort-run-size',   required=False, type=int,                         default=None,  help='Sort using on-disk runs of N rows (for files that do not fit in memory)')
     parse.add_argument('--batch',           required=False, type=bool, nargs='?', const=True, default=False, help='Insert a single data batch')
+    parse.add_argument('--batch-size',      required=False, type=int,                         default=None,  help='Number of rows per PUT request')
+    parse.add_argument('--batch-bytes',     required=False, type=int,                         default=None,  help='Max payload size (in bytes) per PUT request')
     parse.add_argument('--skip-insert',     required=False, type=bool, nargs='?', const=True, default=False, help="Skip data insertion")
     parse.add_argument('--skip-test',       required=False, type=bool, nargs='?', const=True, default=False, help="Skip running unit tests")
     parse.add_argument('--verbose',         required=False, type=int,                         default=2,     help="Test verbosity level (0, 1, 2)")
     parse.add_argument('--select-test',     required=False, type=str,                         default=None, help="(comma separated) specific test(s) to run")
+    parse.add_argument('--workers',         required=False, type=int,                         default=1,     help="Number of tests to run concurrently (default: 1 - one at a time)")
+    parse.add_argument('--query-workers',   required=False, type=int,                         default=4,     help="Concurrent queries per increments / period sweep in sql tests")
+    parse.add_argument('--write-actual',    required=False, type=bool, nargs='?', const=True, default=False, help="Write every sql test result into actual/ (by default only results that differ from expect/)")
+    parse.add_argument('--tolerance',       required=False, type=float,                       default=0.0,   help="Max absolute difference between numbers in sql table results (ex. 0.001)")
+    parse.add_argument('--rel-tolerance',   required=False, type=float,                       default=0.0,   help="Max relative difference between numbers in sql table results")
+    parse.add_argument('--ignore-order',    required=False, type=bool, nargs='?', const=True, default=False, help="Compare sql table results as a set of rows (row order is not checked)")
     parse.add_argument('--ignore-skip',     required=False, type=bool, nargs='?', const=True, default=False, help='run all tests, ignoring @unittest.skip cmd')
+    parse.add_argument('--master',          required=False, type=str,                         default=None,  help="Master node IP:port the blockchain_scale tests publish policies to")
+    parse.add_argument('--policy-count',    required=False, type=int,                         default=1000,  help="Synthetic policies published by the blockchain_scale tests")
     parse.add_argument('--is-standalone',   required=False, type=bool, nargs='?', const=True, default=False, help="Node is a standalone instance (master, operator and query in 1 container")
+    parse.add_argument('--pool-size',       required=False, type=int,                         default=10,    help="Max keep-alive connections per node")
+    parse.add_argument('--connect-timeout', required=False, type=float,                       default=10,    help="Seconds to wait for a connection to open")
+    parse.add_argument('--read-timeout',    required=False, type=float,                       default=120,   help="Seconds to wait for a response")
+    parse.add_argument('--pool-stats',      required=False, type=bool, nargs='?', const=True, default=False, help="Print connection pool hit/miss counts per node")
+    parse.add_argument('--flush-timeout',   required=False, type=float,                       default=30,    help="Max seconds to wait for inserted data to become visible")
+    parse.add_argument('--async',           required=False, type=bool, nargs='?', const=True, default=False, dest='async_insert', help="Insert data using asyncio (requires aiohttp)")
+    parse.add_argument('--max-inflight',    required=False, type=int,                         default=10,    help="Max concurrent PUT requests per operator when using --async")
+    parse.add_argument('--retries',         required=False, type=int,                         default=2,     help="Retries per request (GET on connection errors, timeouts and 5xx; PUT / POST only when the node cannot be reached)")
+    parse.add_argument('--breaker-threshold', required=False, type=int,                       default=5,     help="Consecutive failures before a node is taken out of rotation")
+    parse.add_argument('--breaker-reset',   required=False, type=float,                       default=10,    help="Seconds before a node taken out of rotation is tried again")
+    parse.add_argument('--failover-timeout', required=False, type=float,                      default=60,    help="Max seconds an insert waits for a reachable operator")
+    parse.add_argument('--balancer',        required=False, type=str, choices=STRATEGIES,     default='random', help="How the operator for each PUT is chosen")
+    parse.add_argument('--weights',         required=False, type=str,                         default=None,  help="Operator weights for --balancer weighted (conn=weight,...)")
+    parse.add_argument('--encoder',         required=False, type=str, choices=ENCODERS,       default='json', help="JSON library used to decode / encode rows (auto - orjson when installed)")
+    parse.add_argument('--encode-workers',  required=False, type=int,                         default=0,     help="Decode / encode rows in N processes (0 - in the insert threads)")
+    parse.add_argument('--passthrough',     required=False, type=bool, nargs='?', const=True, default=False, help="Send the raw (memory-mapped) data file lines without decoding / re-encoding them")
+    parse.add_argument('--data-dir',        required=False, type=str,                         default=None,  help="Directory with the JSON data files to insert (default: data/ - the sql tests expect those files)")
+    parse.add_argument('--data-cache',      required=False, type=bool, nargs='?', const=True, default=False, help="Sort inserts using the columnar data cache (~/.cache/anylog-unit-testing/data or under $XDG_CACHE_HOME) instead of decoding every row")
+    parse.add_argument('--cache',           required=False, type=bool, nargs='?', const=True, default=False, help="Serve repeated sql queries from the on-disk query cache (.cache/queries) and print its hit rate")
+    parse.add_argument('--cache-size',      required=False, type=int,                         default=256,   help="Query cache size cap in MB (least recently used replies are evicted)")
+    parse.add_argument('--metrics',         required=False, type=bool, nargs='?', const=True, default=False, help="Print request latency / byte / error / retry metrics per node and command")
+    parse.add_argument('--metrics-dir',     required=False, type=str,                         default=None,  help="Store metrics as metrics.json and metrics.prom (Prometheus text format)")
     args = parse.parse_args()
 
+    configure_pool(pool_size=args.pool_size, connect_timeout=args.connect_timeout, read_timeout=args.read_timeout)
+    configure_retries(retries=args.retries, breaker_threshold=args.breaker_threshold, breaker_reset=args.breaker_reset)
+    insert_data_module.FAILOVER_TIMEOUT = args.failover_timeout
+    configure_cache(enabled=args.cache, max_bytes=args.cache_size * 1024 * 1024)
+
     args.operator = args.operator.split(",")
+    weights = parse_weights(args.weights) if args.weights else None
     # insert data
     if not args.skip_insert:
         print("Inserting Data")
         sys.stdout.flush()
+        baseline = None
+        if args.query and args.db_name:  # rows already in the tables (re-run into an existing database)
+            baseline = row_counts(conn=args.query, db_name=args.db_name,
+                                  tables=insert_data_module.data_tables(args.db_name, data_dir=args.data_dir))
         time.sleep(0.5)
-        insert_data(conns=args.operator, db_name=args.db_name, sort_timestamps=args.sort_timestamps)
-        flush_buffer(conn=args.operator)
+        if args.async_insert:
+            insert_stats = insert_data_async(conns=args.operator, db_name=args.db_name, sort_timestamps=args.sort_timestamps,
+                                             batch=args.batch, batch_size=args.batch_size, batch_bytes=args.batch_bytes,
+                                             sort_run_size=args.sort_run_size, max_inflight=args.max_inflight,
+                                             balancer=args.balancer, weights=weights, encoder=args.encoder,
+                                             encode_workers=args.encode_workers, passthrough=args.passthrough,
+                                             cache=args.data_cache, data_dir=args.data_dir)
+        else:
+            insert_stats = insert_data(conns=args.operator, db_name=args.db_name, sort_timestamps=args.sort_timestamps,
+                                       batch=args.batch, batch_size=args.batch_size, batch_bytes=args.batch_bytes,
+                                       sort_run_size=args.sort_run_size, balancer=args.balancer, weights=weights,
+                                       encoder=args.encoder, encode_workers=args.encode_workers,
+                                       passthrough=args.passthrough, cache=args.data_cache, data_dir=args.data_dir)
+        print_insert_stats(insert_stats)
+        if len(args.operator) > 1:
+            print("Rows per operator")
+            print_distribution(dict(NODE_STATS))
+
+        ready = None
+        if args.query and args.db_name:  # wait until query node sees all inserted rows
+            ready = rows_ready(conn=args.query, db_name=args.db_name, baseline=baseline,
+                               expected={table: stats['rows'] for table, stats in insert_stats.items()})
+        if not flush_buffer(conn=args.operator, ready=ready, timeout=args.flush_timeout):
+            print(f"Warning: inserted data not visible on {args.query} after {args.flush_timeout} seconds")
 
     # run query test
     if not args.skip_test:
-        # run tests:
+        # collect (title, suite) for the tests to run
+        suites = []
         if not args.select_test:
-            print("Testing related to Node status and configuration")
-            sys.stdout.flush()
-            time.sleep(0.5)
-            anylog_test(query_conn=args.query, operator_conn=args.operator, db_name=args.db_name, test_name=args.select_test, ignore_skip=args.ignore_skip, verbose=args.verbose)
-            print("Testing related to blockchain policy params and relationships")
-            sys.stdout.flush()
-            time.sleep(0.5)
-            blockchain_test(query_conn=args.query, is_standalone=args.is_standalone, test_name=args.select_test, ignore_skip=args.ignore_skip, verbose=args.verbose)
-            print("Testing related to (basic) data queries")
-            sys.stdout.flush()
-            time.sleep(0.5)
-            sql_test(query_conn=args.query, db_name=args.db_name, test_name=args.select_test, ignore_skip=args.ignore_skip, verbose=args.verbose)
-            print("Testing Null or empty column values in data")
-            sys.stdout.flush()
-            time.sleep(0.5)
-            # null_data_test()
-
+            suites.append(("Testing related to Node status and configuration",
+                           anylog_suite(query_conn=args.query, operator_conn=args.operator, db_name=args.db_name, test_name=args.select_test, ignore_skip=args.ignore_skip)))
+            suites.append(("Testing related to blockchain policy params and relationships",
+                           blockchain_suite(query_conn=args.query, is_standalone=args.is_standalone, test_name=args.select_test, ignore_skip=args.ignore_skip)))
+            suites.append(("Testing related to (basic) data queries",
+                           sql_suite(query_conn=args.query, db_name=args.db_name, test_name=args.select_test, ignore_skip=args.ignore_skip, query_workers=args.query_workers,
+                                     write_actual=args.write_actual, tolerance=args.tolerance, rel_tolerance=args.rel_tolerance,
+                                     ignore_order=args.ignore_order)))
+            # suites.append(("Testing Null or empty column values in data", null_data_suite()))
         else:
             for test_case in args.select_test.strip().split(","):
                 test_name = None
@@ -224,17 +337,48 @@ def main():
                     test_case, test_name = test_case.split(".")
 
                 if test_case == 'anylog':
-                    print("Testing related to Node status and configuration")
-                    sys.stdout.flush()
-                    anylog_test(query_conn=args.query, operator_conn=args.operator, db_name=args.db_name, test_name=test_name, ignore_skip=args.ignore_skip,  verbose=args.verbose)
+                    suites.append(("Testing related to Node status and configuration",
+                                   anylog_suite(query_conn=args.query, operator_conn=args.operator, db_name=args.db_name, test_name=test_name, ignore_skip=args.ignore_skip)))
                 if test_case == 'blockchain':
-                    print("Testing related to blockchain policy params and relationships")
-                    sys.stdout.flush()
-                    blockchain_test(query_conn=args.query, is_standalone=args.is_standalone, test_name=test_name, ignore_skip=args.ignore_skip, verbose=args.verbose)
+                    suites.append(("Testing related to blockchain policy params and relationships",
+                                   blockchain_suite(query_conn=args.query, is_standalone=args.is_standalone, test_name=test_name, ignore_skip=args.ignore_skip)))
+                if test_case == 'blockchain_scale':
+                    suites.append(("Testing blockchain policies at scale (publishes synthetic policies)",
+                                   blockchain_scale_suite(query_conn=args.query, master_conn=args.master, policy_count=args.policy_count,
+                                                          test_name=test_name, ignore_skip=args.ignore_skip)))
                 if test_case == "sql":
-                    print("Testing related to (basic) data queries")
-                    sys.stdout.flush()
-                    sql_test(query_conn=args.query, db_name=args.db_name, test_name=test_name, ignore_skip=args.ignore_skip, verbose=args.verbose)
+                    suites.append(("Testing related to (basic) data queries",
+                                   sql_suite(query_conn=args.query, db_name=args.db_name, test_name=test_name, ignore_skip=args.ignore_skip, query_workers=args.query_workers,
+                                             write_actual=args.write_actual, tolerance=args.tolerance, rel_tolerance=args.rel_tolerance,
+                                             ignore_order=args.ignore_order)))
+
+        if args.workers > 1:
+            print(f"Running {sum(suite.countTestCases() for _, suite in suites)} tests with {args.workers} workers")
+            sys.stdout.flush()
+            run_parallel(unittest.TestSuite(suite for _, suite in suites), workers=args.workers, verbosity=args.verbose)
+        else:
+            for title, suite in suites:
+                print(title)
+                sys.stdout.flush()
+                time.sleep(0.5)
+                _run_suite(suite, args.verbose)
+
+    if args.pool_stats:
+        print("Connection pool stats")
+        for conn, stats in pool_stats().items():
+            print(f"  - {conn}: requests={stats['requests']} hits={stats['hits']} misses={stats['misses']}")
+
+    if args.cache:
+        print("Query cache")
+        print_cache_stats(QUERY_CACHE.to_dict())
+
+    if args.metrics:
+        print("Request metrics")
+        print_metrics(METRICS.to_dict())
+    if args.metrics_dir:
+        support.create_dir(args.metrics_dir)
+        support.write_file(os.path.join(args.metrics_dir, 'metrics.json'), json.dumps(METRICS.to_dict(), indent=2))
+        support.write_file(os.path.join(args.metrics_dir, 'metrics.prom'), METRICS.to_prometheus())
 
 
 
@@ -0,0 +1,185 @@
+"""
+Ingest throughput benchmark - inserts the data/*.json files through `source.insert_data` for every combination of
+batch size, concurrency, sorted / unsorted rows and number of operators, and stores rows/sec, bytes/sec and
+p50 / p95 / p99 PUT latency per run into a JSON file (compare files across AnyLog / EdgeLake releases).
+
+:matrix:
+    --batch-sizes       rows per PUT, 0 = one JSON object per PUT (row mode)
+    --concurrency       1 = threaded insert (one sequential sender per file), N > 1 = asyncio insert with up to N
+                        PUTs in flight per operator (requires aiohttp)
+    --sort              sorted, unsorted or both
+    --operator-counts   use the first N operators from --operator
+
+:sample:
+    python3 -m benchmarks.ingest_benchmark --operator 10.0.0.1:32149,10.0.0.2:32149 --db-name bench \
+        --batch-sizes 0,100,1000 --concurrency 1,8 --operator-counts 1,2
+
+Every run inserts the full data set, so the benchmark database grows with the number of runs.
+"""
+import argparse
+import datetime
+import json
+import os
+import sys
+import time
+
+ROOT_DIR = os.path.dirname(os.path.abspath(__file__)).rsplit('benchmarks', 1)[0]
+sys.path.insert(0, ROOT_DIR)
+
+from source.balancer import STRATEGIES
+from source.insert_data import ENCODERS, NODE_STATS, insert_data, insert_data_async
+from source.rest_call import configure_pool, flush_buffer, get_data
+from source import support
+
+RESULTS_DIR = os.path.join(ROOT_DIR, 'benchmarks', 'results')
+
+
+def _int_list(value:str)->list:
+    return [int(item) for item in value.split(',') if item.strip()]
+
+
+def node_version(conn:str)->str:
+    try:
+        return get_data(conn=conn, query='get version', destination=None).text.strip()
+    except Exception:
+        return None
+
+
+def run_ingest(operators:list, db_name:str, batch_size:int, concurrency:int, sort_timestamps:bool, balancer:str='random',
+               encoder:str='json', encode_workers:int=0, passthrough:bool=False, cache:bool=False,
+               data_dir:str=None)->dict:
+    """
+    Insert the data set once
+    :return:
+        run summary - rows, bytes, wall-clock seconds, rows/sec, bytes/sec, PUT latency percentiles (ms) and rows per
+        operator
+    """
+    params = {'conns': operators, 'db_name': db_name, 'sort_timestamps': sort_timestamps, 'batch_size': batch_size or None,
+              'balancer': balancer, 'encoder': encoder, 'encode_workers': encode_workers,
+              'passthrough': passthrough, 'cache': cache, 'data_dir': data_dir}
+    start = time.perf_counter()
+    if concurrency > 1:
+        stats = insert_data_async(max_inflight=concurrency, **params)
+    else:
+        stats = insert_data(**params)
+    seconds = time.perf_counter() - start
+
+    flush_start = time.perf_counter()
+    flush_buffer(conn=operators, sleep_time=0)
+    flush_seconds = time.perf_counter() - flush_start
+
+    rows = sum(table_stats['rows'] for table_stats in stats.values())
+    payload_bytes = sum(table_stats['bytes'] for table_stats in stats.values())
+    latencies = [latency for table_stats in stats.values() for latency in table_stats['latencies']]
+    return {
+        'batch_size': batch_size,
+        'concurrency': concurrency,
+        'sorted': sort_timestamps,
+        'operators': len(operators),
+        'balancer': balancer,
+        'encoder': encoder,
+        'encode_workers': encode_workers,
+        'passthrough': passthrough,
+        'cache': cache,
+        'rows': rows,
+        'requests': len(latencies),
+        'bytes': payload_bytes,
+        'seconds': seconds,
+        'flush_seconds': flush_seconds,
+        'rows_sec': rows / seconds if seconds else 0.0,
+        'bytes_sec': payload_bytes / seconds if seconds else 0.0,
+        'latency_ms': {f"p{percent}": support.percentile(latencies, percent) * 1000 for percent in (50, 95, 99)},
+        'nodes': dict(NODE_STATS),
+        'tables': {table: {key: value for key, value in table_stats.items() if key != 'latencies'} for table, table_stats in stats.items()}
+    }
+
+
+def main():
+    """
+    :required options:
+        --operator          OPERATOR            Comma-separated operator node IPs
+        --db-name           DB_NAME             Logical database name
+    :options:
+        -h, --help          show this help message and exit
+        --batch-sizes       BATCH_SIZES         Comma-separated rows per PUT (0 = one row per PUT)
+        --concurrency       CONCURRENCY         Comma-separated in-flight PUTs per operator (1 = threaded insert)
+        --sort              {sorted,unsorted,both}  Insert rows in chronological and / or file order
+        --operator-counts   OPERATOR_COUNTS     Comma-separated number of operators to use (default: all)
+        --balancers         BALANCERS           Comma-separated operator balancing strategies
+        --encoder           {json,orjson,auto}  JSON library used to decode / encode rows
+        --encode-workers    ENCODE_WORKERS      Decode / encode rows in N processes (0 - in the insert threads)
+        --passthrough       [PASSTHROUGH]       Send raw data file lines without decoding them (sorted runs require --data-cache)
+        --data-dir          DATA_DIR            Directory with the JSON data files (ex. generated by data/get_data.py)
+        --data-cache        [DATA_CACHE]        Sort using the columnar data cache instead of decoding every row
+        --repeat            REPEAT              Number of runs per combination
+        --pool-size         POOL_SIZE           Max keep-alive connections per node
+        --output            OUTPUT              JSON results file (default: benchmarks/results/ingest.[timestamp].json)
+    """
+    parse = argparse.ArgumentParser()
+    parse.add_argument('--operator',        required=True,  type=str,                         help="Comma-separated operator node IPs")
+    parse.add_argument('--db-name',         required=True,  type=str,                         help="Logical database name")
+    parse.add_argument('--batch-sizes',     required=False, type=_int_list, default=[0, 100, 1000], help="Comma-separated rows per PUT (0 = one row per PUT)")
+    parse.add_argument('--concurrency',     required=False, type=_int_list, default=[1, 8],   help="Comma-separated in-flight PUTs per operator (1 = threaded insert)")
+    parse.add_argument('--sort',            required=False, type=str, choices=['sorted', 'unsorted', 'both'], default='both', help="Insert rows in chronological and / or file order")
+    parse.add_argument('--operator-counts', required=False, type=_int_list, default=None,     help="Comma-separated number of operators to use (default: all)")
+    parse.add_argument('--balancers',       required=False, type=str,       default='random', help="Comma-separated operator balancing strategies")
+    parse.add_argument('--encoder',         required=False, type=str, choices=ENCODERS, default='json', help="JSON library used to decode / encode rows")
+    parse.add_argument('--encode-workers',  required=False, type=int,       default=0,        help="Decode / encode rows in N processes (0 - in the insert threads)")
+    parse.add_argument('--passthrough',     required=False, type=bool, nargs='?', const=True, default=False, help="Send raw data file lines without decoding them (sorted runs require --data-cache)")
+    parse.add_argument('--data-dir',        required=False, type=str,       default=None,     help="Directory with the JSON data files (ex. generated by data/get_data.py)")
+    parse.add_argument('--data-cache',      required=False, type=bool, nargs='?', const=True, default=False, help="Sort using the columnar data cache instead of decoding every row")
+    parse.add_argument('--repeat',          required=False, type=int,       default=1,        help="Number of runs per combination")
+    parse.add_argument('--pool-size',       required=False, type=int,       default=10,       help="Max keep-alive connections per node")
+    parse.add_argument('--output',          required=False, type=str,       default=None,     help="JSON results file (default: benchmarks/results/ingest.[timestamp].json)")
+    args = parse.parse_args()
+
+    operators = args.operator.split(',')
+    operator_counts = args.operator_counts or [len(operators)]
+    for count in operator_counts:
+        if not 1 <= count <= len(operators):
+            parse.error(f"Invalid operator count {count} (1 - {len(operators)} operators provided)")
+    balancers = args.balancers.split(',')
+    for balancer in balancers:
+        if balancer not in STRATEGIES:
+            parse.error(f"Invalid balancer {balancer} (options: {', '.join(STRATEGIES)})")
+    sort_options = {'sorted': [True], 'unsorted': [False], 'both': [False, True]}[args.sort]
+    configure_pool(pool_size=max([args.pool_size] + args.concurrency))
+
+    started = datetime.datetime.now(datetime.timezone.utc)
+    results = {
+        'benchmark': 'ingest',
+        'started': started.isoformat(),
+        'db_name': args.db_name,
+        'node_version': node_version(operators[0]),
+        'runs': []
+    }
+
+    for count in operator_counts:
+        for batch_size in args.batch_sizes:
+            for concurrency in args.concurrency:
+                for sort_timestamps in sort_options:
+                    for balancer in balancers:
+                        for _ in range(args.repeat):
+                            run = run_ingest(operators=operators[:count], db_name=args.db_name, batch_size=batch_size,
+                                             concurrency=concurrency, sort_timestamps=sort_timestamps, balancer=balancer,
+                                             encoder=args.encoder, encode_workers=args.encode_workers,
+                                             passthrough=args.passthrough and (args.data_cache or not sort_timestamps),
+                                             cache=args.data_cache, data_dir=args.data_dir)
+                            results['runs'].append(run)
+                            shares = ' / '.join(f"{node['share'] * 100:.0f}%" for node in run['nodes'].values())
+                            print(f"operators={count} batch_size={batch_size or 'row'} concurrency={concurrency} "
+                                  f"sorted={sort_timestamps} balancer={balancer}: {run['rows_sec']:.1f} rows/sec, "
+                                  f"{run['bytes_sec'] / 1024:.1f} KB/sec, PUT p50 / p95 / p99 "
+                                  f"{run['latency_ms']['p50']:.1f} / {run['latency_ms']['p95']:.1f} / {run['latency_ms']['p99']:.1f} ms, "
+                                  f"rows per operator {shares}")
+
+    output = args.output
+    if not output:
+        support.create_dir(RESULTS_DIR)
+        output = os.path.join(RESULTS_DIR, f"ingest.{started.strftime('%Y%m%dT%H%M%SZ')}.json")
+    support.write_file(output, json.dumps(results, indent=2))
+    print(f"Results stored in {output}")
+
+
+if __name__ == '__main__':
+    main()
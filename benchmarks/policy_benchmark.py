@@ -0,0 +1,129 @@
+"""
+Blockchain metadata scaling benchmark - grows the ledger with synthetic policies (source.policy_load) in steps and, at
+each step, measures `blockchain get` latency on the query node and how long a newly published policy takes to become
+visible there. The result is a scaling curve: policies on the ledger -> latency.
+
+:sample:
+    # stand-in (policies visible after a simulated 0.5 second sync)
+    python3 -m source.standin_server --port 32149 --sync-delay 0.5
+    python3 -m benchmarks.policy_benchmark --query 127.0.0.1:32149 --steps 1000,5000,10000,50000
+
+    # local master + query node
+    python3 -m benchmarks.policy_benchmark --query 10.0.0.3:32349 --publisher 10.0.0.1:32049 --master 10.0.0.1:32048 \
+        --steps 1000,10000
+
+--steps are ledger sizes to reach (policies of this run), not increments. The policies stay on the ledger - use a
+local / test master.
+"""
+import argparse
+import datetime
+import json
+import os
+import sys
+
+ROOT_DIR = os.path.dirname(os.path.abspath(__file__)).rsplit('benchmarks', 1)[0]
+sys.path.insert(0, ROOT_DIR)
+
+from benchmarks.ingest_benchmark import RESULTS_DIR, _int_list, node_version
+from source import policy_load
+from source import support
+
+
+def run_step(query:str, publisher:str, master:str, run_id:str, policies:list, expected:int, iterations:int,
+             sync_samples:int, workers:int, timeout:float)->dict:
+    """
+    Publish a step's policies, wait until the query node has all `expected` policies of the run and measure
+    """
+    published = policy_load.publish_policies(publisher, policies, master=master, workers=workers)
+    visible = policy_load.wait_for_count(query, expected, where=f"company={policy_load.company(run_id)}", timeout=timeout)
+    return {
+        'published': published,
+        'visible_seconds': visible,
+        'ledger_policies': policy_load.policy_count(query),
+        'gets': policy_load.measure_gets(query, policy_load.get_commands(policies), iterations=iterations),
+        'sync': policy_load.sync_latency(publisher, query, run_id, samples=sync_samples, master=master, timeout=timeout)
+    }
+
+
+def print_curve(steps:list):
+    names = list(steps[0]['gets']) if steps else []
+    print(f"{'policies':>9} {'publish/s':>10} " + ' '.join(f"{name + ' p50 ms':>22}" for name in names)
+          + f" {'sync p50 ms':>12} {'sync p95 ms':>12}")
+    for step in steps:
+        print(f"{step['ledger_policies']:>9} {step['published']['policies_sec']:>10.0f} "
+              + ' '.join(f"{step['gets'][name]['p50_ms']:>22.2f}" for name in names)
+              + f" {step['sync']['p50'] * 1000:>12.1f} {step['sync']['p95'] * 1000:>12.1f}")
+
+
+def main():
+    """
+    :required options:
+        --query             QUERY               Query node IP:port
+    :options:
+        -h, --help          show this help message and exit
+        --publisher         PUBLISHER           Node the policies are sent to (default: query node)
+        --master            MASTER              Master node IP:port for `blockchain insert` (default: publisher's local ledger)
+        --steps             STEPS               Comma separated policy counts (of this run) to measure at
+        --iterations        ITERATIONS          Measured runs per `blockchain get` command per step
+        --sync-samples      SYNC_SAMPLES        Policies published one at a time to measure sync latency per step
+        --workers           WORKERS             Concurrent publish requests
+        --timeout           TIMEOUT             Max seconds for published policies to become visible
+        --output            OUTPUT              JSON results file (default: benchmarks/results/policy.[timestamp].json)
+    """
+    parse = argparse.ArgumentParser()
+    parse.add_argument('--query',        required=True,  type=str,                                  help="Query node IP:port")
+    parse.add_argument('--publisher',    required=False, type=str,      default=None,               help="Node the policies are sent to (default: query node)")
+    parse.add_argument('--master',       required=False, type=str,      default=None,               help="Master node IP:port for `blockchain insert` (default: publisher's local ledger)")
+    parse.add_argument('--steps',        required=False, type=_int_list, default=[100, 1000, 5000], help="Comma separated policy counts (of this run) to measure at")
+    parse.add_argument('--iterations',   required=False, type=int,      default=10,                 help="Measured runs per `blockchain get` command per step")
+    parse.add_argument('--sync-samples', required=False, type=int,      default=5,                  help="Policies published one at a time to measure sync latency per step")
+    parse.add_argument('--workers',      required=False, type=int,      default=policy_load.PUBLISH_WORKERS, help="Concurrent publish requests")
+    parse.add_argument('--timeout',      required=False, type=float,    default=policy_load.SYNC_TIMEOUT, help="Max seconds for published policies to become visible")
+    parse.add_argument('--output',       required=False, type=str,      default=None,               help="JSON results file (default: benchmarks/results/policy.[timestamp].json)")
+    args = parse.parse_args()
+
+    if args.iterations < 1:
+        parse.error(f"Invalid number of iterations {args.iterations}")
+    publisher = args.publisher or args.query
+    run_id = policy_load.new_run_id()
+
+    started = datetime.datetime.now(datetime.timezone.utc)
+    results = {
+        'benchmark': 'policy',
+        'started': started.isoformat(),
+        'run_id': run_id,
+        'node_version': node_version(args.query),
+        'initial_policies': policy_load.policy_count(args.query),
+        'steps': []
+    }
+
+    start = 0
+    expected = 0    # policies of this run published so far (including sync markers)
+    for target in sorted(args.steps):
+        if target <= expected:
+            continue
+        policies, start = policy_load.synthetic_policies(target - expected, run_id, start=start)
+        expected += len(policies)
+        step = run_step(query=args.query, publisher=publisher, master=args.master, run_id=run_id, policies=policies,
+                        expected=expected, iterations=args.iterations, sync_samples=args.sync_samples,
+                        workers=args.workers, timeout=args.timeout)
+        expected += args.sync_samples - step['sync']['timeouts']
+        step['target'] = target
+        results['steps'].append(step)
+        print(f"  - {step['ledger_policies']} policies: published {len(policies)} in {step['published']['seconds']:.2f} seconds "
+              f"({step['published']['errors']} errors), visible after "
+              + (f"{step['visible_seconds']:.2f} seconds" if step['visible_seconds'] is not None else f"> {args.timeout} seconds"))
+        sys.stdout.flush()
+
+    print_curve(results['steps'])
+
+    output = args.output
+    if not output:
+        support.create_dir(RESULTS_DIR)
+        output = os.path.join(RESULTS_DIR, f"policy.{started.strftime('%Y%m%dT%H%M%SZ')}.json")
+    support.write_file(output, json.dumps(results, indent=2))
+    print(f"Results stored in {output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,181 @@
+"""
+Query latency benchmark - replays the TestSQLCommands query catalogue (increments, period, group by, include / extend)
+against a query node and reports latency percentiles and response sizes per query.
+
+:variants:
+    --compare-formats   each query is also sent with format=json <-> format=table swapped
+    --compare-include   queries with include=(...) are also sent against the base table only (include / extend removed)
+
+:baseline:
+    --baseline [file]   compare against a previous results file - exit code 1 when a query's latency (--metric)
+                        grew by more than --threshold percent (and more than --min-delta-ms)
+
+:sample:
+    python3 -m benchmarks.query_benchmark --query 10.0.0.1:32349 --db-name test --iterations 50 --warmup 5 \
+        --compare-formats --compare-include --baseline benchmarks/results/query.baseline.json
+
+Data must already be inserted (ex. anylog_test_suit.py --skip-test).
+"""
+import argparse
+import datetime
+import json
+import os
+import re
+import sys
+import time
+
+ROOT_DIR = os.path.dirname(os.path.abspath(__file__)).rsplit('benchmarks', 1)[0]
+sys.path.insert(0, ROOT_DIR)
+
+from benchmarks.ingest_benchmark import RESULTS_DIR, node_version
+from source.rest_call import get_data
+from source import support
+from tests.test_sql_queries import query_catalogue
+
+INCLUDE = re.compile(r'\s+and\s+(?:include|extend)=\([^)]*\)')
+
+
+def query_variants(query:str, compare_formats:bool=False, compare_include:bool=False)->list:
+    """
+    :return:
+        (variant name, query) - the query as is, plus the swapped format and / or without include=(...)
+    """
+    query_format = 'json' if 'format=json' in query else 'table'
+    variants = [(f"format={query_format}", query)]
+    if compare_formats:
+        other_format = 'table' if query_format == 'json' else 'json'
+        variants.append((f"format={other_format}", query.replace(f"format={query_format}", f"format={other_format}", 1)))
+    if compare_include and 'include=(' in query:
+        variants.extend((f"{name} no include", INCLUDE.sub('', variant_query)) for name, variant_query in list(variants))
+    return variants
+
+
+def measure_query(conn:str, query:str, iterations:int, warmup:int)->dict:
+    """
+    Send `query` `warmup` + `iterations` times (sequentially) - only the last `iterations` calls are measured
+    """
+    for _ in range(warmup):
+        get_data(conn=conn, query=query)
+
+    latencies = []
+    sizes = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        response = get_data(conn=conn, query=query)
+        latencies.append(time.perf_counter() - start)
+        sizes.append(len(response.content))
+
+    return {
+        'query': query,
+        'iterations': iterations,
+        'latency_ms': {
+            'min': min(latencies) * 1000,
+            'mean': sum(latencies) / len(latencies) * 1000,
+            'p50': support.percentile(latencies, 50) * 1000,
+            'p95': support.percentile(latencies, 95) * 1000,
+            'p99': support.percentile(latencies, 99) * 1000,
+            'max': max(latencies) * 1000
+        },
+        'bytes': max(sizes)
+    }
+
+
+def find_regressions(results:dict, baseline:dict, metric:str='p95', threshold:float=20, min_delta_ms:float=1)->list:
+    """
+    Compare two results files (only queries present in both are compared)
+    :return:
+        (query key, baseline ms, current ms) for every query that got slower than allowed
+    """
+    regressions = []
+    for key, current in results['queries'].items():
+        previous = baseline.get('queries', {}).get(key)
+        if not previous:
+            continue
+        before = previous['latency_ms'][metric]
+        after = current['latency_ms'][metric]
+        if after > before * (1 + threshold / 100) and after - before > min_delta_ms:
+            regressions.append((key, before, after))
+    return regressions
+
+
+def main():
+    """
+    :required options:
+        --query             QUERY               Query node IP:port
+        --db-name           DB_NAME             Logical database name
+    :options:
+        -h, --help          show this help message and exit
+        --iterations        ITERATIONS          Measured runs per query
+        --warmup            WARMUP              Unmeasured runs per query before measuring
+        --select            SELECT              (comma separated) catalogue names to run (ex. increments,period)
+        --compare-formats   [COMPARE_FORMATS]   Also run each query with format=json / format=table swapped
+        --compare-include   [COMPARE_INCLUDE]   Also run include=(...) queries without include / extend
+        --baseline          BASELINE            Previous results file to compare against
+        --metric            {p50,p95,p99,mean}  Latency used for the baseline comparison
+        --threshold         THRESHOLD           Max allowed slowdown (percent) against the baseline
+        --min-delta-ms      MIN_DELTA_MS        Ignore slowdowns smaller than this (ms)
+        --output            OUTPUT              JSON results file (default: benchmarks/results/query.[timestamp].json)
+    """
+    parse = argparse.ArgumentParser()
+    parse.add_argument('--query',           required=True,  type=str,                                    help="Query node IP:port")
+    parse.add_argument('--db-name',         required=True,  type=str,                                    help="Logical database name")
+    parse.add_argument('--iterations',      required=False, type=int,   default=20,                      help="Measured runs per query")
+    parse.add_argument('--warmup',          required=False, type=int,   default=3,                       help="Unmeasured runs per query before measuring")
+    parse.add_argument('--select',          required=False, type=str,   default=None,                    help="(comma separated) catalogue names to run (ex. increments,period)")
+    parse.add_argument('--compare-formats', required=False, type=bool, nargs='?', const=True, default=False, help="Also run each query with format=json / format=table swapped")
+    parse.add_argument('--compare-include', required=False, type=bool, nargs='?', const=True, default=False, help="Also run include=(...) queries without include / extend")
+    parse.add_argument('--baseline',        required=False, type=str,   default=None,                    help="Previous results file to compare against")
+    parse.add_argument('--metric',          required=False, type=str,   default='p95', choices=['p50', 'p95', 'p99', 'mean'], help="Latency used for the baseline comparison")
+    parse.add_argument('--threshold',       required=False, type=float, default=20,                      help="Max allowed slowdown (percent) against the baseline")
+    parse.add_argument('--min-delta-ms',    required=False, type=float, default=1,                       help="Ignore slowdowns smaller than this (ms)")
+    parse.add_argument('--output',          required=False, type=str,   default=None,                    help="JSON results file (default: benchmarks/results/query.[timestamp].json)")
+    args = parse.parse_args()
+
+    if args.iterations < 1:
+        parse.error(f"Invalid number of iterations {args.iterations}")
+
+    catalogue = query_catalogue(args.db_name)
+    if args.select:
+        selected = args.select.split(',')
+        catalogue = [(name, query) for name, query in catalogue if name.split('[', 1)[0] in selected]
+
+    started = datetime.datetime.now(datetime.timezone.utc)
+    results = {
+        'benchmark': 'query',
+        'started': started.isoformat(),
+        'db_name': args.db_name,
+        'node_version': node_version(args.query),
+        'warmup': args.warmup,
+        'queries': {}
+    }
+
+    print(f"{'query':<45} {'variant':<26} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'bytes':>9}")
+    for name, query in catalogue:
+        for variant, variant_query in query_variants(query, compare_formats=args.compare_formats, compare_include=args.compare_include):
+            result = measure_query(conn=args.query, query=variant_query, iterations=args.iterations, warmup=args.warmup)
+            result.update({'name': name, 'variant': variant})
+            results['queries'][f"{name} | {variant}"] = result
+            print(f"{name:<45} {variant:<26} {result['latency_ms']['p50']:>9.2f} {result['latency_ms']['p95']:>9.2f} "
+                  f"{result['latency_ms']['p99']:>9.2f} {result['bytes']:>9}")
+
+    output = args.output
+    if not output:
+        support.create_dir(RESULTS_DIR)
+        output = os.path.join(RESULTS_DIR, f"query.{started.strftime('%Y%m%dT%H%M%SZ')}.json")
+    support.write_file(output, json.dumps(results, indent=2))
+    print(f"Results stored in {output}")
+
+    if args.baseline:
+        with open(args.baseline, 'r') as f:
+            baseline = json.load(f)
+        regressions = find_regressions(results, baseline, metric=args.metric, threshold=args.threshold, min_delta_ms=args.min_delta_ms)
+        for key, before, after in regressions:
+            change = f"+{(after / before - 1) * 100:.0f}%" if before else "n/a - baseline is 0"  # no samples in the baseline
+            print(f"Regression: {key} - {args.metric} {before:.2f} ms -> {after:.2f} ms (+{after - before:.2f} ms, {change})")
+        if regressions:
+            sys.exit(1)
+        print(f"No regressions against {args.baseline} ({args.metric}, threshold {args.threshold}%)")
+
+
+if __name__ == '__main__':
+    main()
@@ -1,118 +1,259 @@
-import datetime
+"""
+Offline, seedable generator for the data files - reproduces the `rand_data`, `power_plant` and `power_plant_pv`
+schemas and the year-bucketed timestamps of the original (MQTT based) files, and scales to hundreds of millions of rows:
+values are generated with NumPy one chunk at a time and each chunk is written with a single (buffered) write.
+
+:timestamps:
+    A grid of timestamps every 5h49m48s between 2023-01-01 00:00:00 and 2025-12-31 23:59:59 is grouped by year. The
+    first row gets the first timestamp, the last row gets 2025-12-31 23:59:59, and the rows in between are split evenly
+    across the years (in file order), each taking a random timestamp of its year.
+
+:output:
+    [output dir]/data.[table].0.0.json - one JSON object per line, lines separated by ",\n" (same format as the
+    original files). Existing files are only replaced with --force.
+
+:sample:
+    # same row counts as the files in data/ (different values)
+    python3 data/get_data.py --output-dir /tmp/anylog-data --seed 7
+
+    # 100M rows per table for partitioning / increments stress tests
+    python3 data/get_data.py --output-dir /data/anylog --rows 100000000 --tables rand_data,power_plant
+    python3 anylog_test_suit.py --operator 10.0.0.1:32149 --db-name stress --data-dir /data/anylog --batch-size 1000 --skip-test
+
+Same seed and row counts -> same files (chunk size does not change the output).
+
+:requirements:
+    numpy
+"""
+import argparse
 import os
-import random
-import json
-import paho.mqtt.client as mqtt
-
-# ----------------- CONFIG -----------------
-DATA_DIR = '.'
-HOST = "172.104.228.251"
-PORT = 1883
-USER = "anyloguser"
-PASSWORD = "mqtt4AnyLog!"
-ROW_COUNT = 1500
-TOPICS = ['anylog-demo', 'power-plant', 'power-plant-pv']
-
-os.makedirs(DATA_DIR, exist_ok=True)
-
-# ----------------- TIMESTAMP GENERATION -----------------
-def generate_timestamps():
-    """Generate timestamps roughly every 5h49m48s from 2023-01-01 to 2025-12-31 and group by year."""
-    timestamps_by_year = {2023: [], 2024: [], 2025: []}
-    start_ts = datetime.datetime(2023, 1, 1, 0, 0, 0)
-    end_ts = datetime.datetime(2025, 12, 31, 23, 59, 59)
-    delta = datetime.timedelta(hours=5, minutes=49, seconds=48)
-
-    current = start_ts
-    while current < end_ts:
-        year = current.year
-        timestamps_by_year[year].append(current.strftime('%Y-%m-%dT%H:%M:%S.%f'))
-        current += delta
-
-    # Ensure last timestamp is included
-    timestamps_by_year[2025].append(end_ts.strftime('%Y-%m-%dT%H:%M:%S.%f'))
-    return timestamps_by_year
-
-TIMESTAMPS_BY_YEAR = generate_timestamps()
-
-# ----------------- GLOBAL STATE -----------------
-DATA = {}
-
-# ----------------- HELPERS -----------------
-def _del_keys(row: dict, keys=('dbms', 'table')):
-    for key in keys:
-        row.pop(key, None)
-    return row
-
-def assign_timestamp(row_index):
-    """Assign a timestamp evenly distributed per year."""
-    if row_index == 0:
-        return TIMESTAMPS_BY_YEAR[2023][0]
-    elif row_index == ROW_COUNT - 1:
-        return TIMESTAMPS_BY_YEAR[2025][-1]
-    else:
-        # Evenly distribute across years for intermediate rows
-        # Roughly divide ROW_COUNT across 3 years
-        per_year = ROW_COUNT // 3
-        if row_index <= per_year:
-            return random.choice(TIMESTAMPS_BY_YEAR[2023][1:])
-        elif row_index <= 2 * per_year:
-            return random.choice(TIMESTAMPS_BY_YEAR[2024][1:])
-        else:
-            return random.choice(TIMESTAMPS_BY_YEAR[2025][1:-1])
-
-# ----------------- MQTT CALLBACKS -----------------
-def on_connect(client, userdata, flags, rc):
-    print(f"Connected with result code {rc}")
-    for topic in TOPICS:
-        client.subscribe(topic)
-        print(f"Subscribed to topic: {topic}")
-
-def on_message(client, userdata, msg):
-    file_name = os.path.join(DATA_DIR, f"data.{msg.topic.replace('-', '_')}.0.0.json")
-
-    # Initialize counter if file not yet tracked
-    if file_name not in DATA:
-        DATA[file_name] = 0
-
-    if not os.path.isfile(file_name):
-        open(file_name, "w").close()
-
-    if DATA[file_name] < ROW_COUNT:
+import sys
+import time
+import zlib
+
+import numpy as np
+
+DATA_DIR = os.path.dirname(os.path.abspath(__file__))
+DBMS = 'data'
+START = '2023-01-01T00:00:00'
+END = '2025-12-31T23:59:59'
+INTERVAL = 5 * 3600 + 49 * 60 + 48   # seconds between grid timestamps (5h49m48s)
+CHUNK_ROWS = 200000                   # rows generated / written at a time
+ROW_COUNTS = {'rand_data': 1500, 'power_plant': 1500, 'power_plant_pv': 100}
+
+# power_plant monitors - (line voltage, current, real power, reactive power, power factor); generators (voltage 0)
+# are offline and report zeros
+MONITORS = {
+    'BCT': (731, 89, 1904, 450, 97), 'BF1': (731, 28, 615, 89, 99), 'BF2': (731, 41, 912, 124, 99),
+    'BF3': (731, 31, 633, 107, 99), 'BF4': (731, 20, 456, -11, 100), 'BG10': (0, 0, 0, 0, 100),
+    'BG11': (0, 0, 0, 0, 100), 'BG8': (0, 0, 0, 0, 100), 'BG9': (0, 0, 0, 0, 100),
+    'BSP': (732, 1, 14, 0, 100), 'CBT': (732, 89, 1906, 451, 97), 'CDT': (732, 20, 460, 122, 96),
+    'CF1': (733, 22, 503, 11, 100), 'CF2': (733, 39, 701, 212, 96), 'CF3': (732, 5, 174, 23, 99),
+    'CG12': (0, 0, 0, 0, 100), 'CG7': (0, 0, 0, 0, 100), 'CSP': (732, 2, 51, 6, 99),
+    'DCT': (243, 126, 456, 122, 96), 'DF1': (243, 40, 118, 28, 97), 'DF2': (243, 25, 88, 47, 88),
+    'DF3': (243, 0, 0, 0, 100), 'DF4': (243, 57, 213, 46, 98), 'DG2': (0, 0, 0, 0, 100),
+    'DG3': (0, 0, 0, 0, 100), 'DG4': (0, 0, 0, 0, 100), 'DG5': (0, 0, 0, 0, 100),
+    'DG6': (0, 0, 0, 0, 100), 'DSP': (243, 6, 36, 5, 99), 'KPL': (731, 243, 5234, 956, 98)
+}
+PV_MONITOR = 'InconLoadTapChangerAI'
+COMMS_FAILURE_RATE = 1 / 1500   # share of power_plant rows with CommsStatus "false"
+
+
+class Streams:
+    """
+    One random stream per (table, column) - every column draws its values in row order, so the output does not depend
+    on how the rows are split into chunks
+    """
+    def __init__(self, seed:int, table:str):
+        self.seed = seed
+        self.table = table
+        self.streams = {}
+
+    def __call__(self, column:str)->np.random.Generator:
+        if column not in self.streams:
+            self.streams[column] = np.random.default_rng([self.seed, zlib.crc32(f"{self.table}.{column}".encode())])
+        return self.streams[column]
+
+
+def timestamp_grid(start:str=START, end:str=END, interval:int=INTERVAL)->list:
+    """
+    Grid timestamps grouped by year - same as the original `generate_timestamps` (the end timestamp is appended to
+    the last year)
+    :return:
+        [datetime64[s] array per year] (oldest year first)
+    """
+    grid = np.arange(np.datetime64(start, 's'), np.datetime64(end, 's'), np.timedelta64(interval, 's'))
+    grid = np.append(grid, np.datetime64(end, 's'))
+    years = grid.astype('datetime64[Y]')
+    return [grid[years == year] for year in np.unique(years)]
+
+
+def assign_timestamps(rng:np.random.Generator, grid:list, first_row:int, count:int, total_rows:int):
+    """
+    Vectorized `assign_timestamp` for rows [first_row, first_row + count) of a `total_rows` file - the first and
+    last rows get the first / last grid timestamps, rows in between are split evenly across the years (the last
+    year takes the remainder) and pick a random timestamp within their year
+    """
+    index = np.arange(first_row, first_row + count)
+    per_year = max(1, total_rows // len(grid))
+    bucket = np.minimum(np.maximum(index - 1, 0) // per_year, len(grid) - 1)
+    # the first / last grid timestamps are kept for the first / last rows
+    choices = [year[1:] for year in grid[:-1]] + [grid[-1][1:-1]]
+    timestamps = np.empty(count, dtype='datetime64[s]')
+    draws = rng.random(count)
+    for position, year in enumerate(choices):
+        mask = bucket == position
+        timestamps[mask] = year[(draws[mask] * len(year)).astype(np.int64)]
+    timestamps[index == 0] = grid[0][0]
+    timestamps[index == total_rows - 1] = grid[-1][-1]
+    return timestamps
+
+
+def _format_timestamps(timestamps)->list:
+    return [f"{value}Z" for value in np.datetime_as_string(timestamps.astype('datetime64[us]'), unit='us')]
+
+
+def rand_data_lines(streams:Streams, timestamps)->list:
+    values = np.round(streams('value').random(len(timestamps)) * streams('scale').random(len(timestamps)) * 1000, 3)
+    return [f'{{"timestamp": "{timestamp}", "value": {value!r}}}'
+            for timestamp, value in zip(_format_timestamps(timestamps), values.tolist())]
+
+
+def power_plant_lines(streams:Streams, timestamps)->list:
+    count = len(timestamps)
+    names = list(MONITORS)
+    profile = np.array(list(MONITORS.values()), dtype=np.int64)
+    monitor = streams('monitor_id').integers(0, len(names), count)
+    voltage, current, real_power, reactive_power, power_factor = profile[monitor].T
+    online = voltage > 0
+
+    def _noise(column, base, spread):
+        return np.where(base != 0, np.rint(base * (1 + streams(column).normal(0, spread, count))), 0).astype(np.int64)
+
+    phase_voltage = [np.where(online, voltage + streams(f"{phase}_N_Voltage").integers(-3, 8, count), 0) for phase in 'ABC']
+    phase_current = [_noise(f"{phase}_Current", current, 0.05) for phase in 'ABC']
+    real_power = _noise('RealPower', real_power, 0.04)
+    reactive_power = np.where(online, reactive_power + np.rint(streams('ReactivePower').normal(0, 8, count)).astype(np.int64), 0)
+    power_factor = np.clip(power_factor + np.where(online, streams('PowerFactor').integers(-1, 2, count), 0), 0, 100)
+    frequency = np.where(online, streams('Frequency').integers(5997, 6003, count), 6000)
+    comms_status = np.where(streams('CommsStatus').random(count) < COMMS_FAILURE_RATE, 'false', 'true')
+
+    columns = zip([names[i] for i in monitor.tolist()], _format_timestamps(timestamps), phase_voltage[0].tolist(),
+                  phase_current[0].tolist(), phase_voltage[1].tolist(), real_power.tolist(), phase_current[2].tolist(),
+                  phase_voltage[2].tolist(), comms_status.tolist(), frequency.tolist(), power_factor.tolist(),
+                  phase_current[1].tolist(), reactive_power.tolist())
+    return [f'{{"monitor_id": "{monitor_id}", "timestamp": "{timestamp}", "A_N_Voltage": {a_voltage}, '
+            f'"A_Current": {a_current}, "B_N_Voltage": {b_voltage}, "RealPower": {real}, "C_Current": {c_current}, '
+            f'"C_N_Voltage": {c_voltage}, "CommsStatus": "{comms}", "EnergyMultiplier": 1, "Frequency": {freq}, '
+            f'"PowerFactor": {pf}, "B_Current": {b_current}, "ReactivePower": {reactive}}}'
+            for monitor_id, timestamp, a_voltage, a_current, b_voltage, real, c_current, c_voltage, comms, freq, pf,
+                b_current, reactive in columns]
+
+
+def power_plant_pv_lines(streams:Streams, timestamps)->list:
+    # readings are float32 values (-1.04 / -1.05) stored as float64, as sent by the PLC
+    values = np.round(-1.045 + streams('PV').normal(0, 0.004, len(timestamps)), 2).astype(np.float32).astype(np.float64)
+    return [f'{{"monitor_id": "{PV_MONITOR}", "timestamp": "{timestamp}", "PV": {value!r}}}'
+            for timestamp, value in zip(_format_timestamps(timestamps), values.tolist())]
+
+
+TABLES = {
+    'rand_data': rand_data_lines,
+    'power_plant': power_plant_lines,
+    'power_plant_pv': power_plant_pv_lines
+}
+
+
+def generate_table(table:str, rows:int, output_dir:str, seed:int=None, chunk_rows:int=CHUNK_ROWS,
+                   grid:list=None, force:bool=False)->str:
+    """
+    Write `rows` rows of `table` into [output_dir]/data.[table].0.0.json
+    :return:
+        file path
+    """
+    if table not in TABLES:
+        raise ValueError(f"Unsupported table {table} (options: {', '.join(TABLES)})")
+    file_path = os.path.join(output_dir, f"{DBMS}.{table}.0.0.json")
+    if os.path.isfile(file_path) and not force:
+        raise FileExistsError(f"File {file_path} already exists (use --force to replace it)")
+
+    grid = grid or timestamp_grid()
+    streams = Streams(seed=np.random.SeedSequence().entropy if seed is None else seed, table=table)
+
+    tmp_file = f"{file_path}.tmp"
+    try:
+        with open(tmp_file, 'w', buffering=8 * 1024 * 1024) as f:
+            for first_row in range(0, rows, chunk_rows):
+                count = min(chunk_rows, rows - first_row)
+                timestamps = assign_timestamps(streams('timestamp'), grid, first_row=first_row, count=count, total_rows=rows)
+                lines = TABLES[table](streams, timestamps)
+                if first_row:
+                    f.write(",\n")
+                f.write(",\n".join(lines))
+        os.replace(tmp_file, file_path)
+    except Exception as error:
+        if os.path.isfile(tmp_file):
+            os.remove(tmp_file)
+        raise Exception(f"Failed to write {file_path} (Error: {error})")
+    return file_path
+
+
+def _parse_rows(value:str)->dict:
+    """
+    "1000000" -> same count for every table, "rand_data=1000000,power_plant=5000" -> per table
+    :raise:
+        ValueError - unknown table or invalid row count
+    """
+    if '=' not in value:
+        return {table: int(value) for table in TABLES}
+    rows = {table.strip(): int(count) for table, count in (item.split('=', 1) for item in value.split(',') if item.strip())}
+    _check_tables(rows)
+    return rows
+
+
+def _check_tables(tables:list):
+    unknown = [table for table in tables if table not in TABLES]
+    if unknown:
+        raise ValueError(f"Unsupported table(s) {', '.join(unknown)} (options: {', '.join(TABLES)})")
+
+
+def main():
+    parse = argparse.ArgumentParser(formatter_class=argparse.RawDescriptionHelpFormatter, description=__doc__.split('\n\n')[0])
+    parse.add_argument('--output-dir', type=str, default=DATA_DIR, help='directory to write data.[table].0.0.json into')
+    parse.add_argument('--tables', type=str, default=','.join(TABLES), help='comma separated tables to generate')
+    parse.add_argument('--rows', type=str, default=None,
+                       help='rows per table - a number for every table or table=rows,... (default: 1500 / 1500 / 100)')
+    parse.add_argument('--seed', type=int, default=None, help='random seed (same seed -> same files)')
+    parse.add_argument('--chunk-rows', type=int, default=CHUNK_ROWS, help='rows generated / written at a time')
+    parse.add_argument('--start', type=str, default=START, help='first grid timestamp')
+    parse.add_argument('--end', type=str, default=END, help='last grid timestamp (assigned to the last row)')
+    parse.add_argument('--interval', type=int, default=INTERVAL, help='seconds between grid timestamps')
+    parse.add_argument('--force', type=bool, nargs='?', const=True, default=False, help='replace existing files')
+    args = parse.parse_args()
+
+    tables = [table.strip() for table in args.tables.split(',') if table.strip()]
+    row_counts = dict(ROW_COUNTS)
+    try:
+        _check_tables(tables)
+        if args.rows:
+            row_counts.update(_parse_rows(args.rows))
+    except ValueError as error:
+        parse.error(str(error))
+    os.makedirs(args.output_dir, exist_ok=True)
+    grid = timestamp_grid(start=args.start, end=args.end, interval=args.interval)
+
+    for table in tables:
+        start = time.perf_counter()
         try:
-            new_msg = json.loads(msg.payload.decode('utf-8'))
-        except json.JSONDecodeError:
-            print(f"Invalid JSON on topic {msg.topic}")
-            return
-
-        rows = new_msg if isinstance(new_msg, list) else [new_msg]
-
-        for row in rows:
-            if DATA[file_name] >= ROW_COUNT:
-                break
-            row = _del_keys(row)
-            row['timestamp'] = assign_timestamp(DATA[file_name])
-            DATA[file_name] += 1
-
-            with open(file_name, 'a') as f:
-                if DATA[file_name] < ROW_COUNT:
-                    f.write(f"{json.dumps(row)},\n")
-                else:
-                    f.write(json.dumps(row))
-
-        if DATA[file_name] % 100 == 0:
-            print(file_name, DATA[file_name])
-
-        # Disconnect when all files have enough rows
-        if all(count >= ROW_COUNT for count in DATA.values()):
-            print("All files reached ROW_COUNT. Disconnecting MQTT client.")
-            client.disconnect()
-
-# ----------------- MQTT CLIENT -----------------
-client = mqtt.Client()
-client.username_pw_set(USER, PASSWORD)
-client.on_connect = on_connect
-client.on_message = on_message
-
-client.connect(HOST, PORT, 60)
-client.loop_forever()
+            file_path = generate_table(table, rows=row_counts[table], output_dir=args.output_dir, seed=args.seed,
+                                       chunk_rows=args.chunk_rows, grid=grid, force=args.force)
+        except (ValueError, FileExistsError) as error:
+            print(error)
+            sys.exit(1)
+        seconds = time.perf_counter() - start
+        print(f"  - {file_path}: {row_counts[table]} rows in {seconds:.1f} seconds "
+              f"({row_counts[table] / seconds if seconds else 0:.0f} rows/sec, {os.path.getsize(file_path) / 1024 ** 2:.1f} MB)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,162 @@
+"""
+asyncio counterpart of rest_call - same headers and commands, sent through aiohttp so many requests can be in
+flight per node from a single thread. Pool size and timeouts are shared with rest_call (see `configure_pool`).
+"""
+import asyncio
+import json
+import time
+
+from source import rest_call
+from source.metrics import METRICS, command_label
+from source.query_cache import QUERY_CACHE
+
+try:
+    import aiohttp
+except ImportError:
+    aiohttp = None
+
+SESSIONS = {}
+
+
+class AsyncResponse:
+    """
+    Minimal stand-in for requests.Response - the body is read before the aiohttp response is released
+    """
+    def __init__(self, status_code:int, content:bytes, encoding:str=None):
+        self.status_code = status_code
+        self.content = content
+        self.encoding = encoding or 'utf-8'
+
+    @property
+    def text(self)->str:
+        return self.content.decode(self.encoding, errors='replace')
+
+    def json(self):
+        return json.loads(self.text)
+
+
+def _get_session(conn:str):
+    """
+    Get (or create) the aiohttp session for a node - sessions belong to the running event loop
+    """
+    if aiohttp is None:
+        raise ImportError("aiohttp is required for async requests (pip install aiohttp)")
+
+    session = SESSIONS.get(conn)
+    if session is None or session.closed:
+        connector = aiohttp.TCPConnector(limit=rest_call.POOL_SIZE, force_close=False)
+        timeout = aiohttp.ClientTimeout(sock_connect=rest_call.CONNECT_TIMEOUT, sock_read=rest_call.READ_TIMEOUT)
+        session = aiohttp.ClientSession(connector=connector, timeout=timeout)
+        SESSIONS[conn] = session
+    return session
+
+
+async def close_sessions():
+    for session in SESSIONS.values():
+        await session.close()
+    SESSIONS.clear()
+
+
+def _is_connect_error(error:Exception)->bool:
+    connect_errors = (aiohttp.ClientConnectorError, getattr(aiohttp, 'ConnectionTimeoutError', aiohttp.ClientConnectorError))
+    return isinstance(error, connect_errors)
+
+
+def _is_node_error(error:Exception)->bool:
+    if isinstance(error, aiohttp.ClientResponseError):
+        return error.status >= 500
+    return isinstance(error, (aiohttp.ClientConnectionError, asyncio.TimeoutError))
+
+
+async def execute_request(func:str, conn:str, headers:dict, payload:str=None):
+    """
+    Same retry / circuit breaker rules as rest_call.execute_request
+    """
+    command = command_label(func, headers)
+    breaker = rest_call.get_breaker(conn)
+    attempt = 0
+    while True:
+        start = time.perf_counter()
+        try:
+            if func.upper() not in ['GET', 'PUT', 'POST']:
+                raise ValueError(f'Invalid user input {func.upper()}')
+            session = _get_session(conn)
+            async with session.request(func.upper(), url=f"http://{conn}", headers=headers, data=payload) as response:
+                content = await response.read()
+                response.raise_for_status()
+                result = AsyncResponse(status_code=response.status, content=content, encoding=response.get_encoding() if content else None)
+        except Exception as error:
+            METRICS.record_request(command, conn, time.perf_counter() - start, bytes_sent=rest_call._payload_size(payload), error=True)
+            unreachable = aiohttp is not None and _is_connect_error(error)
+            node_error = aiohttp is not None and _is_node_error(error)
+            if node_error:
+                breaker.record_failure()
+            if attempt < rest_call.RETRIES and (unreachable or (node_error and func.upper() == 'GET')):
+                attempt += 1
+                METRICS.record_retry(command, conn)
+                await asyncio.sleep(rest_call.retry_backoff(attempt))
+                continue
+            dropped = aiohttp is not None and isinstance(error, aiohttp.ClientConnectionError) and not isinstance(error, asyncio.TimeoutError)
+            if unreachable or dropped:
+                raise rest_call.NodeUnavailable(f"Failed to execute {func.upper()} against {conn} (Error;  {error})")
+            raise Exception(f"Failed to execute {func.upper()} against {conn} (Error;  {error})")
+        breaker.record_success()
+        METRICS.record_request(command, conn, time.perf_counter() - start, bytes_sent=rest_call._payload_size(payload),
+                               bytes_received=len(result.content))
+        return result
+
+
+async def put_data(conn:str, payload:str, dbms:str, table:str):
+    headers = {
+        'type': 'json',
+        'dbms': dbms,
+        'table': table,
+        'mode': 'streaming',
+        'Content-Type': 'text/plain'
+    }
+
+    QUERY_CACHE.data_changed()
+    await execute_request(func='PUT', conn=conn, headers=headers, payload=payload)
+
+
+async def get_data(conn:str, query:str, destination:str='network'):
+    headers = {
+        'command': query,
+        'User-Agent': 'AnyLog/1.23',
+    }
+    if destination:
+        headers['destination'] = destination
+
+    return await execute_request(func='GET', conn=conn, headers=headers, payload=None)
+
+
+async def flush_buffer(conn:(str or list), ready=None, timeout:float=rest_call.FLUSH_TIMEOUT,
+                       sleep_time:float=rest_call.FLUSH_SLEEP)->bool:
+    """
+    Code to flush insert data buffers - all nodes are flushed concurrently
+    :args:
+        ready - (async) callable that returns True once the flushed data is visible, polled with backoff
+        timeout:float - max seconds to poll `ready`
+        sleep_time:float - fixed wait used only when `ready` is not set
+    :return:
+        False if `ready` did not pass before timeout, True otherwise
+    """
+    headers = {"command": "flush buffers", "User-Agent": "AnyLog/1.23"}
+    conns = [conn] if isinstance(conn, str) else conn
+    await asyncio.gather(*[execute_request(func='POST', conn=con, headers=headers, payload=None) for con in conns])
+
+    if ready is None:
+        await asyncio.sleep(sleep_time)
+        return True
+
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout
+    wait_time = 0.1
+    while True:
+        if await ready():
+            return True
+        remaining = deadline - loop.time()
+        if remaining <= 0:
+            return False
+        await asyncio.sleep(min(wait_time, remaining))
+        wait_time = min(wait_time * 2, 2)
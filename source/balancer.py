@@ -0,0 +1,185 @@
+"""
+Operator selection for inserts - each strategy picks the node for the next PUT from the operators whose circuit breaker
+is closed, and every balancer keeps per-node row / request / latency counts for the distribution report.
+
+:strategies:
+    random              random operator, avoiding the previous one (default)
+    round-robin         operators in turn
+    weighted            smooth weighted round-robin - `weights` ({conn: weight}, default 1) sets each node's share
+    least-outstanding   operator with the fewest PUTs in flight
+    latency             operator with the lowest (EWMA PUT latency x (in-flight PUTs + 1)) - slower nodes get less
+"""
+import random
+import threading
+
+from source.metrics import Histogram
+
+STRATEGIES = ['random', 'round-robin', 'weighted', 'least-outstanding', 'latency']
+LATENCY_ALPHA = 0.2     # weight of the newest PUT in the latency average
+LATENCY_EXPLORE = 0.05  # share of picks sent to a random node so a slow node's latency gets re-measured
+
+
+def parse_weights(weights:str)->dict:
+    """
+    "10.0.0.1:32149=3,10.0.0.2:32149=1" -> {'10.0.0.1:32149': 3.0, '10.0.0.2:32149': 1.0}
+    """
+    try:
+        return {conn.strip(): float(weight) for conn, weight in (item.rsplit('=', 1) for item in weights.split(',') if item.strip())}
+    except ValueError as error:
+        raise ValueError(f"Invalid weights {weights} - expected conn=weight,... (Error: {error})")
+
+
+class Balancer:
+    """
+    Random choice (avoiding the previous node) - base class for the other strategies, which override `_choose`
+    """
+    def __init__(self, conns:list, weights:dict=None):
+        self.conns = list(conns)
+        self.weights = {conn: (weights or {}).get(conn, 1.0) for conn in self.conns}
+        self.lock = threading.Lock()
+        self.outstanding = dict.fromkeys(self.conns, 0)
+        self.latency = {}   # EWMA PUT latency (seconds) per node
+        self.rows = {}      # {conn: {table: rows}}
+        self.requests = dict.fromkeys(self.conns, 0)
+        self.errors = dict.fromkeys(self.conns, 0)
+        self.histograms = {conn: Histogram() for conn in self.conns}
+
+    def _choose(self, available:list, previous:str=None)->str:
+        others = [conn for conn in available if conn != previous]
+        return random.choice(others) if others else available[0]
+
+    def pick(self, available:list, previous:str=None)->str:
+        """
+        :args:
+            available:list - operators that can take a request (circuit breaker closed)
+            previous:str - node used for the previous payload
+        """
+        with self.lock:
+            for conn in available:
+                if conn not in self.outstanding:
+                    self._add(conn)
+            return self._choose(available, previous)
+
+    def _add(self, conn:str):
+        self.conns.append(conn)
+        self.weights[conn] = 1.0
+        self.outstanding[conn] = 0
+        self.requests[conn] = 0
+        self.errors[conn] = 0
+        self.histograms[conn] = Histogram()
+
+    def start(self, conn:str):
+        with self.lock:
+            if conn not in self.outstanding:
+                self._add(conn)
+            self.outstanding[conn] += 1
+
+    def finish(self, conn:str, seconds:float, table:str=None, rows:int=0, ok:bool=True):
+        """
+        Mark a PUT as done - failed PUTs count as errors (their rows are recorded on the node that accepts them)
+        """
+        with self.lock:
+            self.outstanding[conn] -= 1
+            if not ok:
+                self.errors[conn] += 1
+                return
+            self.requests[conn] += 1
+            tables = self.rows.setdefault(conn, {})
+            tables[table] = tables.get(table, 0) + rows
+            self.histograms[conn].record(seconds)
+            previous = self.latency.get(conn)
+            self.latency[conn] = seconds if previous is None else previous + LATENCY_ALPHA * (seconds - previous)
+
+    def distribution(self)->dict:
+        """
+        :return:
+            {conn: rows, share of all rows, requests, errors, p50 / p99 PUT latency (ms) and rows per table}
+        """
+        with self.lock:
+            total_rows = sum(sum(tables.values()) for tables in self.rows.values())
+            distribution = {}
+            for conn in self.conns:
+                tables = self.rows.get(conn, {})
+                rows = sum(tables.values())
+                distribution[conn] = {
+                    'rows': rows,
+                    'share': rows / total_rows if total_rows else 0.0,
+                    'weight': self.weights[conn],
+                    'requests': self.requests[conn],
+                    'errors': self.errors[conn],
+                    'latency_ms': {f"p{percent}": self.histograms[conn].percentile(percent) * 1000 for percent in (50, 99)},
+                    'tables': dict(tables)
+                }
+        return distribution
+
+
+class RoundRobinBalancer(Balancer):
+    def __init__(self, conns:list, weights:dict=None):
+        super().__init__(conns, weights)
+        self.position = 0
+
+    def _choose(self, available:list, previous:str=None)->str:
+        for _ in range(len(self.conns)):
+            conn = self.conns[self.position % len(self.conns)]
+            self.position += 1
+            if conn in available:
+                return conn
+        return available[0]
+
+
+class WeightedBalancer(Balancer):
+    """
+    Smooth weighted round-robin - with weights 3 / 1 the picks go a, a, b, a (not a, a, a, b)
+    """
+    def __init__(self, conns:list, weights:dict=None):
+        super().__init__(conns, weights)
+        self.current = dict.fromkeys(self.conns, 0.0)
+
+    def _choose(self, available:list, previous:str=None)->str:
+        total = 0.0
+        for conn in available:
+            self.current[conn] = self.current.get(conn, 0.0) + self.weights[conn]
+            total += self.weights[conn]
+        conn = max(available, key=lambda con: self.current[con])
+        self.current[conn] -= total
+        return conn
+
+
+class LeastOutstandingBalancer(Balancer):
+    def _choose(self, available:list, previous:str=None)->str:
+        fewest = min(self.outstanding[conn] for conn in available)
+        return super()._choose([conn for conn in available if self.outstanding[conn] == fewest], previous)
+
+
+class LatencyBalancer(Balancer):
+    """
+    Nodes without a measured PUT are tried first; afterwards the node with the lowest latency x (in-flight + 1) wins
+    """
+    def _choose(self, available:list, previous:str=None)->str:
+        unmeasured = [conn for conn in available if conn not in self.latency]
+        if unmeasured:
+            return random.choice(unmeasured)
+        if random.random() < LATENCY_EXPLORE:
+            return random.choice(available)
+        return min(available, key=lambda conn: self.latency[conn] * (self.outstanding[conn] + 1))
+
+
+BALANCERS = {
+    'random': Balancer,
+    'round-robin': RoundRobinBalancer,
+    'weighted': WeightedBalancer,
+    'least-outstanding': LeastOutstandingBalancer,
+    'latency': LatencyBalancer
+}
+
+
+def get_balancer(strategy:str, conns:list, weights:dict=None)->Balancer:
+    if strategy not in BALANCERS:
+        raise ValueError(f"Unsupported balancing strategy {strategy} (options: {', '.join(STRATEGIES)})")
+    return BALANCERS[strategy](conns, weights=weights)
+
+
+def print_distribution(distribution:dict):
+    for conn, node in distribution.items():
+        print(f"  - {conn}: {node['rows']} rows ({node['share'] * 100:.1f}%) in {node['requests']} requests, "
+              f"{node['errors']} errors - p50 / p99 PUT {node['latency_ms']['p50']:.1f} / {node['latency_ms']['p99']:.1f} ms")
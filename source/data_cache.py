@@ -0,0 +1,347 @@
+"""
+Columnar cache of the data files - the first load of data/[dbms].[table].*.json stores every column as a NumPy `.npy`
+file (plus the byte range of each line in the source file), and later loads memory-map those arrays instead of parsing
+the JSON text again.
+
+A cache entry is keyed by the source file's absolute path and SHA-256 - size / mtime are kept next to it, so an
+unchanged file is recognised without being read, and a file that was only touched (same content, new mtime) is hashed
+once and reused. Files with the same name in different directories (checkouts) get entries of their own.
+
+:layout (CACHE_DIR - $XDG_CACHE_HOME or ~/.cache, under anylog-unit-testing/data, outside the checkout):
+    [file name].[path hash].json                    - {path, size, mtime_ns, sha256, dir} of the current entry
+    [file name].[path hash].[sha256[:16]]/          - manifest.json, offsets.npy ((start, end) per line) and c[N].npy per column
+
+Entries are built CHUNK_ROWS rows at a time, so building never holds more than a chunk of decoded rows.
+
+:columns (same types as reference_engine.Table):
+    timestamp   datetime64[us] (NaT when missing)
+    int         int64 (every row has a value)
+    float       float64 (NaN when missing)
+    str         everything else ('' when missing) - object arrays when built from rows; stored as fixed-width unicode
+                and memory-mapped as is when loaded from the cache
+
+:sample:
+    python3 -m source.data_cache            # build / refresh the cache for data/*.json
+    python3 -m source.data_cache --clear
+
+:requirements:
+    numpy
+"""
+import argparse
+import hashlib
+import json
+import mmap
+import os
+import shutil
+import tempfile
+import time
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+ROOT_DIR = os.path.dirname(__file__).rsplit('source', 1)[0]
+DATA_DIR = os.path.join(ROOT_DIR, 'data')
+CACHE_DIR = os.path.join(os.environ.get('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache'),
+                         'anylog-unit-testing', 'data')
+CACHE_VERSION = 1  # bump when the layout / column typing changes
+CHUNK_ROWS = 50000  # rows decoded at a time while building a cache entry
+
+
+class CachedFile:
+    """
+    Columns of one data file - `columns` {name: array} use lower case names, `offsets` holds the (start, end) byte
+    range of each row's line in `file_path` (without whitespace and trailing comma)
+    """
+    def __init__(self, file_path:str, columns:dict, offsets, sha256:str):
+        self.file_path = file_path
+        self.columns = columns
+        self.offsets = offsets
+        self.sha256 = sha256
+
+    def __len__(self):
+        return len(self.offsets)
+
+
+def _timestamps(values:list, file_path:str=None, first_row:int=0):
+    """
+    datetime64[us] array of ISO timestamps (missing -> NaT)
+    :args:
+        values:list - timestamp values of the rows
+        file_path:str - source of the rows (for the error)
+        first_row:int - row number of values[0] in the source (for the error)
+    :raise:
+        Exception naming the file and row of a value that is not an ISO timestamp
+    """
+    try:
+        return np.array(['NaT' if value is None else value.rstrip('Z') for value in values], dtype='datetime64[us]')
+    except (AttributeError, TypeError, ValueError) as error:
+        failure = error
+    for index, value in enumerate(values):
+        try:
+            if value is not None:
+                np.datetime64(value.rstrip('Z'), 'us')
+        except (AttributeError, TypeError, ValueError) as error:
+            raise Exception(f"Failed to read timestamp from {file_path or 'rows'} (row: {first_row + index + 1} | value: {value!r} | Error: {error})")
+    raise Exception(f"Failed to read timestamps from {file_path or 'rows'} (Error: {failure})")
+
+
+def build_columns(rows:list, file_path:str=None, first_row:int=0)->dict:
+    """
+    Convert decoded rows into typed NumPy arrays (see module docstring)
+    :args:
+        rows:list - decoded rows
+        file_path:str - source of the rows (for errors)
+        first_row:int - row number of rows[0] in the source (for errors)
+    :return:
+        {column: array}
+    """
+    if np is None:
+        raise ImportError("numpy is required for columnar data (pip install numpy)")
+    names = []
+    for row in rows:
+        for key in row:
+            if key.lower() not in names:
+                names.append(key.lower())
+    rows = [{key.lower(): value for key, value in row.items()} for row in rows]
+
+    columns = {}
+    for column in names:
+        values = [row.get(column) for row in rows]
+        present = [value for value in values if value is not None]
+        if column == 'timestamp':
+            columns[column] = _timestamps(values, file_path=file_path, first_row=first_row)
+        elif present and all(isinstance(value, int) and not isinstance(value, bool) for value in present) and len(present) == len(values):
+            columns[column] = np.array(values, dtype=np.int64)
+        elif present and all(isinstance(value, (int, float)) and not isinstance(value, bool) for value in present):
+            columns[column] = np.array([np.nan if value is None else value for value in values], dtype=np.float64)
+        else:
+            columns[column] = np.array(['' if value is None else str(value) for value in values], dtype=object)
+    return columns
+
+
+def _file_hash(file_path:str)->str:
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for block in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _merge_columns(chunks:list)->dict:
+    """
+    Concatenate the columns of consecutive chunks ([(rows, columns)]) - a column missing from a chunk is filled with
+    its missing value, and a column typed differently across chunks is widened the way build_columns types a whole
+    file (int without a value in every row -> float, numbers mixed with text -> str)
+    """
+    names = []
+    for _, columns in chunks:
+        names.extend(column for column in columns if column not in names)
+
+    merged = {}
+    for column in names:
+        kinds = {columns[column].dtype.kind for _, columns in chunks if column in columns}
+        complete = all(column in columns for _, columns in chunks)
+        if 'M' in kinds:
+            kind = 'M'
+        elif 'O' in kinds:
+            kind = 'O'
+        elif kinds == {'i'} and complete:
+            kind = 'i'
+        else:
+            kind = 'f'
+
+        parts = []
+        for rows, columns in chunks:
+            values = columns.get(column)
+            if values is None:
+                values = np.full(rows, {'M': np.datetime64('NaT', 'us'), 'O': '', 'f': np.nan}[kind],
+                                 dtype={'M': 'datetime64[us]', 'O': object, 'f': np.float64}[kind])
+            elif kind == 'O' and values.dtype.kind != 'O':
+                values = np.array(['' if value != value else str(value) for value in values.tolist()], dtype=object)
+            elif kind == 'f':
+                values = values.astype(np.float64)
+            parts.append(values)
+        merged[column] = np.concatenate(parts)
+    return merged
+
+
+def _scan(file_path:str, chunk_rows:int=CHUNK_ROWS):
+    """
+    Parse a data file once - yields (rows, [(start, end)] per line) of up to `chunk_rows` rows at a time
+    """
+    rows = []
+    offsets = []
+    with open(file_path, 'rb') as f:
+        if not os.fstat(f.fileno()).st_size:
+            return
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            start = 0
+            size = len(mm)
+            while start < size:
+                end = mm.find(b'\n', start)
+                if end == -1:
+                    end = size
+                line = mm[start:end]
+                stripped = line.strip().rstrip(b',')
+                if stripped:
+                    line_start = start + line.index(stripped[:1])
+                    offsets.append((line_start, line_start + len(stripped)))
+                    try:
+                        rows.append(json.loads(stripped))
+                    except Exception as error:
+                        raise Exception(f"Failed to read content from {file_path} (line: {stripped} | Error: {error})")
+                    if len(rows) == chunk_rows:
+                        yield rows, offsets
+                        rows = []
+                        offsets = []
+                start = end + 1
+    if rows:
+        yield rows, offsets
+
+
+def _read_json(file_path:str):
+    try:
+        with open(file_path, 'r') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _write_json(file_path:str, content:dict):
+    tmp_file = f"{file_path}.{os.getpid()}.tmp"
+    with open(tmp_file, 'w') as f:
+        json.dump(content, f)
+    os.replace(tmp_file, file_path)
+
+
+def _build(file_path:str, cache_dir:str, entry_dir:str, sha256:str):
+    """
+    Write a cache entry into a temporary directory and move it into place (a concurrent build of the same file wins
+    or loses as a whole)
+    """
+    chunks = []
+    offsets = []
+    first_row = 0
+    for rows, chunk_offsets in _scan(file_path):
+        chunks.append((len(rows), build_columns(rows, file_path=file_path, first_row=first_row)))
+        offsets.append(np.array(chunk_offsets, dtype=np.int64).reshape(-1, 2))
+        first_row += len(rows)
+    columns = _merge_columns(chunks)
+    offsets = np.concatenate(offsets) if offsets else np.empty((0, 2), dtype=np.int64)
+    tmp_dir = tempfile.mkdtemp(prefix='.build-', dir=cache_dir)
+    try:
+        manifest = {'version': CACHE_VERSION, 'source': os.path.basename(file_path), 'sha256': sha256,
+                    'rows': first_row, 'columns': {}}
+        np.save(os.path.join(tmp_dir, 'offsets.npy'), offsets)
+        for index, (column, values) in enumerate(columns.items()):
+            kind = 'str' if values.dtype == object else values.dtype.str
+            if kind == 'str':
+                values = values.astype(str) if len(values) else np.array([], dtype='U1')
+            np.save(os.path.join(tmp_dir, f"c{index}.npy"), values)
+            manifest['columns'][column] = {'file': f"c{index}.npy", 'kind': kind}
+        _write_json(os.path.join(tmp_dir, 'manifest.json'), manifest)
+        try:
+            os.rename(tmp_dir, entry_dir)
+        except OSError:  # built by another process in the meantime
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+    except Exception:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        raise
+
+
+def _load_entry(file_path:str, entry_dir:str, use_mmap:bool=True)->CachedFile:
+    manifest = _read_json(os.path.join(entry_dir, 'manifest.json'))
+    if not manifest or manifest.get('version') != CACHE_VERSION:
+        return None
+    mmap_mode = 'r' if use_mmap else None
+    columns = {}
+    for column, info in manifest['columns'].items():
+        values = np.load(os.path.join(entry_dir, info['file']), mmap_mode=mmap_mode)
+        columns[column] = values
+    offsets = np.load(os.path.join(entry_dir, 'offsets.npy'), mmap_mode=mmap_mode)
+    return CachedFile(file_path=file_path, columns=columns, offsets=offsets, sha256=manifest['sha256'])
+
+
+def load(file_path:str, cache_dir:str=CACHE_DIR, use_mmap:bool=True)->CachedFile:
+    """
+    Load a data file's columns - from the cache when the file is unchanged, otherwise the file is parsed and the
+    cache entry (re)built
+    """
+    if np is None:
+        raise ImportError("numpy is required for the data cache (pip install numpy)")
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+    except OSError as error:
+        raise Exception(f"Failed to create cache directory {cache_dir} (Error: {error})")
+
+    file_path = os.path.abspath(file_path)
+    stat = os.stat(file_path)
+    key = f"{os.path.basename(file_path)}.{hashlib.sha256(file_path.encode()).hexdigest()[:16]}"
+    pointer_file = os.path.join(cache_dir, f"{key}.json")
+    pointer = _read_json(pointer_file) or {}
+    if pointer.get('path') != file_path:
+        pointer = {}
+    if pointer.get('size') == stat.st_size and pointer.get('mtime_ns') == stat.st_mtime_ns:
+        sha256 = pointer.get('sha256')
+    else:
+        sha256 = _file_hash(file_path)
+
+    entry_dir = os.path.join(cache_dir, f"{key}.{sha256[:16]}")
+    cached = _load_entry(file_path, entry_dir, use_mmap=use_mmap) if os.path.isdir(entry_dir) else None
+    if cached is None:
+        shutil.rmtree(entry_dir, ignore_errors=True)
+        _build(file_path, cache_dir, entry_dir, sha256)
+        cached = _load_entry(file_path, entry_dir, use_mmap=use_mmap)
+
+    if pointer.get('sha256') != sha256 or pointer.get('mtime_ns') != stat.st_mtime_ns or pointer.get('size') != stat.st_size:
+        previous_dir = pointer.get('dir')
+        _write_json(pointer_file, {'path': file_path, 'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns, 'sha256': sha256,
+                                   'dir': os.path.basename(entry_dir)})
+        if previous_dir and previous_dir != os.path.basename(entry_dir):
+            shutil.rmtree(os.path.join(cache_dir, previous_dir), ignore_errors=True)
+    return cached
+
+
+def sorted_lines(file_path:str, column:str='timestamp', cache_dir:str=CACHE_DIR):
+    """
+    Yield the file's raw lines (bytes) ordered by `column` - the order comes from the cached column (stable, so rows
+    with the same value keep their file order), the lines are sliced from the memory-mapped file
+    """
+    cached = load(file_path, cache_dir=cache_dir)
+    if not len(cached):
+        return
+    if column not in cached.columns:
+        raise LookupError(f"Column {column} not found in {file_path}")
+    order = np.argsort(cached.columns[column], kind='stable')
+    try:
+        with open(file_path, 'rb') as f:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                for index in order:
+                    start, end = cached.offsets[index]
+                    yield mm[start:end]
+    except Exception as error:
+        raise Exception(f"Failed to read content from {file_path} (Error: {error})")
+
+
+def clear(cache_dir:str=CACHE_DIR):
+    shutil.rmtree(cache_dir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    parse = argparse.ArgumentParser()
+    parse.add_argument('--data-dir', type=str, default=DATA_DIR, help='directory with the JSON data files')
+    parse.add_argument('--cache-dir', type=str, default=CACHE_DIR, help='cache directory')
+    parse.add_argument('--clear', type=bool, nargs='?', const=True, default=False, help='remove the cache')
+    args = parse.parse_args()
+
+    if args.clear:
+        clear(args.cache_dir)
+    else:
+        for fname in sorted(os.listdir(args.data_dir)):
+            if fname.endswith('json'):
+                start = time.perf_counter()
+                cached = load(os.path.join(args.data_dir, fname), cache_dir=args.cache_dir)
+                print(f"  - {fname}: {len(cached)} rows, {len(cached.columns)} columns "
+                      f"({(time.perf_counter() - start) * 1000:.1f} ms)")
@@ -1,80 +1,721 @@
 import argparse
+import asyncio
+import collections
 import json
 import os
 import datetime
-import random
+import heapq
+import mmap
+import queue
+import re
+import tempfile
 import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
 
-from source.rest_call import put_data
+from source.balancer import STRATEGIES, Balancer, get_balancer, parse_weights, print_distribution
+from source.query_cache import QUERY_CACHE
+from source.rest_call import NodeUnavailable, available_conns, put_data, wait_for_available
+from source import async_rest_call, data_cache
+from source.support import decode_line, percentile, read_lines, read_rows
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
 
 CONNS = []
 LAST_CONN = None
+INSERT_STATS = {}
+INSERT_STATS_LOCK = threading.Lock()
+INSERT_SPANS = {}  # (first start, last end) per table - files of the same table are merged into one INSERT_STATS entry
+NODE_STATS = {}  # rows / requests / PUT latency per operator for the last insert (see balancer.distribution)
+PREFETCH_BATCHES = 8  # payloads read ahead of the sender (per file)
+FAILOVER_TIMEOUT = 60  # max seconds a payload waits for an operator to become reachable
+ENCODERS = ['json', 'orjson', 'auto']  # auto - orjson when installed, otherwise json
+ENCODE_CHUNK_ROWS = 5000  # rows handed to an encoding process at a time
+ENCODE_AHEAD_CHUNKS = 4  # chunks being encoded ahead of the sender (per file)
+ISO_TIMESTAMP = re.compile(r'\d{4}-\d{2}-\d{2}T\d{2}:\d{2}:\d{2}\.\d{6}Z')  # fixed width - sorts as a string
+TIMESTAMP_FORMATS = ['%Y-%m-%dT%H:%M:%S.%fZ', '%Y-%m-%dT%H:%M:%SZ', '%Y-%m-%d %H:%M:%S.%f', '%Y-%m-%d %H:%M:%S']
 ROOT_DIR = os.path.dirname(__file__).rsplit('source', 1)[0]
 DATA_FILES = [os.path.join(ROOT_DIR, 'data', fname) for fname in os.listdir(os.path.join(ROOT_DIR, 'data')) if fname.endswith("json")]
 
-def _sort_data(records:list)->list:
-    for i in range(len(records)):
-        records[i]['timestamp'] = datetime.datetime.strptime(records[i]['timestamp'], "%Y-%m-%dT%H:%M:%S.%fZ")
+def _timestamp_key(timestamp:str)->str:
+    """
+    Sort key for a timestamp - fixed-width ISO-8601 (`...Z`) values are used as is, any other format is validated and
+    converted into that format
+    """
+    if ISO_TIMESTAMP.fullmatch(timestamp):
+        return timestamp
 
-    records.sort(key=lambda item: item["timestamp"])
+    try:
+        value = datetime.datetime.fromisoformat(timestamp)
+    except (TypeError, ValueError):
+        value = None
+        for timestamp_format in TIMESTAMP_FORMATS:
+            try:
+                value = datetime.datetime.strptime(timestamp, timestamp_format)
+                break
+            except (TypeError, ValueError):
+                continue
+    if value is None:
+        raise ValueError(f"Unsupported timestamp format: {timestamp}")
+    if value.tzinfo is not None:
+        value = value.astimezone(datetime.timezone.utc).replace(tzinfo=None)
+    return value.strftime('%Y-%m-%dT%H:%M:%S.%fZ')
 
-    for i in range(len(records)):
-        records[i]['timestamp'] = records[i]['timestamp'].strftime('%Y-%m-%dT%H:%M:%S.%fZ')
 
+def _sort_data(records:list)->list:
+    """
+    Sort records by timestamp - when every timestamp is fixed-width ISO-8601 the strings are compared directly
+    (no parsing), otherwise each timestamp goes through `_timestamp_key`
+    """
+    if all(ISO_TIMESTAMP.fullmatch(record['timestamp']) for record in records):
+        records.sort(key=lambda item: item['timestamp'])
+    else:
+        records.sort(key=lambda item: _timestamp_key(item['timestamp']))
     return records
 
 
-def _insert_data(conns:list, db_name:str, table_name:str, file_path:str, sort_timestamps:bool=False, batch:bool=False):
-    payload = []
+def _read_run(file_path:str):
+    with open(file_path, 'r') as f:
+        for line in f:
+            yield json.loads(line)
+
+
+def _write_run(tmp_dir:str, run_id:int, records:list)->str:
+    file_path = os.path.join(tmp_dir, f"run.{run_id}.json")
     try:
-        with open(file_path, "r") as f:
-            for line in f:
-                line = line.strip()  # remove whitespace at both ends
-                line = line.rstrip(",")  # remove any trailing comma
-                if line:
-                    try:
-                        payload.append(json.loads(line))
-                    except Exception as error:
-                        raise Exception(f"Failed to read content from {file_path} (line: {line} | Error: {error})")
+        with open(file_path, 'w') as f:
+            for record in records:
+                f.write(f"{json.dumps(record)}\n")
     except Exception as error:
-        raise Exception(f"Failed to read content from {file_path} (Error: {error})")
+        raise Exception(f"Failed to write sorted run into {file_path} (Error: {error})")
+    return file_path
 
-    if payload:
-        if sort_timestamps:
-            payload = _sort_data(payload)
-        conn = random.choice(conns)
-        if batch:
-            serialized_payload = json.dumps(payload)
-            put_data(conn=conn, dbms=db_name, table=table_name, payload=serialized_payload)
-        else:
-            for row in payload:
-                serialized_payload = json.dumps(row)
-                put_data(conn=conn, dbms=db_name, table=table_name, payload=serialized_payload)
-                if len(conns) > 1:
-                    last_conn = conn
-                    while last_conn == conn:
-                        conn = random.choice(conns)
+
+def _external_sort(rows, run_size:int):
+    """
+    Sort rows that do not fit in memory - sorted runs of `run_size` rows are spilled to temporary files and then
+    merged lazily
+    """
+    with tempfile.TemporaryDirectory(prefix='anylog-sort-') as tmp_dir:
+        runs = []
+        chunk = []
+        for row in rows:
+            chunk.append(row)
+            if len(chunk) >= run_size:
+                runs.append(_write_run(tmp_dir, len(runs), _sort_data(chunk)))
+                chunk = []
+        if chunk:
+            runs.append(_write_run(tmp_dir, len(runs), _sort_data(chunk)))
+
+        yield from heapq.merge(*[_read_run(run) for run in runs], key=lambda item: _timestamp_key(item['timestamp']))
+
+
+def _sorted_rows(rows, sort_timestamps:bool=False, sort_run_size:int=None):
+    if not sort_timestamps:
+        return rows
+    if sort_run_size:
+        return _external_sort(rows, run_size=sort_run_size)
+    return _sort_data(list(rows))
+
+
+def _get_encoder(encoder:str='json')->str:
+    if encoder not in ENCODERS:
+        raise ValueError(f"Unsupported JSON encoder {encoder} (options: {', '.join(ENCODERS)})")
+    if encoder == 'auto':
+        return 'orjson' if orjson is not None else 'json'
+    if encoder == 'orjson' and orjson is None:
+        raise ImportError("orjson is required for the orjson encoder (pip install orjson)")
+    return encoder
+
+
+def _dumps(row, encoder:str='json'):
+    """
+    :return:
+        str (json) or bytes (orjson - compact separators, sent as is)
+    """
+    return orjson.dumps(row) if encoder == 'orjson' else json.dumps(row)
+
+
+def _payload_size(payload)->int:
+    return len(payload) if isinstance(payload, bytes) else len(payload.encode('utf-8'))
+
+
+def _prefetch(iterable, maxsize:int=PREFETCH_BATCHES):
+    """
+    Consume `iterable` in a background thread, handing items over through a bounded queue - reading / serializing
+    overlaps with sending, while (at most) `maxsize` items are held in memory
+    """
+    items = queue.Queue(maxsize=maxsize)
+    done = object()
+    stop = threading.Event()
+
+    def _put(entry:tuple)->bool:
+        """
+        Wait for room in the queue - False once the consumer stopped (nothing is left to take the item)
+        """
+        while not stop.is_set():
+            try:
+                items.put(entry, timeout=0.5)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _producer():
+        try:
+            for item in iterable:
+                if not _put((item, None)):
+                    return
+            _put((done, None))
+        except Exception as error:
+            _put((done, error))
+
+    t = threading.Thread(target=_producer, daemon=True)
+    t.start()
+    try:
+        while True:
+            item, error = items.get()
+            if item is done:
+                if error:
+                    raise error
+                break
+            yield item
+    finally:
+        stop.set()
+
+
+def _next_conn(conns:list, conn:str=None, balancer:Balancer=None)->str:
+    """
+    Pick the operator for the next payload using `balancer` (default: random, avoiding the previous operator) -
+    operators whose circuit breaker is open are skipped, waiting up to FAILOVER_TIMEOUT for one to recover
+    """
+    available = available_conns(conns) or wait_for_available(conns, timeout=FAILOVER_TIMEOUT)
+    if not available:
+        raise Exception(f"Failed to find an available operator (operators: {', '.join(conns)})")
+    return (balancer or Balancer(conns)).pick(available, conn)
 
 
+def _put_data_failover(conns:list, conn:str, db_name:str, table_name:str, payload:str, balancer:Balancer,
+                       rows:int=1)->str:
+    """
+    PUT a payload - when the operator cannot be reached, the payload is sent to another available operator (or the
+    same one once it recovers) for up to FAILOVER_TIMEOUT seconds
+    :return:
+        operator that accepted the payload
+    """
+    deadline = time.monotonic() + FAILOVER_TIMEOUT
+    while True:
+        balancer.start(conn)
+        put_start = time.perf_counter()
+        try:
+            put_data(conn=conn, dbms=db_name, table=table_name, payload=payload)
+        except NodeUnavailable:
+            balancer.finish(conn, time.perf_counter() - put_start, ok=False)
+            if time.monotonic() >= deadline:
+                raise
+            conn = _next_conn(conns, conn, balancer)
+            continue
+        except Exception:
+            balancer.finish(conn, time.perf_counter() - put_start, ok=False)
+            raise
+        balancer.finish(conn, time.perf_counter() - put_start, table=table_name, rows=rows)
+        return conn
 
-def insert_data(conns:list, db_name:str, sort_timestamps:bool=False, batch:bool=False):
-    threads = []
-    for fname in DATA_FILES:
+
+def _data_files(db_name:str, data_dir:str=None)->list:
+    """
+    Get (file path, db name, table name) for each JSON data file - file name format is [dbms].[table].*.json
+    :args:
+        data_dir:str - directory to read the files from (default: data/)
+    """
+    file_paths = DATA_FILES
+    if data_dir:
+        if not os.path.isdir(data_dir):
+            raise FileNotFoundError(f"Directory {data_dir} not found")
+        file_paths = [os.path.join(data_dir, fname) for fname in sorted(os.listdir(data_dir)) if fname.endswith("json")]
+
+    data_files = []
+    for fname in file_paths:
         if not os.path.isfile(fname):
             raise FileNotFoundError(f"File {fname} not found")
 
-        payload = []
         if not db_name:
-            db_name, table, *_ = fname.split(".")
+            dbms, table, *_ = os.path.basename(fname).split(".")
         else:
-            _, table, *_ = fname.split(".")
+            dbms = db_name
+            _, table, *_ = os.path.basename(fname).split(".")
+        data_files.append((fname, dbms, table))
+    return data_files
+
+
+def data_tables(db_name:str, data_dir:str=None)->list:
+    """
+    Tables the data files are inserted into (several files may feed the same table)
+    """
+    return sorted({table for _, _, table in _data_files(db_name, data_dir=data_dir)})
+
+
+def _join_rows(chunk:list):
+    if isinstance(chunk[0], bytes):
+        return b"[" + b", ".join(chunk) + b"]"
+    return f"[{', '.join(chunk)}]"
+
+
+def _batch_rows(rows:list, batch:bool=False, batch_size:int=None, batch_bytes:int=None, encoder:str='json'):
+    """
+    Serialize rows into PUT payloads
+    :modes:
+        batch                   - the entire list as a single JSON array
+        batch_size / batch_bytes - JSON arrays of up to `batch_size` rows and / or `batch_bytes` bytes
+                                   (a single row larger than `batch_bytes` is sent on its own)
+        otherwise               - one JSON object per payload
+    :yield:
+        (serialized payload - str, or bytes with orjson, number of rows)
+    """
+    if batch:
+        rows = list(rows)
+        if rows:
+            yield _dumps(rows, encoder), len(rows)
+    elif batch_size or batch_bytes:
+        chunk = []
+        chunk_bytes = 2  # surrounding []
+        for row in rows:
+            serialized_row = _dumps(row, encoder)
+            row_bytes = _payload_size(serialized_row) + 2  # separator
+            if chunk and ((batch_size and len(chunk) >= batch_size) or (batch_bytes and chunk_bytes + row_bytes > batch_bytes)):
+                yield _join_rows(chunk), len(chunk)
+                chunk = []
+                chunk_bytes = 2
+            chunk.append(serialized_row)
+            chunk_bytes += row_bytes
+        if chunk:
+            yield _join_rows(chunk), len(chunk)
+    else:
+        for row in rows:
+            yield _dumps(row, encoder), 1
+
+
+def _encode_chunk(items:list, file_path:str, batch_size:int=None, batch_bytes:int=None, encoder:str='json')->list:
+    """
+    Runs in an encoding process - decode raw lines (rows that were already decoded, ex. sorted, are used as is) and
+    serialize them into payloads
+    """
+    rows = [decode_line(item, file_path, encoder) if isinstance(item, (str, bytes)) else item for item in items]
+    return list(_batch_rows(rows, batch_size=batch_size, batch_bytes=batch_bytes, encoder=encoder))
+
+
+def _pool_payloads(pool:ProcessPoolExecutor, items, file_path:str, batch_size:int=None, batch_bytes:int=None,
+                   encoder:str='json'):
+    """
+    Hand chunks of lines (or rows) to `pool` and yield the payloads in file order - up to ENCODE_AHEAD_CHUNKS chunks
+    are encoded ahead of the sender. Chunks hold a multiple of `batch_size` rows, so with `batch_bytes` (only) a payload
+    may also end at a chunk boundary.
+    """
+    chunk_rows = ENCODE_CHUNK_ROWS
+    if batch_size:
+        chunk_rows = batch_size * max(1, ENCODE_CHUNK_ROWS // batch_size)
+    window = collections.deque()
+
+    def _chunks():
+        chunk = []
+        for item in items:
+            chunk.append(item)
+            if len(chunk) >= chunk_rows:
+                yield chunk
+                chunk = []
+        if chunk:
+            yield chunk
+
+    for chunk in _chunks():
+        window.append(pool.submit(_encode_chunk, chunk, file_path, batch_size, batch_bytes, encoder))
+        if len(window) >= ENCODE_AHEAD_CHUNKS:
+            yield from window.popleft().result()
+    while window:
+        yield from window.popleft().result()
+
+
+def _raw_lines(file_path:str):
+    """
+    Memory-map a data file and yield each (non-empty) line as bytes - without surrounding whitespace and trailing
+    comma, and without decoding it
+    """
+    try:
+        with open(file_path, 'rb') as f:
+            if not os.fstat(f.fileno()).st_size:
+                return
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                start = 0
+                size = len(mm)
+                while start < size:
+                    end = mm.find(b'\n', start)
+                    if end == -1:
+                        end = size
+                    line = mm[start:end].strip().rstrip(b',')
+                    if line:
+                        yield line
+                    start = end + 1
+    except Exception as error:
+        raise Exception(f"Failed to read content from {file_path} (Error: {error})")
+
 
-        t = threading.Thread(target=_insert_data, args=(conns, db_name, table, fname, sort_timestamps, batch))
-        t.start()
-        threads.append(t)
+def _raw_batches(lines, batch:bool=False, batch_size:int=None, batch_bytes:int=None):
+    """
+    Pass-through version of `_batch_rows` - payloads are built by joining raw lines (`[` + lines + `]`, see
+    `_raw_lines`), no row is decoded or re-encoded, so the lines must already be valid JSON objects
+    """
+    if batch:
+        chunk = list(lines)
+        if chunk:
+            yield _join_rows(chunk), len(chunk)
+    elif batch_size or batch_bytes:
+        chunk = []
+        chunk_bytes = 2  # surrounding []
+        for line in lines:
+            line_bytes = len(line) + 2  # separator
+            if chunk and ((batch_size and len(chunk) >= batch_size) or (batch_bytes and chunk_bytes + line_bytes > batch_bytes)):
+                yield _join_rows(chunk), len(chunk)
+                chunk = []
+                chunk_bytes = 2
+            chunk.append(line)
+            chunk_bytes += line_bytes
+        if chunk:
+            yield _join_rows(chunk), len(chunk)
+    else:
+        for line in lines:
+            yield line, 1
 
-    for t in threads:
-        t.join()
+
+def _payloads(file_path:str, sort_timestamps:bool=False, batch:bool=False, batch_size:int=None, batch_bytes:int=None,
+              sort_run_size:int=None, encoder:str='json', pool:ProcessPoolExecutor=None, passthrough:bool=False,
+              cache:bool=False):
+    """
+    Read, (optionally) sort and serialize a data file - with `pool` (and not `batch`), decoding and encoding run in
+    the pool's processes, and the threads only read lines and send ready payloads; with `passthrough` the raw lines
+    are sent as is (see `_raw_batches`). With `cache`, sorted inserts take the row order from the columnar cache
+    (source.data_cache) and read the raw lines in that order, so no row is decoded just to be sorted.
+    """
+    lines = data_cache.sorted_lines(file_path) if sort_timestamps and cache else None
+    if passthrough:
+        payloads = _raw_batches(_raw_lines(file_path) if lines is None else lines, batch=batch, batch_size=batch_size,
+                                batch_bytes=batch_bytes)
+    elif pool is not None and not batch:
+        if lines is not None:
+            items = lines
+        elif sort_timestamps:  # rows have to be decoded to be sorted - only the encoding is moved to the pool
+            items = _sorted_rows(read_rows(file_path, encoder), sort_timestamps=True, sort_run_size=sort_run_size)
+        else:
+            items = read_lines(file_path)
+        payloads = _pool_payloads(pool, items, file_path, batch_size=batch_size, batch_bytes=batch_bytes, encoder=encoder)
+    else:
+        if lines is not None:
+            rows = (decode_line(line, file_path, encoder) for line in lines)
+        else:
+            rows = _sorted_rows(read_rows(file_path, encoder), sort_timestamps=sort_timestamps, sort_run_size=sort_run_size)
+        payloads = _batch_rows(rows, batch=batch, batch_size=batch_size, batch_bytes=batch_bytes, encoder=encoder)
+    return _prefetch(payloads)
+
+
+def _record_stats(table_name:str, rows:int, requests:int, seconds:float, batch:bool=False, batch_size:int=None,
+                  batch_bytes:int=None, payload_bytes:int=0, latencies:list=None, passthrough:bool=False,
+                  start:float=None):
+    """
+    Add a file's insert stats to its table - several files ([dbms].[table].*.json) may feed the same table, their rows,
+    requests, bytes and latencies are summed and seconds spans from the first file's start to the last file's end
+    :args:
+        start:float - time.perf_counter() when the file's insert started (default: now - seconds)
+    """
+    if batch:
+        mode = 'single batch'
+    elif batch_size or batch_bytes:
+        mode = 'micro-batch'
+    else:
+        mode = 'row'
+    if passthrough:
+        mode = f"{mode} pass-through"
+    latencies = list(latencies or [])
+    start = time.perf_counter() - seconds if start is None else start
+    end = start + seconds
+    with INSERT_STATS_LOCK:
+        previous = INSERT_STATS.get(table_name)
+        if previous is not None:
+            first, last = INSERT_SPANS[table_name]
+            start, end = min(start, first), max(end, last)
+            seconds = end - start
+            rows += previous['rows']
+            requests += previous['requests']
+            payload_bytes += previous['bytes']
+            latencies = previous['latencies'] + latencies
+        INSERT_SPANS[table_name] = (start, end)
+        INSERT_STATS[table_name] = {
+            'mode': mode,
+            'batch_size': batch_size,
+            'batch_bytes': batch_bytes,
+            'rows': rows,
+            'requests': requests,
+            'seconds': seconds,
+            'rows_sec': rows / seconds if seconds else 0.0,
+            'bytes': payload_bytes,
+            'bytes_sec': payload_bytes / seconds if seconds else 0.0,
+            'latencies': latencies,  # seconds per PUT
+            'latency_ms': {f"p{percent}": percentile(latencies, percent) * 1000 for percent in (50, 95, 99)}
+        }
+
+
+def _insert_data(conns:list, db_name:str, table_name:str, file_path:str, sort_timestamps:bool=False, batch:bool=False,
+                 batch_size:int=None, batch_bytes:int=None, sort_run_size:int=None, balancer:Balancer=None,
+                 encoder:str='json', pool:ProcessPoolExecutor=None, passthrough:bool=False, cache:bool=False):
+    payloads = _payloads(file_path, sort_timestamps=sort_timestamps, batch=batch, batch_size=batch_size,
+                         batch_bytes=batch_bytes, sort_run_size=sort_run_size, encoder=encoder, pool=pool,
+                         passthrough=passthrough, cache=cache)
+    balancer = balancer or Balancer(conns)
+
+    conn = None
+    rows = 0
+    requests = 0
+    payload_bytes = 0
+    latencies = []
+    start = time.perf_counter()
+    for serialized_payload, row_count in payloads:
+        conn = _next_conn(conns, conn, balancer)
+        put_start = time.perf_counter()
+        conn = _put_data_failover(conns, conn, db_name, table_name, serialized_payload, balancer, rows=row_count)
+        latencies.append(time.perf_counter() - put_start)
+        rows += row_count
+        requests += 1
+        payload_bytes += _payload_size(serialized_payload)
+
+    if rows:
+        _record_stats(table_name=table_name, rows=rows, requests=requests, seconds=time.perf_counter() - start,
+                      batch=batch, batch_size=batch_size, batch_bytes=batch_bytes, payload_bytes=payload_bytes,
+                      latencies=latencies, passthrough=passthrough, start=start)
+
+
+def _reset_stats(conns:list, balancer:str='random', weights:dict=None)->Balancer:
+    with INSERT_STATS_LOCK:
+        INSERT_STATS.clear()
+        INSERT_SPANS.clear()
+        NODE_STATS.clear()
+    return get_balancer(balancer, conns, weights=weights)
+
+
+def _record_distribution(balancer:Balancer):
+    with INSERT_STATS_LOCK:
+        NODE_STATS.update(balancer.distribution())
+
+
+def _check_passthrough(passthrough:bool, sort_timestamps:bool, encode_workers:int, cache:bool=False):
+    if passthrough and sort_timestamps and not cache:
+        raise ValueError("Pass-through insert sends lines in file order - sort_timestamps requires the data cache")
+    if passthrough and encode_workers:
+        raise ValueError("Pass-through insert does not encode rows - it cannot be combined with encode_workers")
+
+
+def _encode_pool(encode_workers:int=0):
+    if encode_workers < 0:
+        raise ValueError(f"Invalid number of encoding processes {encode_workers}")
+    return ProcessPoolExecutor(max_workers=encode_workers) if encode_workers else None
+
+
+def insert_data(conns:list, db_name:str, sort_timestamps:bool=False, batch:bool=False, batch_size:int=None,
+                batch_bytes:int=None, sort_run_size:int=None, balancer:str='random', weights:dict=None,
+                encoder:str='json', encode_workers:int=0, passthrough:bool=False, cache:bool=False,
+                data_dir:str=None)->dict:
+    """
+    Insert each data file (as a thread) - all threads share one balancer (`balancer` strategy, see source.balancer),
+    whose per-operator distribution is kept in NODE_STATS. Cached query replies (source.query_cache) are invalidated
+    before and after the insert
+    :args:
+        encoder:str - JSON library used to decode / encode rows (json, orjson or auto)
+        encode_workers:int - decode / encode in a pool of N processes shared by all files (0 - in the file threads)
+        passthrough:bool - send the files' raw lines (memory-mapped) without decoding them
+        cache:bool - sort by the timestamps stored in the columnar cache (source.data_cache, requires numpy)
+        data_dir:str - directory with the JSON data files (default: data/, ex. files from data/get_data.py)
+    :return:
+        per table insert stats (mode, batch size, rows, requests, rows/sec, bytes/sec, PUT latency)
+    """
+    _check_passthrough(passthrough, sort_timestamps, encode_workers, cache)
+    encoder = _get_encoder(encoder)
+    node_balancer = _reset_stats(conns, balancer=balancer, weights=weights)
+    QUERY_CACHE.invalidate()
+
+    pool = _encode_pool(encode_workers)
+    try:
+        threads = []
+        for fname, dbms, table in _data_files(db_name, data_dir=data_dir):
+            t = threading.Thread(target=_insert_data, args=(conns, dbms, table, fname, sort_timestamps, batch, batch_size, batch_bytes, sort_run_size, node_balancer, encoder, pool, passthrough, cache))
+            t.start()
+            threads.append(t)
+
+        for t in threads:
+            t.join()
+    finally:
+        if pool is not None:
+            pool.shutdown(cancel_futures=True)
+        QUERY_CACHE.invalidate()
+
+    _record_distribution(node_balancer)
+    return dict(INSERT_STATS)
+
+
+async def _put_data_async(conns:list, conn:str, dbms:str, table:str, payload:str, semaphore:asyncio.Semaphore,
+                          latencies:list, balancer:Balancer, rows:int=1):
+    """
+    asyncio version of `_put_data_failover` - `balancer.start(conn)` is called by the caller when the task is created
+    """
+    try:
+        put_start = time.perf_counter()
+        deadline = time.monotonic() + FAILOVER_TIMEOUT
+        while True:
+            attempt_start = time.perf_counter()
+            try:
+                await async_rest_call.put_data(conn=conn, dbms=dbms, table=table, payload=payload)
+                break
+            except NodeUnavailable:
+                balancer.finish(conn, time.perf_counter() - attempt_start, ok=False)
+                available = available_conns(conns)
+                while not available and time.monotonic() < deadline:
+                    await asyncio.sleep(0.1)
+                    available = available_conns(conns)
+                if not available or time.monotonic() >= deadline:
+                    raise
+                conn = balancer.pick(available, conn)
+                balancer.start(conn)
+            except Exception:
+                balancer.finish(conn, time.perf_counter() - attempt_start, ok=False)
+                raise
+        balancer.finish(conn, time.perf_counter() - attempt_start, table=table, rows=rows)
+        latencies.append(time.perf_counter() - put_start)
+    finally:
+        semaphore.release()
+
+
+async def _insert_data_async(conns:list, db_name:str, table_name:str, file_path:str, semaphores:dict,
+                             sort_timestamps:bool=False, batch:bool=False, batch_size:int=None, batch_bytes:int=None,
+                             sort_run_size:int=None, balancer:Balancer=None, encoder:str='json',
+                             pool:ProcessPoolExecutor=None, passthrough:bool=False, cache:bool=False):
+    """
+    Same logic as `_insert_data`, but each PUT is scheduled as a task - waiting on the operator's semaphore keeps
+    (at most) `max_inflight` requests open per operator across all files
+    """
+    def _read_payloads():
+        return _payloads(file_path, sort_timestamps=sort_timestamps, batch=batch, batch_size=batch_size,
+                         batch_bytes=batch_bytes, sort_run_size=sort_run_size, encoder=encoder, pool=pool,
+                         passthrough=passthrough, cache=cache)
+
+    payloads = await asyncio.to_thread(_read_payloads)
+    balancer = balancer or Balancer(conns)
+
+    # completed tasks are dropped right away so memory stays bounded by the semaphores
+    pending = set()
+    errors = []
+
+    def _task_done(task:asyncio.Task):
+        pending.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            errors.append(task.exception())
+
+    rows = 0
+    requests = 0
+    payload_bytes = 0
+    latencies = []
+    conn = None
+    start = time.perf_counter()
+    while not errors:
+        item = await asyncio.to_thread(next, payloads, None)
+        if item is None:
+            break
+        serialized_payload, row_count = item
+        if available_conns(conns):
+            conn = _next_conn(conns, conn, balancer)
+        else:  # wait for an operator to recover without blocking the event loop
+            conn = await asyncio.to_thread(_next_conn, conns, conn, balancer)
+        await semaphores[conn].acquire()
+        balancer.start(conn)
+        task = asyncio.create_task(_put_data_async(conns=conns, conn=conn, dbms=db_name, table=table_name,
+                                                   payload=serialized_payload, semaphore=semaphores[conn],
+                                                   latencies=latencies, balancer=balancer, rows=row_count))
+        pending.add(task)
+        task.add_done_callback(_task_done)
+        rows += row_count
+        requests += 1
+        payload_bytes += _payload_size(serialized_payload)
+
+    if pending:
+        await asyncio.gather(*pending, return_exceptions=True)
+    if errors:
+        payloads.close()
+        raise errors[0]
+
+    if rows:
+        _record_stats(table_name=table_name, rows=rows, requests=requests, seconds=time.perf_counter() - start,
+                      batch=batch, batch_size=batch_size, batch_bytes=batch_bytes, payload_bytes=payload_bytes,
+                      latencies=latencies, passthrough=passthrough, start=start)
+
+
+async def _insert_data_async_main(conns:list, db_name:str, sort_timestamps:bool=False, batch:bool=False,
+                                  batch_size:int=None, batch_bytes:int=None, sort_run_size:int=None, max_inflight:int=10,
+                                  balancer:Balancer=None, encoder:str='json', pool:ProcessPoolExecutor=None,
+                                  passthrough:bool=False, cache:bool=False, data_dir:str=None):
+    semaphores = {conn: asyncio.Semaphore(max_inflight) for conn in conns}
+    try:
+        await asyncio.gather(*[
+            _insert_data_async(conns, dbms, table, fname, semaphores, sort_timestamps, batch, batch_size, batch_bytes,
+                               sort_run_size, balancer, encoder, pool, passthrough, cache)
+            for fname, dbms, table in _data_files(db_name, data_dir=data_dir)
+        ])
+    finally:
+        await async_rest_call.close_sessions()
+
+
+def insert_data_async(conns:list, db_name:str, sort_timestamps:bool=False, batch:bool=False, batch_size:int=None,
+                      batch_bytes:int=None, sort_run_size:int=None, max_inflight:int=10, balancer:str='random',
+                      weights:dict=None, encoder:str='json', encode_workers:int=0, passthrough:bool=False,
+                      cache:bool=False, data_dir:str=None)->dict:
+    """
+    asyncio version of `insert_data` - all files are sent from one event loop with up to `max_inflight` PUTs in
+    flight per operator
+    :return:
+        per table insert stats (mode, batch size, rows, requests, rows/sec, bytes/sec, PUT latency)
+    """
+    if max_inflight < 1:
+        raise ValueError(f"Invalid max in-flight value {max_inflight}")
+    _check_passthrough(passthrough, sort_timestamps, encode_workers, cache)
+
+    encoder = _get_encoder(encoder)
+    node_balancer = _reset_stats(conns, balancer=balancer, weights=weights)
+    QUERY_CACHE.invalidate()
+
+    pool = _encode_pool(encode_workers)
+    try:
+        asyncio.run(_insert_data_async_main(conns=conns, db_name=db_name, sort_timestamps=sort_timestamps, batch=batch,
+                                            batch_size=batch_size, batch_bytes=batch_bytes, sort_run_size=sort_run_size,
+                                            max_inflight=max_inflight, balancer=node_balancer, encoder=encoder,
+                                            pool=pool, passthrough=passthrough, cache=cache, data_dir=data_dir))
+    finally:
+        if pool is not None:
+            pool.shutdown(cancel_futures=True)
+        QUERY_CACHE.invalidate()
+    _record_distribution(node_balancer)
+    return dict(INSERT_STATS)
+
+
+def print_insert_stats(stats:dict):
+    for table, table_stats in stats.items():
+        if table_stats['mode'].startswith('micro-batch'):
+            limits = []
+            if table_stats['batch_size']:
+                limits.append(f"{table_stats['batch_size']} rows")
+            if table_stats['batch_bytes']:
+                limits.append(f"{table_stats['batch_bytes']} bytes")
+            mode = f"{table_stats['mode']} ({' / '.join(limits)})"
+        else:
+            mode = table_stats['mode']
+        print(f"  - {table}: {table_stats['rows']} rows in {table_stats['requests']} requests [{mode}] - "
+              f"{table_stats['rows_sec']:.1f} rows/sec, p50 / p99 PUT {table_stats['latency_ms']['p50']:.1f} / "
+              f"{table_stats['latency_ms']['p99']:.1f} ms")
 
 
 if __name__ == '__main__':
@@ -84,6 +725,26 @@ if __name__ == '__main__':
     parse.add_argument('--sort-timestamps', type=bool, nargs='?', const=True, default=False,
                        help='Insert values chronological order')
     parse.add_argument('--batch', type=bool, nargs='?', const=True, default=False, help='Insert a single data in batch')
+    parse.add_argument('--sort-run-size', type=int, default=None,
+                       help='Sort using on-disk runs of N rows (for files that do not fit in memory)')
+    parse.add_argument('--batch-size', type=int, default=None, help='Number of rows per PUT request')
+    parse.add_argument('--batch-bytes', type=int, default=None, help='Max payload size (in bytes) per PUT request')
+    parse.add_argument('--balancer', type=str, choices=STRATEGIES, default='random', help='How the operator for each PUT is chosen')
+    parse.add_argument('--weights', type=str, default=None, help='Operator weights for --balancer weighted (conn=weight,...)')
+    parse.add_argument('--encoder', type=str, choices=ENCODERS, default='json', help='JSON library used to decode / encode rows')
+    parse.add_argument('--encode-workers', type=int, default=0, help='Decode / encode rows in N processes (0 - in the insert threads)')
+    parse.add_argument('--passthrough', type=bool, nargs='?', const=True, default=False,
+                       help='Send the raw (memory-mapped) lines without decoding / re-encoding them')
+    parse.add_argument('--data-cache', type=bool, nargs='?', const=True, default=False,
+                       help='Sort using the columnar data cache (source.data_cache) instead of decoding every row')
+    parse.add_argument('--data-dir', type=str, default=None, help='Directory with the JSON data files (default: data/)')
     args = parse.parse_args()
 
-    insert_data(conn=args.conn.split(","), db_name=args.db_name, sort_timestamps=args.sort_Timestmaps, batch=args.batch)
+    stats = insert_data(conns=args.conn.split(","), db_name=args.db_name, sort_timestamps=args.sort_timestamps,
+                        batch=args.batch, batch_size=args.batch_size, batch_bytes=args.batch_bytes,
+                        sort_run_size=args.sort_run_size, balancer=args.balancer,
+                        weights=parse_weights(args.weights) if args.weights else None, encoder=args.encoder,
+                        encode_workers=args.encode_workers, passthrough=args.passthrough, cache=args.data_cache,
+                        data_dir=args.data_dir)
+    print_insert_stats(stats)
+    print_distribution(dict(NODE_STATS))
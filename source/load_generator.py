@@ -0,0 +1,287 @@
+"""
+Open-loop load generator - requests are sent on a precomputed schedule (constant, Poisson, step or ramp) regardless of
+how fast the node answers, so queueing delay shows up in the results instead of silently lowering the offered load.
+
+Latency is measured from each request's *scheduled* send time (avoiding coordinated omission); `service_ms` is the time
+from the actual send to the response.
+
+:sample:
+    # 60 seconds of Poisson inserts at 50 rows/sec plus 2 queries/sec
+    python3 -m source.load_generator 127.0.0.1:32149 --query 127.0.0.1:32349 --db-name test --profile poisson --rate 50 --query-rate 2
+
+    # find the insert rate an operator sustains with p99 under 500ms
+    python3 -m source.load_generator 127.0.0.1:32149 --db-name test --find-saturation --rate 10 --max-rate 5000 --latency-slo 500
+"""
+import argparse
+import datetime
+import itertools
+import json
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from source.support import percentile
+
+PROFILES = ['constant', 'poisson', 'step', 'ramp']
+
+
+def constant_arrivals(rate:float):
+    """
+    Evenly spaced send times (seconds from start)
+    """
+    if rate <= 0:
+        return
+    for i in itertools.count():
+        yield i / rate
+
+
+def poisson_arrivals(rate:float, seed:int=None):
+    """
+    Send times with exponentially distributed gaps (Poisson process)
+    """
+    if rate <= 0:
+        return
+    rng = random.Random(seed)
+    offset = 0.0
+    while True:
+        yield offset
+        offset += rng.expovariate(rate)
+
+
+def step_arrivals(steps:list, poisson:bool=False, seed:int=None):
+    """
+    Piecewise constant rate
+    :args:
+        steps:list - [(seconds, rate)], the last rate is kept after the final step
+    """
+    rng = random.Random(seed)
+    offset = 0.0
+    step_start = 0.0
+    for index, (seconds, rate) in enumerate(steps):
+        step_end = float('inf') if index == len(steps) - 1 else step_start + seconds
+        if rate <= 0:
+            offset = step_end
+        while offset < step_end and rate > 0:
+            yield offset
+            offset += rng.expovariate(rate) if poisson else 1 / rate
+        step_start = step_end
+        offset = max(offset, step_start)
+
+
+def ramp_arrivals(start_rate:float, end_rate:float, duration:float):
+    """
+    Rate grows (or shrinks) linearly from `start_rate` to `end_rate` over `duration` seconds
+    """
+    offset = 0.0
+    while True:
+        rate = start_rate + (end_rate - start_rate) * min(offset / duration, 1) if duration else end_rate
+        if rate <= 0:
+            return
+        yield offset
+        offset += 1 / rate
+
+
+def arrivals(profile:str, rate:float, duration:float, end_rate:float=None, steps:list=None, seed:int=None):
+    """
+    Build a send schedule
+    :args:
+        profile:str - constant, poisson, step or ramp
+        rate:float - requests/sec (start rate for ramp)
+        duration:float - run length (seconds) - used by ramp
+        end_rate:float - final rate for ramp
+        steps:list - [(seconds, rate)] for step
+        seed:int - random seed for poisson
+    """
+    if profile == 'constant':
+        return constant_arrivals(rate)
+    if profile == 'poisson':
+        return poisson_arrivals(rate, seed=seed)
+    if profile == 'step':
+        if not steps:
+            raise ValueError("step profile requires steps")
+        return step_arrivals(steps, seed=seed)
+    if profile == 'ramp':
+        return ramp_arrivals(rate, rate if end_rate is None else end_rate, duration)
+    raise ValueError(f"Unsupported load profile {profile} (options: {', '.join(PROFILES)})")
+
+
+def parse_steps(steps:str)->list:
+    """
+    "30:5,30:10" -> [(30.0, 5.0), (30.0, 10.0)] (seconds:rate)
+    """
+    try:
+        return [tuple(float(value) for value in step.split(':', 1)) for step in steps.split(',') if step.strip()]
+    except ValueError as error:
+        raise ValueError(f"Invalid steps {steps} - expected seconds:rate,... (Error: {error})")
+
+
+def _summarize(records:list, scheduled:int, duration:float, seconds:float)->dict:
+    latencies = [latency for latency, _, ok in records if ok]
+    service_times = [service for _, service, ok in records if ok]
+    errors = sum(1 for _, _, ok in records if not ok)
+    latency_ms = {f"p{p}": percentile(latencies, p) * 1000 for p in (50, 95, 99)}
+    latency_ms['max'] = max(latencies, default=0) * 1000
+    return {
+        'scheduled': scheduled,
+        'completed': len(latencies),
+        'errors': errors,
+        'seconds': seconds,
+        'offered_rate': scheduled / duration if duration else 0.0,
+        'achieved_rate': len(latencies) / seconds if seconds else 0.0,
+        'latency_ms': latency_ms,
+        'service_ms': {f"p{p}": percentile(service_times, p) * 1000 for p in (50, 95, 99)},
+    }
+
+
+def run_open_loop(send, schedule, duration:float, max_workers:int=64, stop_event:threading.Event=None)->dict:
+    """
+    Call `send()` at each scheduled offset for `duration` seconds
+    :args:
+        send - callable, an exception marks the request as failed
+        schedule - iterable of send times in seconds from start (see `arrivals`)
+        duration:float - seconds to generate load (in-flight requests are awaited afterwards)
+        max_workers:int - concurrent requests; when all are busy requests wait in line, which counts toward latency
+        stop_event:threading.Event - stop scheduling early
+    :return:
+        scheduled / completed / errors, offered vs achieved rate, latency (from scheduled time) and service time
+    """
+    records = []
+    records_lock = threading.Lock()
+    start = time.perf_counter()
+
+    def _send(offset:float):
+        send_start = time.perf_counter()
+        ok = True
+        try:
+            send()
+        except Exception:
+            ok = False
+        end = time.perf_counter()
+        with records_lock:
+            records.append((end - (start + offset), end - send_start, ok))
+
+    scheduled = 0
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        for offset in schedule:
+            if offset >= duration or (stop_event is not None and stop_event.is_set()):
+                break
+            delay = start + offset - time.perf_counter()
+            if delay > 0:
+                if stop_event is not None:
+                    if stop_event.wait(delay):
+                        break
+                else:
+                    time.sleep(delay)
+            executor.submit(_send, offset)
+            scheduled += 1
+
+    return _summarize(records, scheduled, duration, time.perf_counter() - start)
+
+
+def run_streams(streams:dict, duration:float, max_workers:int=64)->dict:
+    """
+    Run several open-loop streams (ex. inserts and queries) side by side
+    :args:
+        streams:dict - {name: (send, schedule)}
+    :return:
+        {name: `run_open_loop` result}
+    """
+    results = {}
+
+    def _run(name:str, send, schedule):
+        results[name] = run_open_loop(send, schedule, duration=duration, max_workers=max_workers)
+
+    threads = [threading.Thread(target=_run, args=(name, send, schedule)) for name, (send, schedule) in streams.items()]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return results
+
+
+def find_saturation(send, start_rate:float, max_rate:float, step_seconds:float=10, growth:float=1.5,
+                    latency_slo_ms:float=1000, max_error_rate:float=0.01, min_throughput:float=0.95,
+                    max_workers:int=64)->dict:
+    """
+    Raise a Poisson load step by step (x `growth`) until the node can no longer keep up
+    :saturated when:
+        - p99 latency (from scheduled time) > latency_slo_ms
+        - errors / scheduled > max_error_rate
+        - achieved rate < offered rate x min_throughput
+    :return:
+        highest sustained rate (requests/sec), whether saturation was reached, and each step's results
+    """
+    rate = start_rate
+    sustained_rate = 0.0
+    steps = []
+    saturated = False
+    while rate <= max_rate:
+        result = run_open_loop(send, poisson_arrivals(rate), duration=step_seconds, max_workers=max_workers)
+        result['rate'] = rate
+        steps.append(result)
+        error_rate = result['errors'] / result['scheduled'] if result['scheduled'] else 0.0
+        if (result['latency_ms']['p99'] > latency_slo_ms or error_rate > max_error_rate
+                or result['achieved_rate'] < result['offered_rate'] * min_throughput):
+            saturated = True
+            break
+        sustained_rate = rate
+        rate *= growth
+    return {'sustained_rate': sustained_rate, 'saturated': saturated, 'steps': steps}
+
+
+def print_load_results(results:dict):
+    for name, result in results.items():
+        print(f"  - {name}: {result['completed']}/{result['scheduled']} ok ({result['errors']} errors) - offered "
+              f"{result['offered_rate']:.1f}/sec, achieved {result['achieved_rate']:.1f}/sec, latency p50 / p95 / p99 "
+              f"{result['latency_ms']['p50']:.1f} / {result['latency_ms']['p95']:.1f} / {result['latency_ms']['p99']:.1f} ms "
+              f"(service p99 {result['service_ms']['p99']:.1f} ms)")
+
+
+def _generate_row()->str:
+    return json.dumps({"timestamp": datetime.datetime.now(datetime.timezone.utc).strftime('%Y-%m-%dT%H:%M:%S.%fZ'),
+                       "value": round(random.random() * 100, 3)})
+
+
+if __name__ == '__main__':
+    parse = argparse.ArgumentParser()
+    parse.add_argument('conn', type=str, default='127.0.0.1:32149', help='REST conn for operator node(s), comma separated')
+    parse.add_argument('--query', type=str, default=None, help='REST conn for query node (enables the query stream)')
+    parse.add_argument('--db-name', type=str, required=True, help='logical database name')
+    parse.add_argument('--table', type=str, default='load_data', help='table to insert into / query')
+    parse.add_argument('--profile', type=str, choices=PROFILES, default='constant', help='insert arrival profile')
+    parse.add_argument('--rate', type=float, default=10, help='inserts/sec (start rate for ramp / saturation search)')
+    parse.add_argument('--end-rate', type=float, default=None, help='final inserts/sec for ramp')
+    parse.add_argument('--steps', type=str, default=None, help='step profile as seconds:rate,... (ex. 30:5,30:10)')
+    parse.add_argument('--query-rate', type=float, default=1, help='queries/sec (poisson)')
+    parse.add_argument('--duration', type=float, default=60, help='seconds to generate load')
+    parse.add_argument('--max-workers', type=int, default=64, help='max concurrent requests per stream')
+    parse.add_argument('--seed', type=int, default=None, help='random seed for poisson arrivals')
+    parse.add_argument('--find-saturation', type=bool, nargs='?', const=True, default=False,
+                       help='search for the highest insert rate the operator sustains')
+    parse.add_argument('--max-rate', type=float, default=10000, help='upper bound for the saturation search')
+    parse.add_argument('--step-seconds', type=float, default=10, help='seconds per saturation search step')
+    parse.add_argument('--latency-slo', type=float, default=1000, help='p99 latency (ms) considered saturated')
+    args = parse.parse_args()
+
+    from source.rest_call import get_data, put_data  # generator core only calls `send` - importable without requests
+    operators = args.conn.split(',')
+
+    def _insert():
+        put_data(conn=random.choice(operators), dbms=args.db_name, table=args.table, payload=_generate_row())
+
+    def _query():
+        get_data(conn=args.query, query=f"sql {args.db_name} format=json and stat=false SELECT COUNT(*) AS row_count FROM {args.table}")
+
+    if args.find_saturation:
+        saturation = find_saturation(_insert, start_rate=args.rate, max_rate=args.max_rate, step_seconds=args.step_seconds,
+                                     latency_slo_ms=args.latency_slo, max_workers=args.max_workers)
+        print_load_results({f"{step['rate']:.1f}/sec": step for step in saturation['steps']})
+        status = 'saturated above' if saturation['saturated'] else 'not saturated up to'
+        print(f"Sustained {saturation['sustained_rate']:.1f} inserts/sec ({status} that rate)")
+    else:
+        streams = {'insert': (_insert, arrivals(args.profile, args.rate, args.duration, end_rate=args.end_rate,
+                                                steps=parse_steps(args.steps) if args.steps else None, seed=args.seed))}
+        if args.query:
+            streams['query'] = (_query, poisson_arrivals(args.query_rate, seed=args.seed))
+        print_load_results(run_streams(streams, duration=args.duration, max_workers=args.max_workers))
@@ -0,0 +1,179 @@
+"""
+Client-side request metrics - latency histograms per (command, node) plus request / byte / error / retry counters,
+filled by rest_call.execute_request (and its asyncio counterpart) and exported as JSON or Prometheus text.
+
+Histograms are HDR-style: values are kept in log-linear buckets (SUB_BUCKETS per power of two), so recording is a
+dict increment and percentiles are accurate to ~1 / SUB_BUCKETS of the value regardless of the range.
+"""
+import math
+import threading
+
+SUB_BUCKETS = 32                # buckets per power of two (~3% relative error)
+QUANTILES = [0.5, 0.9, 0.95, 0.99, 0.999]
+COUNTERS = ['requests', 'errors', 'retries', 'bytes_sent', 'bytes_received']
+
+
+class Histogram:
+    """
+    Log-linear histogram of positive values (seconds)
+    """
+    def __init__(self):
+        self.buckets = {}
+        self.count = 0
+        self.total = 0.0
+        self.min = None
+        self.max = None
+
+    @staticmethod
+    def _index(value:float)->int:
+        mantissa, exponent = math.frexp(value)  # value = mantissa * 2**exponent, 0.5 <= mantissa < 1
+        return exponent * SUB_BUCKETS + int((mantissa - 0.5) * 2 * SUB_BUCKETS)
+
+    @staticmethod
+    def _upper_bound(index:int)->float:
+        exponent, sub_bucket = divmod(index, SUB_BUCKETS)
+        return (0.5 + (sub_bucket + 1) / (2 * SUB_BUCKETS)) * 2 ** exponent
+
+    def record(self, value:float):
+        index = self._index(value) if value > 0 else None
+        self.buckets[index] = self.buckets.get(index, 0) + 1
+        self.count += 1
+        self.total += value
+        if self.min is None or value < self.min:
+            self.min = value
+        if self.max is None or value > self.max:
+            self.max = value
+
+    def percentile(self, percent:float)->float:
+        """
+        Upper bound of the bucket holding the percentile (capped at the largest recorded value)
+        """
+        if not self.count:
+            return 0.0
+        rank = max(1, math.ceil(self.count * percent / 100))
+        seen = self.buckets.get(None, 0)
+        if seen >= rank:
+            return 0.0
+        for index in sorted(key for key in self.buckets if key is not None):
+            seen += self.buckets[index]
+            if seen >= rank:
+                return min(self._upper_bound(index), self.max)
+        return self.max
+
+    def to_dict(self)->dict:
+        return {
+            'count': self.count,
+            'sum': self.total,
+            'min': self.min or 0.0,
+            'max': self.max or 0.0,
+            'mean': self.total / self.count if self.count else 0.0,
+            **{f"p{quantile * 100:g}": self.percentile(quantile * 100) for quantile in QUANTILES}
+        }
+
+
+def command_label(func:str, headers:dict)->str:
+    """
+    Short label for a request - `put` for data, `sql` for queries, otherwise the first two words of the command
+    (ex. `get status`, `blockchain get`, `flush buffers`)
+    """
+    command = (headers or {}).get('command')
+    if not command:
+        return func.lower()
+    words = command.strip().lower().split()
+    if not words:
+        return func.lower()
+    if words[0] == 'sql':
+        return 'sql'
+    return ' '.join(words[:2])
+
+
+class Metrics:
+    """
+    Thread-safe registry - one histogram and one set of counters per (command, node)
+    """
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.histograms = {}
+        self.counters = {}
+        self.enabled = True
+
+    def _counters(self, command:str, conn:str)->dict:
+        counters = self.counters.get((command, conn))
+        if counters is None:
+            counters = self.counters[(command, conn)] = dict.fromkeys(COUNTERS, 0)
+        return counters
+
+    def record_request(self, command:str, conn:str, seconds:float, bytes_sent:int=0, bytes_received:int=0, error:bool=False):
+        if not self.enabled:
+            return
+        with self.lock:
+            counters = self._counters(command, conn)
+            counters['requests'] += 1
+            counters['bytes_sent'] += bytes_sent
+            counters['bytes_received'] += bytes_received
+            if error:
+                counters['errors'] += 1
+            else:
+                histogram = self.histograms.get((command, conn))
+                if histogram is None:
+                    histogram = self.histograms[(command, conn)] = Histogram()
+                histogram.record(seconds)
+
+    def record_retry(self, command:str, conn:str):
+        if not self.enabled:
+            return
+        with self.lock:
+            self._counters(command, conn)['retries'] += 1
+
+    def reset(self):
+        with self.lock:
+            self.histograms.clear()
+            self.counters.clear()
+
+    def to_dict(self)->dict:
+        """
+        {node: {command: {counters..., 'latency_seconds': histogram summary}}}
+        """
+        stats = {}
+        with self.lock:
+            for (command, conn), counters in sorted(self.counters.items()):
+                entry = dict(counters)
+                histogram = self.histograms.get((command, conn))
+                entry['latency_seconds'] = histogram.to_dict() if histogram else Histogram().to_dict()
+                stats.setdefault(conn, {})[command] = entry
+        return stats
+
+    def to_prometheus(self, prefix:str='anylog_client')->str:
+        """
+        Prometheus text exposition format - latency as a summary, everything else as counters
+        """
+        lines = [
+            f"# HELP {prefix}_request_duration_seconds Request latency per command and node",
+            f"# TYPE {prefix}_request_duration_seconds summary",
+        ]
+        with self.lock:
+            for (command, conn), histogram in sorted(self.histograms.items()):
+                labels = f'command="{command}",node="{conn}"'
+                for quantile in QUANTILES:
+                    lines.append(f'{prefix}_request_duration_seconds{{{labels},quantile="{quantile}"}} {histogram.percentile(quantile * 100):.6f}')
+                lines.append(f"{prefix}_request_duration_seconds_sum{{{labels}}} {histogram.total:.6f}")
+                lines.append(f"{prefix}_request_duration_seconds_count{{{labels}}} {histogram.count}")
+            for counter in COUNTERS:
+                name = f"{prefix}_{counter}_total"
+                lines.append(f"# HELP {name} {counter.replace('_', ' ').capitalize()} per command and node")
+                lines.append(f"# TYPE {name} counter")
+                for (command, conn), counters in sorted(self.counters.items()):
+                    lines.append(f'{name}{{command="{command}",node="{conn}"}} {counters[counter]}')
+        return '\n'.join(lines) + '\n'
+
+
+METRICS = Metrics()
+
+
+def print_metrics(stats:dict):
+    for conn, commands in stats.items():
+        for command, entry in commands.items():
+            latency = entry['latency_seconds']
+            print(f"  - {conn} [{command}]: {entry['requests']} requests, {entry['errors']} errors, "
+                  f"{entry['retries']} retries - p50 / p99 {latency['p50'] * 1000:.1f} / {latency['p99'] * 1000:.1f} ms, "
+                  f"{entry['bytes_sent']} bytes sent, {entry['bytes_received']} bytes received")
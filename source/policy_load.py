@@ -0,0 +1,179 @@
+"""
+Synthetic blockchain policies for scale testing - generates cluster / table / operator families, publishes them in
+parallel and measures `blockchain get` latency and how long a new policy takes to become visible on a query node.
+
+Every generated policy has `company` set to `scale-test-[run id]`, so a run's policies can be selected (and told
+apart from real ones) with `where company=...`. Use a local / test master (or source.standin_server) - the policies
+stay on the ledger.
+
+:family (one per table):
+    table       {'dbms', 'name'}
+    cluster     child cluster holding the table - `parent` is a root cluster
+    every FAMILIES_PER_ROOT tables - one root cluster and one operator policy assigned to it
+"""
+import hashlib
+import json
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from source.rest_call import get_data, publish_policy
+from source.support import percentile
+
+SCALE_DBMS = 'scale'          # dbms of the generated table policies
+FAMILIES_PER_ROOT = 10        # tables (child clusters) per root cluster / operator
+PUBLISH_WORKERS = 8           # concurrent insert requests
+POLL_INTERVAL = 0.02          # seconds between visibility checks
+SYNC_TIMEOUT = 60             # max seconds for a policy to become visible
+
+
+def _with_id(policy_type:str, info:dict)->dict:
+    """
+    Set the id the way AnyLog does (md5 of the policy) - children need their parent's id before it is published
+    """
+    policy = {policy_type: info}
+    info['id'] = hashlib.md5(json.dumps(policy, sort_keys=True).encode('utf-8')).hexdigest()
+    return policy
+
+
+def new_run_id()->str:
+    return uuid.uuid4().hex[:12]
+
+
+def company(run_id:str)->str:
+    return f"scale-test-{run_id}"
+
+
+def synthetic_policies(count:int, run_id:str, start:int=0, dbms:str=SCALE_DBMS)->tuple:
+    """
+    At least `count` policies of a run, in whole families (parents before children) - `start` continues a previous
+    call's numbering, so a run can grow in steps without repeating policies
+    :return:
+        (list of {policy type: {...}}, start for the next call)
+    """
+    policies = []
+    root = None
+    family = start
+    while len(policies) < count:
+        if family % FAMILIES_PER_ROOT == 0 or root is None:
+            root = _with_id('cluster', {'name': f"scale-root-{run_id}-{family}", 'company': company(run_id)})
+            policies.append(root)
+            policies.append(_with_id('operator', {'name': f"scale-operator-{run_id}-{family}", 'company': company(run_id),
+                                                  'ip': '127.0.0.1', 'port': 32148, 'rest_port': 32149,
+                                                  'cluster': root['cluster']['id'], 'main': True}))
+        table = f"t_{run_id}_{family}"
+        policies.append(_with_id('cluster', {'name': f"scale-cluster-{run_id}-{family}", 'company': company(run_id),
+                                             'parent': root['cluster']['id'],
+                                             'table': [{'dbms': dbms, 'name': table}]}))
+        policies.append(_with_id('table', {'name': table, 'dbms': dbms, 'company': company(run_id),
+                                           'create': f"CREATE TABLE IF NOT EXISTS {table} (timestamp timestamp, value float)"}))
+        family += 1
+    return policies, family
+
+
+def publish_policies(conn:str, policies:list, master:str=None, workers:int=PUBLISH_WORKERS)->dict:
+    """
+    Publish policies through a pool of `workers` concurrent requests
+    :return:
+        {policies, errors, seconds, policies_sec}
+    """
+    errors = []
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+        futures = [executor.submit(publish_policy, conn, policy, master) for policy in policies]
+        for future in futures:
+            try:
+                future.result()
+            except Exception as error:
+                errors.append(str(error))
+    seconds = time.perf_counter() - start
+    return {'policies': len(policies), 'errors': len(errors), 'first_error': errors[0] if errors else None,
+            'seconds': seconds, 'policies_sec': len(policies) / seconds if seconds else 0.0}
+
+
+def policy_count(conn:str, where:str=None)->int:
+    command = "blockchain get *" + (f" where {where}" if where else "") + " bring.count"
+    text = get_data(conn, command, destination="").text.strip().strip("'\"")
+    try:
+        return int(text or 0)
+    except ValueError:
+        raise Exception(f"Failed to read policy count from {conn} (Error: unexpected reply {text[:200]})")
+
+
+def wait_for_count(conn:str, expected:int, where:str=None, timeout:float=SYNC_TIMEOUT, poll:float=POLL_INTERVAL)->float:
+    """
+    :return:
+        seconds until the query node reports (at least) `expected` policies, None on timeout
+    """
+    start = time.perf_counter()
+    while True:
+        if policy_count(conn, where) >= expected:
+            return time.perf_counter() - start
+        if time.perf_counter() - start > timeout:
+            return None
+        time.sleep(poll)
+
+
+def sync_latency(publisher:str, query:str, run_id:str, samples:int=5, master:str=None, timeout:float=SYNC_TIMEOUT,
+                 poll:float=POLL_INTERVAL)->dict:
+    """
+    Publish `samples` marker policies one at a time and time each from the publish request until the query node
+    returns it (`blockchain get marker where id=...`)
+    :return:
+        {samples, timeouts, seconds: [...], p50, p95, max}
+    """
+    latencies = []
+    timeouts = 0
+    for sample in range(samples):
+        policy = _with_id('marker', {'name': f"scale-marker-{run_id}-{sample}-{time.time_ns()}", 'company': company(run_id)})
+        command = f"blockchain get marker where id={policy['marker']['id']} bring.count"
+        start = time.perf_counter()
+        publish_policy(publisher, policy, master)
+        while True:
+            text = get_data(query, command, destination="").text.strip().strip("'\"")
+            if text and text != '0':
+                latencies.append(time.perf_counter() - start)
+                break
+            if time.perf_counter() - start > timeout:
+                timeouts += 1
+                break
+            time.sleep(poll)
+    return {'samples': samples, 'timeouts': timeouts, 'seconds': latencies,
+            'p50': percentile(latencies, 50), 'p95': percentile(latencies, 95), 'max': max(latencies) if latencies else 0.0}
+
+
+def measure_gets(conn:str, commands:dict, iterations:int=10)->dict:
+    """
+    :args:
+        commands:dict - {name: blockchain get command}
+    :return:
+        {name: {command, p50_ms, p95_ms, max_ms, bytes}}
+    """
+    results = {}
+    for name, command in commands.items():
+        latencies = []
+        size = 0
+        for _ in range(iterations):
+            start = time.perf_counter()
+            response = get_data(conn, command, destination="")
+            latencies.append(time.perf_counter() - start)
+            size = len(response.content)
+        results[name] = {'command': command, 'p50_ms': percentile(latencies, 50) * 1000,
+                         'p95_ms': percentile(latencies, 95) * 1000, 'max_ms': max(latencies) * 1000, 'bytes': size}
+    return results
+
+
+def get_commands(policies:list, dbms:str=SCALE_DBMS)->dict:
+    """
+    `blockchain get` commands measured at each scale step - full dump, by type, by (dbms) and a single id lookup
+    """
+    commands = {
+        'all': "blockchain get *",
+        'count': "blockchain get * bring.count",
+        'clusters': "blockchain get cluster",
+        'tables_by_dbms': f"blockchain get table where dbms={dbms}",
+    }
+    clusters = [policy for policy in policies if 'cluster' in policy]
+    if clusters:
+        commands['cluster_by_id'] = f"blockchain get cluster where id={clusters[-1]['cluster']['id']}"
+    return commands
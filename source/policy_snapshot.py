@@ -0,0 +1,105 @@
+"""
+Snapshot of the blockchain policies - one `blockchain get *` request, indexed by policy type, id, parent and
+(dbms, table), so policy tests run hash lookups instead of one request per policy and nested loops.
+
+A policy is kept as returned by AnyLog - {policy type: {'id': ..., 'parent': ..., ...}}.
+"""
+from source.rest_call import get_data
+
+SNAPSHOT_COMMAND = "blockchain get *"
+
+
+def policy_type(policy:dict)->str:
+    return next(iter(policy))
+
+
+def _table_keys(policy_type:str, info:dict)->list:
+    """
+    (dbms, table) pairs a policy refers to - table policies {'dbms', 'name'}, cluster policies [{'dbms', 'name'}, ...]
+    """
+    if policy_type == 'table':
+        return [(info.get('dbms'), info.get('name'))]
+    tables = info.get('table')
+    if isinstance(tables, dict):
+        tables = [tables]
+    if isinstance(tables, list):
+        return [(table.get('dbms'), table.get('name')) for table in tables if isinstance(table, dict)]
+    return []
+
+
+class PolicySnapshot:
+    def __init__(self, policies:list):
+        self.policies = policies
+        self.by_type = {}     # {type: [policy]}
+        self.by_id = {}       # {id: policy}
+        self.children = {}    # {parent id: [policy]}
+        self.by_table = {}    # {(dbms, table): {type: [policy]}}
+        for policy in policies:
+            if not isinstance(policy, dict) or not policy:
+                continue
+            name = policy_type(policy)
+            info = policy[name] if isinstance(policy[name], dict) else {}
+            self.by_type.setdefault(name, []).append(policy)
+            if info.get('id'):
+                self.by_id[info['id']] = policy
+            if info.get('parent'):
+                self.children.setdefault(info['parent'], []).append(policy)
+            for key in _table_keys(name, info):
+                self.by_table.setdefault(key, {}).setdefault(name, []).append(policy)
+
+    @classmethod
+    def fetch(cls, conn:str):
+        """
+        :raise:
+            Exception - the reply is not a list of policies
+        """
+        result = get_data(conn, SNAPSHOT_COMMAND, destination="")
+        try:
+            policies = result.json()
+        except Exception as error:
+            raise Exception(f"Failed to read policies from {conn} (Error: {error})")
+        if isinstance(policies, dict):  # single policy
+            policies = [policies]
+        if not isinstance(policies, list):
+            raise Exception(f"Failed to read policies from {conn} (Error: unexpected reply {str(policies)[:200]})")
+        return cls(policies)
+
+    def __len__(self):
+        return len(self.policies)
+
+    def get(self, *policy_types:str)->list:
+        """
+        Policies of the given type(s) - in blockchain order
+        """
+        if len(policy_types) == 1:
+            return list(self.by_type.get(policy_types[0], []))
+        return [policy for policy in self.policies if isinstance(policy, dict) and policy and policy_type(policy) in policy_types]
+
+    def count(self, *policy_types:str)->int:
+        return sum(len(self.by_type.get(name, [])) for name in policy_types)
+
+    def policy(self, policy_id:str, policy_type:str=None)->dict:
+        """
+        :return:
+            policy with the given id (and type) - None if not found
+        """
+        policy = self.by_id.get(policy_id)
+        if policy is not None and policy_type is not None and policy_type not in policy:
+            return None
+        return policy
+
+    def table_policies(self, dbms:str, table:str, policy_type:str)->list:
+        return list(self.by_table.get((dbms, table), {}).get(policy_type, []))
+
+    def values(self, policy_type:str, key:str)->list:
+        """
+        Unique (non empty) values of a key across a policy type - ex. values('operator', 'cluster')
+        """
+        values = []
+        seen = set()
+        for policy in self.by_type.get(policy_type, []):
+            value = policy[policy_type].get(key)
+            if value and value not in seen:
+                seen.add(value)
+                values.append(value)
+        return values
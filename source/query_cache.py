@@ -0,0 +1,239 @@
+"""
+Client-side cache of `sql` query replies - used by rest_call.get_data when enabled (anylog_test_suit.py --cache), so
+re-running the tests with --skip-insert against unchanged data does not send the same queries to the node again.
+
+A reply is keyed by (node, normalized command, destination, data generation). The generation is a token stored next
+to the cache and replaced whenever data is inserted (insert_data / put_data) - entries of older generations are never
+returned and their directory is removed. Entries are files, least recently used ones are evicted once the cache grows
+past MAX_BYTES.
+
+Nothing is read or written unless the cache is enabled, and cache I/O errors are printed, never raised - a broken
+cache directory only costs cache hits, never a failed insert or query.
+
+:layout:
+    .cache/queries/generation                   - current generation token
+    .cache/queries/[generation]/[sha256].body   - reply body (mtime = last use)
+"""
+import hashlib
+import os
+import re
+import shutil
+import sys
+import threading
+import uuid
+
+import requests
+from requests.structures import CaseInsensitiveDict
+
+ROOT_DIR = os.path.dirname(__file__).rsplit('source', 1)[0]
+CACHE_DIR = os.path.join(ROOT_DIR, '.cache', 'queries')
+MAX_BYTES = 256 * 1024 * 1024   # size cap - least recently used replies are evicted beyond it
+EVICT_TO = 0.9                  # eviction stops once the cache is below this share of MAX_BYTES
+QUOTED = re.compile(r'("[^"]*"|\'[^\']*\')')
+WHITESPACE = re.compile(r'\s+')
+
+
+def normalize_command(command:str)->str:
+    """
+    Collapse whitespace outside quoted strings - `sql test  format=json "SELECT  1"` and `sql test format=json
+    "SELECT  1"` share an entry, the quoted text is kept as is
+    """
+    parts = QUOTED.split(command.strip())
+    return ''.join(part if index % 2 else WHITESPACE.sub(' ', part) for index, part in enumerate(parts))
+
+
+def cacheable(command:str)->bool:
+    words = (command or '').split(None, 1)
+    return bool(words) and words[0].lower() == 'sql'
+
+
+class QueryCache:
+    """
+    Disk backed LRU cache of query replies (thread-safe, generation shared across processes through the cache dir)
+    """
+    def __init__(self, cache_dir:str=CACHE_DIR, max_bytes:int=MAX_BYTES):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.enabled = False
+        self.lock = threading.Lock()
+        self.size = None    # bytes in the current generation - computed on first store
+        self.generation = None
+        self.used = False   # current generation was read / written since the last invalidation
+        self.warned = set()  # actions that already printed a warning (printed once per process)
+        self.stats = dict.fromkeys(['hits', 'misses', 'stores', 'evictions', 'invalidations'], 0)
+
+    def _generation_file(self)->str:
+        return os.path.join(self.cache_dir, 'generation')
+
+    def _current_generation(self)->str:
+        """
+        Generation token from disk (another process may have inserted data) - created on first use
+        """
+        try:
+            with open(self._generation_file(), 'r') as f:
+                generation = f.read().strip()
+        except OSError:
+            generation = None
+        if not generation:
+            generation = self._new_generation()
+        if generation != self.generation:
+            self.generation = generation
+            self.size = None
+        return generation
+
+    def _new_generation(self)->str:
+        generation = uuid.uuid4().hex
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            tmp_file = f"{self._generation_file()}.{os.getpid()}.tmp"
+            with open(tmp_file, 'w') as f:
+                f.write(generation)
+            os.replace(tmp_file, self._generation_file())
+        except OSError as error:
+            raise Exception(f"Failed to update query cache generation in {self.cache_dir} (Error: {error})")
+        return generation
+
+    def _warn(self, action:str, error:Exception):
+        if action in self.warned:
+            return
+        self.warned.add(action)
+        print(f"Warning: query cache {action} failed in {self.cache_dir} (Error: {error})", file=sys.stderr)
+
+    def _entry_file(self, generation:str, conn:str, command:str, destination:str)->str:
+        key = hashlib.sha256('\0'.join([conn, normalize_command(command), destination or '']).encode('utf-8')).hexdigest()
+        return os.path.join(self.cache_dir, generation, f"{key}.body")
+
+    def get(self, conn:str, command:str, destination:str=None):
+        """
+        :return:
+            cached reply as a requests.Response, None on a miss
+        """
+        with self.lock:
+            try:
+                entry_file = self._entry_file(self._current_generation(), conn, command, destination)
+            except Exception as error:
+                self._warn('read', error)
+                return None
+            try:
+                with open(entry_file, 'rb') as f:
+                    content = f.read()
+                os.utime(entry_file)
+            except OSError:
+                self.stats['misses'] += 1
+                self.used = True
+                return None
+            self.stats['hits'] += 1
+            self.used = True
+
+        response = requests.Response()
+        response.status_code = 200
+        response._content = content
+        response._content_consumed = True
+        response.headers = CaseInsensitiveDict({'Content-Length': str(len(content)), 'X-Query-Cache': 'hit'})
+        response.encoding = 'utf-8'
+        response.url = f"http://{conn}"
+        return response
+
+    def put(self, conn:str, command:str, destination:str, content:bytes):
+        with self.lock:
+            try:
+                entry_file = self._entry_file(self._current_generation(), conn, command, destination)
+                os.makedirs(os.path.dirname(entry_file), exist_ok=True)
+                tmp_file = f"{entry_file}.{threading.get_ident()}.tmp"
+                with open(tmp_file, 'wb') as f:
+                    f.write(content)
+                os.replace(tmp_file, entry_file)
+                self.stats['stores'] += 1
+                self.used = True
+                if self.size is None:
+                    self.size = sum(entry.stat().st_size for entry in os.scandir(os.path.dirname(entry_file)) if entry.is_file())
+                else:
+                    self.size += len(content)
+                if self.size > self.max_bytes:
+                    self._evict(os.path.dirname(entry_file))
+            except Exception as error:
+                self._warn('store', error)
+
+    def _evict(self, generation_dir:str):
+        entries = sorted((entry.stat().st_mtime_ns, entry.stat().st_size, entry.path) for entry in os.scandir(generation_dir)
+                         if entry.is_file() and entry.name.endswith('.body'))
+        self.size = sum(size for _, size, _ in entries)
+        for _, size, path in entries:
+            if self.size <= self.max_bytes * EVICT_TO:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            self.size -= size
+            self.stats['evictions'] += 1
+
+    def invalidate(self):
+        """
+        Start a new generation (data changed) and remove the replies of the previous ones. When the cache is disabled,
+        an existing cache directory (left by an earlier --cache run) is removed instead, so a later run cannot serve
+        replies from before this insert - nothing is written
+        """
+        with self.lock:
+            if not self.enabled:
+                if self.generation is None:
+                    self.generation = ''    # checked once per process
+                    try:
+                        if os.path.isdir(self.cache_dir):
+                            shutil.rmtree(self.cache_dir)
+                    except OSError as error:
+                        self._warn('remove', error)
+                return
+            try:
+                self.generation = self._new_generation()
+                self.size = None
+                self.used = False
+                self.stats['invalidations'] += 1
+                for entry in os.scandir(self.cache_dir):
+                    if entry.is_dir() and entry.name != self.generation:
+                        shutil.rmtree(entry.path, ignore_errors=True)
+            except Exception as error:
+                self.generation = None
+                self._warn('invalidate', error)
+
+    def data_changed(self):
+        """
+        Called for every PUT - only invalidates when this process has not invalidated yet or has used the current
+        generation since, so bulk inserts do not rewrite the generation per request
+        """
+        if self.used or self.generation is None:
+            self.invalidate()
+
+    def clear(self):
+        with self.lock:
+            shutil.rmtree(self.cache_dir, ignore_errors=True)
+            self.generation = None
+            self.size = None
+
+    def to_dict(self)->dict:
+        with self.lock:
+            lookups = self.stats['hits'] + self.stats['misses']
+            return {**self.stats, 'hit_rate': self.stats['hits'] / lookups if lookups else 0.0,
+                    'bytes': self.size or 0, 'max_bytes': self.max_bytes}
+
+
+QUERY_CACHE = QueryCache()
+
+
+def configure_cache(enabled:bool=None, cache_dir:str=None, max_bytes:int=None):
+    if cache_dir is not None:
+        QUERY_CACHE.cache_dir = cache_dir
+        QUERY_CACHE.generation = None
+        QUERY_CACHE.size = None
+    if max_bytes is not None:
+        if max_bytes <= 0:
+            raise ValueError(f'Invalid query cache size {max_bytes}')
+        QUERY_CACHE.max_bytes = max_bytes
+    if enabled is not None:
+        QUERY_CACHE.enabled = enabled
+
+
+def print_cache_stats(stats:dict):
+    print(f"  - {stats['hits']} hits / {stats['misses']} misses ({stats['hit_rate'] * 100:.1f}% hit rate), "
+          f"{stats['stores']} stored, {stats['evictions']} evicted, {stats['invalidations']} invalidations - "
+          f"{stats['bytes'] / 1024 / 1024:.1f} of {stats['max_bytes'] / 1024 / 1024:.0f} MB")
@@ -0,0 +1,311 @@
+"""
+In-process reference engine - loads data/*.json once into columnar NumPy arrays and computes the results the SQL tests
+assert (increments, period, min / max / avg / count, group by), so expected values can be generated in milliseconds
+instead of being maintained by hand.
+
+Columns are written the same way as in AnyLog queries, for example:
+    engine = get_engine()
+    columns, rows = engine.query(table='rand_data',
+                                 columns=['min(timestamp)::ljust(19) as min_ts', 'avg(value)::float(3) as avg_val'],
+                                 increments=('day', 7, 'timestamp'))
+    print(format_table(columns, rows))
+
+:requirements:
+    numpy
+"""
+import os
+import re
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+from source import data_cache
+from source.support import read_rows
+
+ROOT_DIR = os.path.dirname(__file__).rsplit('source', 1)[0]
+DATA_DIR = os.path.join(ROOT_DIR, 'data')
+TIME_UNITS = ['year', 'month', 'day', 'hour', 'minute', 'second']
+COLUMN = re.compile(r'^(?:(min|max|avg|sum|count)\s*\(\s*)?(\*|\w+)(?:\s*\))?(?:::(ljust|float)\((\d+)\))?(?:\s+as\s+(\w+))?$', re.IGNORECASE)
+ENGINE = None
+
+
+class Table:
+    """
+    Columnar copy of a data file - timestamps are datetime64[us], numbers are int64 / float64 (NaN when missing)
+    and everything else is an object or (memory-mapped from source.data_cache) fixed-width unicode array ('' when missing)
+    """
+    def __init__(self, name:str, columns:dict):
+        self.name = name
+        self.columns = columns
+
+    def __len__(self):
+        return len(next(iter(self.columns.values()))) if self.columns else 0
+
+    @classmethod
+    def from_rows(cls, name:str, rows:list, file_path:str=None):
+        return cls(name=name, columns=data_cache.build_columns(rows, file_path=file_path))
+
+    @classmethod
+    def concat(cls, name:str, tables:list):
+        """
+        UNION ALL of tables (missing columns are filled with NaN / '') - used for `include=(...)`
+        """
+        names = []
+        for table in tables:
+            names.extend(column for column in table.columns if column not in names)
+        columns = {}
+        for column in names:
+            parts = []
+            dtype = next(table.columns[column].dtype for table in tables if column in table.columns)
+            for table in tables:
+                if column in table.columns:
+                    parts.append(table.columns[column])
+                elif dtype.kind in 'OU':
+                    parts.append(np.full(len(table), '', dtype=dtype))
+                else:
+                    parts.append(np.full(len(table), np.nan))
+            columns[column] = np.concatenate(parts)
+        return cls(name=name, columns=columns)
+
+
+def _time_fields(timestamps)->list:
+    """
+    [year, month, day, hour, minute, second] arrays for datetime64 values (month and day are 1 based)
+    """
+    years = timestamps.astype('datetime64[Y]')
+    months = timestamps.astype('datetime64[M]')
+    days = timestamps.astype('datetime64[D]')
+    hours = timestamps.astype('datetime64[h]')
+    minutes = timestamps.astype('datetime64[m]')
+    return [
+        years.astype(np.int64) + 1970,
+        (months - years).astype(np.int64) + 1,
+        (days - months).astype(np.int64) + 1,
+        (hours - days).astype(np.int64),
+        (minutes - hours).astype(np.int64),
+        (timestamps.astype('datetime64[s]') - minutes).astype(np.int64),
+    ]
+
+
+def increment_buckets(timestamps, unit:str, units:int):
+    """
+    Group key for `increments(unit, units, column)` - fields above `unit` are kept as is and the `unit` field is
+    divided by `units` (ex. `day, 7` -> year, month, day // 7), which matches AnyLog's grouping
+    """
+    unit = unit.lower().rstrip('s')
+    if unit not in TIME_UNITS:
+        raise ValueError(f"Unsupported increments unit {unit}")
+    index = TIME_UNITS.index(unit)
+    fields = _time_fields(timestamps)
+    key = np.zeros(len(timestamps), dtype=np.int64)
+    for position, field in enumerate(fields[:index + 1]):
+        key = key * (10000 if position == 0 else 100) + (field // units if position == index else field)
+    return key
+
+
+def _shift(timestamp, unit:str, units:int):
+    """
+    Move a datetime64 value back by `units` x `unit`
+    """
+    unit = unit.lower().rstrip('s')
+    if unit in ('year', 'month'):
+        months = units * (12 if unit == 'year' else 1)
+        month_start = timestamp.astype('datetime64[M]')
+        offset = timestamp - month_start.astype(timestamp.dtype)
+        target = month_start - np.timedelta64(months, 'M')
+        days_in_target = ((target + np.timedelta64(1, 'M')).astype('datetime64[D]') - target.astype('datetime64[D]')).astype(np.int64)
+        day_offset = offset.astype('timedelta64[D]').astype(np.int64)
+        if day_offset >= days_in_target:
+            offset -= np.timedelta64(day_offset - days_in_target + 1, 'D')
+        return target.astype(timestamp.dtype) + offset
+    codes = {'week': 'W', 'day': 'D', 'hour': 'h', 'minute': 'm', 'second': 's'}
+    if unit not in codes:
+        raise ValueError(f"Unsupported period unit {unit}")
+    return timestamp - np.timedelta64(units, codes[unit])
+
+
+def _group_index(keys:list)->tuple:
+    """
+    :return:
+        (group id per row, number of groups) - group ids follow the sort order of the keys
+    """
+    combined = np.zeros(len(keys[0]), dtype=np.int64)
+    for key in keys:
+        _, codes = np.unique(key, return_inverse=True)
+        combined = combined * (codes.max() + 1 if len(codes) else 1) + codes
+    _, group_ids = np.unique(combined, return_inverse=True)
+    return group_ids.reshape(-1), int(group_ids.max()) + 1 if len(group_ids) else 0
+
+
+def _to_python(value, dtype):
+    if np.issubdtype(dtype, np.datetime64):
+        return np.datetime_as_string(value, unit='us').replace('T', ' ')
+    if np.issubdtype(dtype, np.integer):
+        return int(value)
+    if np.issubdtype(dtype, np.floating):
+        return None if np.isnan(value) else float(value)
+    if dtype.kind == 'U':
+        return str(value)
+    return value
+
+
+def _cast(value, function:str, size:int):
+    if function is None or value is None:
+        return value
+    if function == 'ljust':
+        return str(value).replace(' ', 'T')[:size]
+    return round(float(value), size)
+
+
+class ReferenceEngine:
+    def __init__(self, data_dir:str=DATA_DIR, cache:bool=True):
+        """
+        :args:
+            data_dir:str - directory with the JSON data files
+            cache:bool - load the columns through source.data_cache (memory-mapped after the first run)
+        """
+        if np is None:
+            raise ImportError("numpy is required for the reference engine (pip install numpy)")
+        self.tables = {}
+        for fname in sorted(os.listdir(data_dir)):
+            if fname.endswith('json'):
+                _, table, *_ = fname.split('.')
+                file_path = os.path.join(data_dir, fname)
+                if cache:
+                    self.tables[table] = Table(name=table, columns=data_cache.load(file_path).columns)
+                else:
+                    self.tables[table] = Table.from_rows(table, list(read_rows(file_path)), file_path=file_path)
+
+    def table(self, name:str, include:list=None)->Table:
+        if name not in self.tables:
+            raise LookupError(f"Table {name} does not exist")
+        if not include:
+            return self.tables[name]
+        return Table.concat(name, [self.tables[name]] + [self.tables[table] for table in include if table != name])
+
+    def period_mask(self, table:Table, unit:str, units:int, date:str, column:str='timestamp'):
+        """
+        period(unit, units, date, column) - rows within `units` x `unit` of the latest timestamp at (or before) date
+        """
+        timestamps = table.columns[column]
+        date = np.datetime64(date.replace(' ', 'T').rstrip('Z'), 'us')
+        candidates = timestamps[timestamps <= date]
+        if not len(candidates):
+            return np.zeros(len(timestamps), dtype=bool)
+        end = candidates.max()
+        return (timestamps >= _shift(end, unit, units)) & (timestamps <= end)
+
+    def query(self, table:str, columns:list, include:list=None, where:dict=None, between:tuple=None, period:tuple=None,
+              increments:tuple=None, group_by:list=None, order_by:list=None)->tuple:
+        """
+        Compute a SELECT
+        :args:
+            table:str - table in FROM
+            columns:list - SELECT list in AnyLog syntax (`column`, `func(column)`, `::ljust(n)`, `::float(n)`, `as alias`)
+            include:list - additional tables (include=(...))
+            where:dict - {column: value or list of values} equality / IN conditions
+            between:tuple - (column, start, end) inclusive range
+            period:tuple - (unit, units, date, column)
+            increments:tuple - (unit, units, column)
+            group_by:list - columns to group by
+            order_by:list - [(output column, descending)]; default is group order
+        :return:
+            (column names, rows)
+        """
+        source = self.table(table, include)
+        mask = np.ones(len(source), dtype=bool)
+        for column, value in (where or {}).items():
+            mask &= np.isin(source.columns[column], value if isinstance(value, (list, tuple)) else [value])
+        if between:
+            column, start, end = between
+            values = source.columns[column]
+            mask &= (values >= np.datetime64(start.replace(' ', 'T'), 'us')) & (values <= np.datetime64(end.replace(' ', 'T'), 'us'))
+        if period:
+            unit, units, date, column = period
+            mask &= self.period_mask(source, unit, units, date, column)
+        data = {column: values[mask] for column, values in source.columns.items()}
+
+        specs = []
+        for column in columns:
+            match = COLUMN.match(column.strip())
+            if not match:
+                raise ValueError(f"Unsupported column {column}")
+            function, name, cast, size, alias = match.groups()
+            specs.append((alias or column.split('::')[0].strip(), function.lower() if function else None, name.lower(), cast, int(size) if size else None))
+        names = [spec[0] for spec in specs]
+
+        if not any(spec[1] for spec in specs):  # raw rows
+            count = int(mask.sum())
+            rows = [[_cast(_to_python(data[name][i], data[name].dtype), cast, size) for _, _, name, cast, size in specs] for i in range(count)]
+        else:
+            keys = []
+            if increments:
+                unit, units, column = increments
+                keys.append(increment_buckets(data[column], unit, units))
+            keys.extend(data[column] for column in (group_by or []))
+            if not len(next(iter(data.values()))):
+                return names, []
+            if keys:
+                group_ids, group_count = _group_index(keys)
+            else:
+                group_ids, group_count = np.zeros(len(next(iter(data.values()))), dtype=np.int64), 1
+
+            order = np.argsort(group_ids, kind='stable')
+            starts = np.searchsorted(group_ids[order], np.arange(group_count))
+            counts = np.bincount(group_ids, minlength=group_count)
+            results = []
+            for alias, function, name, cast, size in specs:
+                if function == 'count':
+                    values = counts if name == '*' else np.add.reduceat(np.asarray(~_missing(data[name][order]), dtype=np.int64), starts)
+                    results.append([int(value) for value in values])
+                    continue
+                values = data[name][order]
+                if function is None:
+                    results.append([_cast(_to_python(values[start], values.dtype), cast, size) for start in starts])
+                    continue
+                is_time = np.issubdtype(values.dtype, np.datetime64)
+                numbers = values.astype(np.int64) if is_time else values.astype(np.float64)
+                if function == 'min':
+                    reduced = np.minimum.reduceat(numbers, starts)
+                elif function == 'max':
+                    reduced = np.maximum.reduceat(numbers, starts)
+                elif function == 'sum':
+                    reduced = np.add.reduceat(numbers, starts)
+                else:
+                    reduced = np.add.reduceat(numbers, starts) / counts
+                if is_time:
+                    column_values = [_to_python(value, values.dtype) for value in reduced.astype(values.dtype)]
+                elif function != 'avg' and np.issubdtype(values.dtype, np.integer):
+                    column_values = [int(value) for value in reduced]
+                else:
+                    column_values = [float(value) for value in reduced]
+                results.append([_cast(value, cast, size) for value in column_values])
+            rows = [list(row) for row in zip(*results)]
+
+        for name, descending in reversed(order_by or []):
+            index = names.index(name)
+            rows.sort(key=lambda row: (row[index] is None, row[index]), reverse=descending)
+        return names, rows
+
+
+def _missing(values):
+    if values.dtype.kind in 'OU':
+        return values == ''
+    if np.issubdtype(values.dtype, np.floating):
+        return np.isnan(values)
+    return np.zeros(len(values), dtype=bool)
+
+
+def get_engine(data_dir:str=DATA_DIR)->ReferenceEngine:
+    """
+    Shared engine - data files are loaded only once per process (from the columnar cache, see source.data_cache)
+    """
+    global ENGINE
+    if ENGINE is None or data_dir != DATA_DIR:
+        engine = ReferenceEngine(data_dir=data_dir)
+        if data_dir != DATA_DIR:
+            return engine
+        ENGINE = engine
+    return ENGINE
@@ -1,20 +1,267 @@
+import json
+import random
+import threading
 import time
+from concurrent.futures import ThreadPoolExecutor
 import requests
+import urllib3
+from requests.adapters import HTTPAdapter
 
-def execute_request(func:str, conn:str, headers:dict, payload:str=None):
-    try:
-        if func.upper() == 'GET':
-            response = requests.get(url=f"http://{conn}", headers=headers)
-        elif func.upper() == 'PUT':
-            response = requests.put(url=f"http://{conn}", headers=headers, data=payload)
-        elif func.upper() == 'POST':
-            response = requests.post(url=f"http://{conn}", headers=headers, data=payload)
-        else:
-            raise ValueError(f'Invalid user input {func.upper()}')
-        response.raise_for_status()
-    except Exception as error:
-        raise Exception(f"Failed to execute {func.upper()} against {conn} (Error;  {error})")
-    return response
+from source.metrics import METRICS, command_label
+from source.query_cache import QUERY_CACHE, cacheable
+
+POOL_SIZE = 10          # max keep-alive connections per node
+CONNECT_TIMEOUT = 10    # seconds to open a TCP connection
+READ_TIMEOUT = 120      # seconds to wait for a response
+FLUSH_SLEEP = 5         # fixed wait after flushing when there is no readiness check
+FLUSH_TIMEOUT = 30      # max seconds to poll a readiness check
+RETRIES = 2             # extra attempts - GET on connection errors, timeouts and 5xx; PUT / POST only when the node could not be reached
+RETRY_BACKOFF = 0.2     # seconds before the first retry - doubles per attempt (full jitter)
+RETRY_BACKOFF_MAX = 5   # max seconds between retries
+BREAKER_THRESHOLD = 5   # consecutive failures before a node is taken out of rotation
+BREAKER_RESET = 10      # seconds before a tripped node is tried again
+SESSIONS = {}
+SESSIONS_LOCK = threading.Lock()
+BREAKERS = {}
+BREAKERS_LOCK = threading.Lock()
+
+
+class NodeUnavailable(Exception):
+    """
+    The request never reached the node (connection refused / connect timeout) - safe to resend, also to another node
+    """
+
+
+class CircuitBreaker:
+    """
+    Per node health - after `threshold` consecutive failures the node is open (skipped) for `reset_timeout` seconds,
+    then half-open: requests go through again, a success closes the breaker and a failure opens it again
+    """
+    def __init__(self, threshold:int=BREAKER_THRESHOLD, reset_timeout:float=BREAKER_RESET):
+        self.threshold = threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at = None
+        self.lock = threading.Lock()
+
+    @property
+    def state(self)->str:
+        with self.lock:
+            if self.opened_at is None:
+                return 'closed'
+            return 'half-open' if time.monotonic() - self.opened_at >= self.reset_timeout else 'open'
+
+    def available(self)->bool:
+        return self.state != 'open'
+
+    def record_success(self):
+        with self.lock:
+            self.failures = 0
+            self.opened_at = None
+
+    def record_failure(self):
+        with self.lock:
+            self.failures += 1
+            if self.failures >= self.threshold:
+                self.opened_at = time.monotonic()
+
+
+def configure_retries(retries:int=None, backoff:float=None, backoff_max:float=None, breaker_threshold:int=None,
+                      breaker_reset:float=None):
+    """
+    Update retry / circuit breaker settings - existing breakers are reset
+    """
+    global RETRIES, RETRY_BACKOFF, RETRY_BACKOFF_MAX, BREAKER_THRESHOLD, BREAKER_RESET
+    if retries is not None:
+        if retries < 0:
+            raise ValueError(f'Invalid number of retries {retries}')
+        RETRIES = retries
+    if backoff is not None:
+        RETRY_BACKOFF = backoff
+    if backoff_max is not None:
+        RETRY_BACKOFF_MAX = backoff_max
+    if breaker_threshold is not None:
+        if breaker_threshold < 1:
+            raise ValueError(f'Invalid circuit breaker threshold {breaker_threshold}')
+        BREAKER_THRESHOLD = breaker_threshold
+    if breaker_reset is not None:
+        BREAKER_RESET = breaker_reset
+    with BREAKERS_LOCK:
+        BREAKERS.clear()
+
+
+def get_breaker(conn:str)->CircuitBreaker:
+    with BREAKERS_LOCK:
+        breaker = BREAKERS.get(conn)
+        if breaker is None:
+            breaker = BREAKERS[conn] = CircuitBreaker(threshold=BREAKER_THRESHOLD, reset_timeout=BREAKER_RESET)
+    return breaker
+
+
+def available_conns(conns:list)->list:
+    """
+    Nodes whose circuit breaker is not open
+    """
+    return [conn for conn in conns if get_breaker(conn).available()]
+
+
+def wait_for_available(conns:list, timeout:float)->list:
+    """
+    Wait (up to `timeout` seconds) until at least one node is available
+    :return:
+        available nodes - empty if none recovered in time
+    """
+    deadline = time.monotonic() + timeout
+    while True:
+        available = available_conns(conns)
+        if available or time.monotonic() >= deadline:
+            return available
+        time.sleep(min(0.1, max(deadline - time.monotonic(), 0)))
+
+
+def breaker_stats()->dict:
+    with BREAKERS_LOCK:
+        breakers = dict(BREAKERS)
+    return {conn: {'state': breaker.state, 'failures': breaker.failures} for conn, breaker in breakers.items()}
+
+
+def retry_backoff(attempt:int)->float:
+    """
+    Seconds to wait before retry `attempt` (1, 2, ...) - exponential with full jitter
+    """
+    return random.uniform(0, min(RETRY_BACKOFF_MAX, RETRY_BACKOFF * 2 ** (attempt - 1)))
+
+
+def configure_pool(pool_size:int=None, connect_timeout:float=None, read_timeout:float=None):
+    """
+    Update connection pool size and / or timeouts - open sessions are closed so new values take effect
+    """
+    global POOL_SIZE, CONNECT_TIMEOUT, READ_TIMEOUT
+    if pool_size is not None:
+        if pool_size < 1:
+            raise ValueError(f'Invalid pool size {pool_size}')
+        POOL_SIZE = pool_size
+    if connect_timeout is not None:
+        CONNECT_TIMEOUT = connect_timeout
+    if read_timeout is not None:
+        READ_TIMEOUT = read_timeout
+    close_sessions()
+
+
+def close_sessions():
+    with SESSIONS_LOCK:
+        for session in SESSIONS.values():
+            session.close()
+        SESSIONS.clear()
+
+
+def _get_session(conn:str)->requests.Session:
+    """
+    Get (or create) the keep-alive session for a node - one session (and connection pool) per conn
+    """
+    with SESSIONS_LOCK:
+        session = SESSIONS.get(conn)
+        if session is None:
+            session = requests.Session()
+            session.mount('http://', HTTPAdapter(pool_connections=1, pool_maxsize=POOL_SIZE))
+            SESSIONS[conn] = session
+    return session
+
+
+def pool_stats()->dict:
+    """
+    Connection reuse per node
+    :hits:   requests sent over an already open (keep-alive) connection
+    :misses: requests that had to open a new TCP connection
+    """
+    stats = {}
+    with SESSIONS_LOCK:
+        for conn, session in SESSIONS.items():
+            adapter = session.get_adapter(f"http://{conn}")
+            num_requests = 0
+            num_connections = 0
+            for key in adapter.poolmanager.pools.keys():
+                pool = adapter.poolmanager.pools.get(key)
+                if pool is not None:
+                    num_requests += pool.num_requests
+                    num_connections += pool.num_connections
+            stats[conn] = {'requests': num_requests, 'hits': num_requests - num_connections, 'misses': num_connections}
+    return stats
+
+
+def _payload_size(payload)->int:
+    if payload is None:
+        return 0
+    return len(payload.encode('utf-8')) if isinstance(payload, str) else len(payload)
+
+
+def _is_connect_error(error:Exception)->bool:
+    if isinstance(error, requests.exceptions.ConnectTimeout):
+        return True
+    if isinstance(error, requests.exceptions.ConnectionError) and error.args:
+        reason = getattr(error.args[0], 'reason', None)
+        return isinstance(reason, (urllib3.exceptions.NewConnectionError, urllib3.exceptions.ConnectTimeoutError))
+    return False
+
+
+def _is_node_error(error:Exception)->bool:
+    """
+    Failure caused by the node / network rather than the request (connection errors, timeouts and 5xx replies)
+    """
+    if isinstance(error, requests.exceptions.HTTPError):
+        return error.response is not None and error.response.status_code >= 500
+    return isinstance(error, (requests.exceptions.ConnectionError, requests.exceptions.Timeout))
+
+
+def execute_request(func:str, conn:str, headers:dict, payload:str=None, stream:bool=False):
+    """
+    Send a request - GET is retried (up to RETRIES times, with jittered exponential backoff) on connection errors,
+    timeouts and 5xx replies; PUT / POST change state (data, `blockchain insert`) and a timed out request may have been
+    applied, so they are retried only when the node could not be reached
+    :args:
+        stream:bool - return once the headers arrive, the body is read with response.iter_content() (the connection
+                      goes back to the pool once the body is consumed or the response is closed)
+    :raise:
+        NodeUnavailable - node could not be reached (after retries) or dropped the connection - callers that fail over
+                          (insert_data) resend the PUT, so a batch the node stored just before going down may repeat
+        Exception - any other failure
+    """
+    session = _get_session(conn)
+    timeout = (CONNECT_TIMEOUT, READ_TIMEOUT)
+    command = command_label(func, headers)
+    breaker = get_breaker(conn)
+    attempt = 0
+    while True:
+        start = time.perf_counter()
+        try:
+            if func.upper() == 'GET':
+                response = session.get(url=f"http://{conn}", headers=headers, timeout=timeout, stream=stream)
+            elif func.upper() == 'PUT':
+                response = session.put(url=f"http://{conn}", headers=headers, data=payload, timeout=timeout)
+            elif func.upper() == 'POST':
+                response = session.post(url=f"http://{conn}", headers=headers, data=payload, timeout=timeout)
+            else:
+                raise ValueError(f'Invalid user input {func.upper()}')
+            response.raise_for_status()
+        except Exception as error:
+            METRICS.record_request(command, conn, time.perf_counter() - start, bytes_sent=_payload_size(payload), error=True)
+            unreachable = _is_connect_error(error)
+            node_error = _is_node_error(error)
+            if node_error:
+                breaker.record_failure()
+            if attempt < RETRIES and (unreachable or (node_error and func.upper() == 'GET')):
+                attempt += 1
+                METRICS.record_retry(command, conn)
+                time.sleep(retry_backoff(attempt))
+                continue
+            if unreachable or isinstance(error, requests.exceptions.ConnectionError):
+                raise NodeUnavailable(f"Failed to execute {func.upper()} against {conn} (Error;  {error})")
+            raise Exception(f"Failed to execute {func.upper()} against {conn} (Error;  {error})")
+        breaker.record_success()
+        bytes_received = int(response.headers.get('Content-Length') or 0) if stream else len(response.content)
+        METRICS.record_request(command, conn, time.perf_counter() - start, bytes_sent=_payload_size(payload),
+                               bytes_received=bytes_received)
+        return response
 
 
 def put_data(conn:str, payload:str, dbms:str, table:str):
@@ -26,10 +273,17 @@ def put_data(conn:str, payload:str, dbms:str, table:str):
         'Content-Type': 'text/plain'
     }
 
+    QUERY_CACHE.data_changed()
     execute_request(func='PUT', conn=conn, headers=headers, payload=payload)
 
 
-def get_data(conn:str, query:str, destination:str='network'):
+def get_data(conn:str, query:str, destination:str='network', stream:bool=False, cache:bool=None):
+    """
+    Send a command to a node
+    :args:
+        stream:bool - see execute_request (ignored for replies served from / stored in the query cache)
+        cache:bool - use the query cache for `sql` commands (default: enabled with query_cache.configure_cache)
+    """
     headers = {
         'command': query,
         'User-Agent': 'AnyLog/1.23',
@@ -37,18 +291,137 @@ def get_data(conn:str, query:str, destination:str='network'):
     if destination:
         headers['destination'] = destination
 
-    return execute_request(func='GET', conn=conn, headers=headers, payload=None)
+    if (QUERY_CACHE.enabled if cache is None else cache) and cacheable(query):
+        response = QUERY_CACHE.get(conn, query, destination)
+        if response is None:
+            response = execute_request(func='GET', conn=conn, headers=headers, payload=None)
+            QUERY_CACHE.put(conn, query, destination, response.content)
+        return response
 
+    return execute_request(func='GET', conn=conn, headers=headers, payload=None, stream=stream)
 
-def flush_buffer(conn:(str or list)):
+
+def publish_policy(conn:str, policy:dict, master:str=None):
     """
-    Code to flush insert data buffers
+    Add a policy to the blockchain - the policy is sent as the request body (`<new_policy={...}>`)
+    :args:
+        conn:str - node that publishes the policy
+        policy:dict - {policy type: {...}}
+        master:str - master node IP:port (default: the node's local ledger only)
+    """
+    command = "blockchain insert where policy=!new_policy and local=true"
+    if master:
+        command += f" and master={master}"
+    headers = {
+        'command': command,
+        'User-Agent': 'AnyLog/1.23',
+    }
+
+    return execute_request(func='POST', conn=conn, headers=headers, payload=f"<new_policy={json.dumps(policy)}>")
+
+
+def _row_count(conn:str, db_name:str, table:str)->int:
+    query = f"sql {db_name} format=json and stat=false select count(*) as row_count from {table}"
+    return int(get_data(conn, query, cache=False).json()['Query'][0]['row_count'])
+
+
+def row_counts(conn:str, db_name:str, tables:list)->dict:
+    """
+    Current row count per table - taken before an insert, as the baseline for `rows_ready`
+    :return:
+        {table name: row count} - 0 for tables that do not exist (yet)
+    """
+    counts = {}
+    for table in tables:
+        try:
+            counts[table] = _row_count(conn, db_name, table)
+        except Exception:  # table is created by the first flush
+            counts[table] = 0
+    return counts
+
+
+def rows_ready(conn:str, db_name:str, expected:dict, baseline:dict=None):
+    """
+    Build a readiness check for `flush_buffer` - True once each table has (at least) its baseline plus the expected
+    number of rows
+    :args:
+        conn:str - node to query (query node)
+        db_name:str - logical database
+        expected:dict - {table name: rows inserted}
+        baseline:dict - {table name: row count before the insert} (see `row_counts`) - without it, rows already in the
+                        table count as flushed
+    """
+    baseline = baseline or {}
+
+    def _ready()->bool:
+        for table, row_count in expected.items():
+            try:
+                if _row_count(conn, db_name, table) < baseline.get(table, 0) + row_count:
+                    return False
+            except Exception:  # table may not exist until the first flush lands
+                return False
+        return True
+
+    return _ready
+
+
+def wait_ready(ready, timeout:float=FLUSH_TIMEOUT, min_wait:float=0.1, max_wait:float=2)->bool:
+    """
+    Poll `ready` with exponential backoff until it returns True or `timeout` seconds pass
+    """
+    deadline = time.monotonic() + timeout
+    wait_time = min_wait
+    while True:
+        if ready():
+            return True
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            return False
+        time.sleep(min(wait_time, remaining))
+        wait_time = min(wait_time * 2, max_wait)
+
+
+def flush_buffer(conn:(str or list), ready=None, timeout:float=FLUSH_TIMEOUT, sleep_time:float=FLUSH_SLEEP)->bool:
+    """
+    Code to flush insert data buffers - nodes are flushed in parallel. Nodes whose circuit breaker is open are skipped
+    and nodes that cannot be reached are reported as a warning (their rows were failed over to the other operators) -
+    `ready` decides whether the data arrived
+    :args:
+        conn:(str or list) - operator node(s)
+        ready - callable that returns True once the flushed data is visible (see `rows_ready`), polled with backoff
+        timeout:float - max seconds to poll `ready`
+        sleep_time:float - fixed wait used only when `ready` is not set
+    :return:
+        False if `ready` did not pass before timeout, True otherwise
+    :raise:
+        NodeUnavailable - none of the nodes could be flushed
     """
     headers = {"command": "flush buffers", "User-Agent": "AnyLog/1.23"}
-    if isinstance(conn, str):
-        execute_request(func='POST', conn=conn, headers=headers, payload=None)
-    else:
-        for con in conn:
-            execute_request(func='POST', conn=con, headers=headers, payload=None)
-    time.sleep(5)
+    conns = [conn] if isinstance(conn, str) else conn
+    QUERY_CACHE.data_changed()
+    available = available_conns(conns) if len(conns) > 1 else conns
+    errors = {con: 'circuit breaker open' for con in conns if con not in available}
+    if len(available) == 1:
+        try:
+            execute_request(func='POST', conn=available[0], headers=headers, payload=None)
+        except NodeUnavailable as error:
+            errors[available[0]] = error
+    elif available:
+        with ThreadPoolExecutor(max_workers=len(available)) as executor:
+            futures = {con: executor.submit(execute_request, func='POST', conn=con, headers=headers, payload=None) for con in available}
+            for con, future in futures.items():
+                try:
+                    future.result()
+                except NodeUnavailable as error:
+                    errors[con] = error
+
+    if len(errors) == len(conns):
+        raise NodeUnavailable(f"Failed to flush buffers on {', '.join(conns)} (Error: {errors})")
+    for con, error in errors.items():
+        print(f"Warning: skipped flushing buffers on {con} (Error: {error})")
 
+    if ready is not None:
+        return wait_ready(ready, timeout=timeout)
+    if sleep_time:
+        time.sleep(sleep_time)
+    return True
@@ -0,0 +1,622 @@
+"""
+Local stand-in for an AnyLog / EdgeLake node's REST API, used to run the insert and query paths offline (laptop, CI,
+benchmarks) at local speed. A single stand-in plays operator, query and master at once.
+
+It speaks the same header protocol as `source.rest_call`:
+    PUT  - `type`, `dbms`, `table`, `mode` headers + JSON row(s) as body; `mode=streaming` rows are buffered until
+           `flush buffers`, any other mode is stored right away
+    GET / POST - `command` header (`destination` is accepted and ignored)
+        get status [where format=json]
+        flush buffers
+        sql [dbms] format=[json|table] [and stat=false] [and include=(...)] [and extend=(@table_name)] SELECT ...
+        blockchain insert / push        - policy as body (`<new_policy={...}>` or plain JSON)
+        blockchain get [*|type|(type, ...)] [where key=value [and ...]] [bring.count|bring.first|bring.last]
+
+Data is kept in SQLite (one database per dbms - in memory, or in --data-dir). The SQL support is a subset of
+AnyLog's: plain SQLite SELECT statements plus `increments(unit, n, column)`, `period(unit, n, 'date', column)`,
+`::ljust(n)` / `::float(n)` casts, `include` and `extend=(@table_name)`.
+
+Policies are kept in memory; --sync-delay makes a new policy visible only after N seconds, like a query node that
+picks up the master's ledger on its next `blockchain sync`.
+
+:sample call:
+    python3 -m source.standin_server --port 32149
+"""
+import argparse
+import datetime
+import hashlib
+import json
+import math
+import os
+import re
+import sqlite3
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from source.table_format import format_table
+
+STREAMING_THRESHOLD = 10000  # rows buffered per table before it is flushed automatically
+
+INCREMENT_UNITS = {  # unit -> (prefix length to group on, (start, length) of the unit field)
+    'year': (0, (1, 4)),
+    'month': (4, (6, 2)),
+    'day': (7, (9, 2)),
+    'hour': (10, (12, 2)),
+    'minute': (13, (15, 2)),
+    'second': (16, (18, 2)),
+}
+PERIOD_UNITS = ['second', 'minute', 'hour', 'day', 'week', 'month', 'year']
+
+SQL_COMMAND = re.compile(r'^sql\s+(\S+)\s+(.*?)\s*"?\s*(select\b.*?)\s*;?\s*"?\s*$', re.IGNORECASE | re.DOTALL)
+INCREMENTS = re.compile(r'increments\s*\(\s*(\w+)\s*,\s*(\d+)\s*,\s*(\w+)\s*\)', re.IGNORECASE)
+PERIOD = re.compile(r'period\s*\(\s*(\w+)\s*,\s*(\d+)\s*,\s*["\']([^"\']+)["\']\s*,\s*(\w+)\s*\)', re.IGNORECASE)
+CAST = re.compile(r'((?:\w+\s*\([^()]*\))|\w+)::(ljust|float)\((\d+)\)(\s+as\s+\w+)?', re.IGNORECASE)
+DUPLICATE_ALIAS = re.compile(r'(\bas\s+(\w+))(?:\s+as\s+\2\b)+', re.IGNORECASE)
+TIMESTAMP_LITERAL = re.compile(r"'(\d{4}-\d{2}-\d{2}[ T]\d{2}:\d{2}:\d{2})(\.\d+)?Z?'")
+ORDER_DIRECTION = re.compile(r'\s+(asc|desc)$', re.IGNORECASE)
+AGGREGATE = re.compile(r'\b(count|min|max|avg|sum)\s*\(', re.IGNORECASE)
+BLOCKCHAIN_GET = re.compile(r'^blockchain\s+get\s+(\*|\w+|\([^)]*\))\s*(?:where\s+(.*?))?\s*(?:bring\.(\w+))?\s*$', re.IGNORECASE | re.DOTALL)
+CONDITION = re.compile(r'\s*(\w+)\s*=\s*("[^"]*"|\'[^\']*\'|\S+)\s*(?:and\b|$)', re.IGNORECASE)
+
+
+def _split_columns(select_list:str)->list:
+    """
+    Split a SELECT list on top-level commas
+    """
+    columns = []
+    depth = 0
+    current = ''
+    for char in select_list:
+        if char == '(':
+            depth += 1
+        elif char == ')':
+            depth -= 1
+        if char == ',' and depth == 0:
+            columns.append(current.strip())
+            current = ''
+        else:
+            current += char
+    if current.strip():
+        columns.append(current.strip())
+    return columns
+
+
+def _clause_positions(statement:str)->dict:
+    """
+    Location of top-level FROM / WHERE / GROUP BY / ORDER / LIMIT keywords (ignoring sub-queries and quoted text)
+    """
+    positions = {}
+    depth = 0
+    quote = None
+    upper = statement.upper()
+    for index, char in enumerate(statement):
+        if quote:
+            if char == quote:
+                quote = None
+            continue
+        if char in ('"', "'"):
+            quote = char
+        elif char == '(':
+            depth += 1
+        elif char == ')':
+            depth -= 1
+        elif depth == 0 and (index == 0 or not (statement[index - 1].isalnum() or statement[index - 1] == '_')):
+            for keyword in ['FROM', 'WHERE', 'GROUP BY', 'ORDER', 'LIMIT']:
+                end = index + len(keyword)
+                if keyword not in positions and upper.startswith(keyword, index) and (end == len(statement) or not (statement[end].isalnum() or statement[end] == '_')):
+                    positions[keyword] = index
+    return positions
+
+
+def _split_statement(statement:str)->dict:
+    """
+    Split a SELECT statement into its clauses - {'select', 'from', 'where', 'group by', 'order', 'limit'}
+    """
+    positions = _clause_positions(statement)
+    if 'FROM' not in positions:
+        raise ValueError(f"Missing FROM in: {statement}")
+    ordered = sorted(positions.items(), key=lambda item: item[1])
+    clauses = {'select': statement[len('select'):positions['FROM']].strip()}
+    for index, (keyword, start) in enumerate(ordered):
+        end = ordered[index + 1][1] if index + 1 < len(ordered) else len(statement)
+        clauses[keyword.lower()] = statement[start + len(keyword):end].strip()
+    return clauses
+
+
+def _shift(timestamp:datetime.datetime, unit:str, units:int)->datetime.datetime:
+    """
+    Move `timestamp` back by `units` x `unit`
+    """
+    if unit in ('month', 'year'):
+        months = units * (12 if unit == 'year' else 1)
+        month_index = timestamp.year * 12 + timestamp.month - 1 - months
+        year, month = divmod(month_index, 12)
+        day = min(timestamp.day, [31, 29 if year % 4 == 0 and (year % 100 != 0 or year % 400 == 0) else 28, 31, 30,
+                                  31, 30, 31, 31, 30, 31, 30, 31][month])
+        return timestamp.replace(year=year, month=month + 1, day=day)
+    return timestamp - datetime.timedelta(**{f"{unit}s": units})
+
+
+def _normalize_timestamp(value:str)->str:
+    """
+    AnyLog stores timestamps as `YYYY-MM-DD HH:MM:SS.ffffff`
+    """
+    if isinstance(value, str):
+        match = TIMESTAMP_LITERAL.fullmatch(f"'{value}'")
+        if match:
+            fraction = (match.group(2) or '.')[1:]
+            return f"{match.group(1).replace('T', ' ')}.{fraction.ljust(6, '0')[:6]}"
+    return value
+
+
+def _order_by(order:str)->str:
+    """
+    AnyLog applies a trailing ASC / DESC to every ORDER BY key without its own direction - `ORDER BY timestamp,
+    monitor_id DESC` sorts both columns descending
+    """
+    keys = _split_columns(order)
+    direction = ORDER_DIRECTION.search(keys[-1]) if keys else None
+    if not direction:
+        return order
+    return ', '.join(key if ORDER_DIRECTION.search(key) else f"{key} {direction.group(1)}" for key in keys)
+
+
+class _ExactAvg:
+    """
+    avg() over the correctly rounded sum (math.fsum) - AnyLog's averages do not depend on summation order, SQLite's
+    running sum can differ in the last digit (ex. 160.8315 instead of 160.83149999999998 before ::float(3))
+    """
+    def __init__(self):
+        self.values = []
+
+    def step(self, value):
+        if value is not None:
+            self.values.append(float(value))
+
+    def finalize(self):
+        return math.fsum(self.values) / len(self.values) if self.values else None
+
+
+def _float_round(value, digits:int):
+    """
+    ::float(n) - Python rounding (SQLite's round() differs on values like 181.6035)
+    """
+    return None if value is None else round(float(value), digits)
+
+
+class StandinNode:
+    """
+    Storage and command processing for the stand-in - thread safe
+    """
+    def __init__(self, data_dir:str=None, node_name:str='standin', sync_delay:float=0):
+        self.data_dir = data_dir
+        self.node_name = node_name
+        self.sync_delay = sync_delay
+        self.lock = threading.RLock()
+        self.databases = {}
+        self.columns = {}  # (dbms, table) -> {column: type}
+        self.buffers = {}  # (dbms, table) -> [rows]
+        self.policies = []      # [(visible at, policy)] in insert order
+        self.policy_ids = {}    # id -> (visible at, policy)
+
+    # ---------------- storage ----------------
+    def _connection(self, dbms:str)->sqlite3.Connection:
+        conn = self.databases.get(dbms)
+        if conn is None:
+            path = os.path.join(self.data_dir, f"{dbms}.db") if self.data_dir else ':memory:'
+            conn = sqlite3.connect(path, check_same_thread=False)
+            conn.create_function('float_round', 2, _float_round, deterministic=True)
+            conn.create_aggregate('avg', 1, _ExactAvg)
+            self.databases[dbms] = conn
+            for (table,) in conn.execute("SELECT name FROM sqlite_master WHERE type='table'").fetchall():
+                self.columns[(dbms, table)] = {row[1]: row[2] for row in conn.execute(f'PRAGMA table_info("{table}")')}
+        return conn
+
+    def _ensure_columns(self, dbms:str, table:str, rows:list):
+        conn = self._connection(dbms)
+        columns = self.columns.get((dbms, table))
+        if columns is None:
+            conn.execute(f'CREATE TABLE "{table}" (row_id INTEGER PRIMARY KEY, insert_timestamp TEXT)')
+            columns = self.columns[(dbms, table)] = {'row_id': 'INTEGER', 'insert_timestamp': 'TEXT'}
+        for row in rows:
+            for key, value in row.items():
+                if key not in columns:
+                    if isinstance(value, bool) or not isinstance(value, (int, float)):
+                        column_type = 'TEXT'
+                    elif isinstance(value, int):
+                        column_type = 'INTEGER'
+                    else:
+                        column_type = 'REAL'
+                    conn.execute(f'ALTER TABLE "{table}" ADD COLUMN "{key}" {column_type}')
+                    columns[key] = column_type
+
+    def store(self, dbms:str, table:str, rows:list):
+        rows = [{key.lower(): _normalize_timestamp(value) for key, value in row.items()} for row in rows]
+        insert_timestamp = datetime.datetime.now(datetime.timezone.utc).strftime('%Y-%m-%d %H:%M:%S.%f')
+        with self.lock:
+            self._ensure_columns(dbms, table, rows)
+            conn = self._connection(dbms)
+            groups = {}  # rows with the same set of columns are inserted together
+            for row in rows:
+                groups.setdefault(tuple(sorted(row)), []).append(row)
+            for keys, subset in groups.items():
+                names = ', '.join(f'"{key}"' for key in keys)
+                values = ', '.join('?' for _ in keys)
+                conn.executemany(f'INSERT INTO "{table}" (insert_timestamp, {names}) VALUES (?, {values})',
+                                 [(insert_timestamp, *[row[key] for key in keys]) for row in subset])
+            conn.commit()
+
+    def put(self, dbms:str, table:str, mode:str, payload:bytes):
+        rows = json.loads(payload)
+        if isinstance(rows, dict):
+            rows = [rows]
+        if not isinstance(rows, list) or not all(isinstance(row, dict) for row in rows):
+            raise ValueError("Payload must be a JSON object or a list of JSON objects")
+        rows = [row for row in rows if row.get('timestamp') is not None]  # AnyLog rejects rows without a timestamp
+
+        if mode == 'streaming':
+            with self.lock:
+                buffer = self.buffers.setdefault((dbms, table), [])
+                buffer.extend(rows)
+                if len(buffer) < STREAMING_THRESHOLD:
+                    return
+                self.buffers[(dbms, table)] = []
+            self.store(dbms, table, buffer)
+        else:
+            self.store(dbms, table, rows)
+
+    def flush(self):
+        with self.lock:
+            buffers = self.buffers
+            self.buffers = {}
+        for (dbms, table), rows in buffers.items():
+            if rows:
+                self.store(dbms, table, rows)
+
+    # ---------------- queries ----------------
+    def _tables(self, dbms:str)->list:
+        return [table for (db, table) in self.columns if db == dbms]
+
+    def _source(self, dbms:str, table:str, include:list, extend:bool)->str:
+        """
+        FROM target - the table itself, or a UNION ALL of the table and included tables when include / extend are used
+        """
+        if not include and not extend:
+            return f'"{table}"'
+
+        tables = [table] + [name for name in include if name != table]
+        columns = []
+        for name in tables:
+            for column in self.columns.get((dbms, name), {}):
+                if column not in columns:
+                    columns.append(column)
+        selects = []
+        for name in tables:
+            if (dbms, name) not in self.columns:
+                continue
+            table_columns = self.columns[(dbms, name)]
+            select_list = ', '.join(f'"{column}"' if column in table_columns else f'NULL AS "{column}"' for column in columns)
+            selects.append(f"SELECT {select_list}, '{name}' AS table_name FROM main.\"{name}\"")
+        return f"({' UNION ALL '.join(selects)}) AS \"{table}\""
+
+    def _period_condition(self, conn:sqlite3.Connection, source:str, match)->str:
+        """
+        period(unit, n, date, column) - the range of `n` units that ends with the latest timestamp at (or before) date
+        """
+        unit, units, date, column = match.group(1).lower().rstrip('s'), int(match.group(2)), match.group(3), match.group(4)
+        if unit not in PERIOD_UNITS:
+            raise ValueError(f"Unsupported period unit {unit}")
+        end = conn.execute(f'SELECT max("{column}") FROM {source} WHERE "{column}" <= ?', (_normalize_timestamp(date),)).fetchone()[0]
+        if end is None:
+            return '0'
+        end_timestamp = datetime.datetime.strptime(end, '%Y-%m-%d %H:%M:%S.%f')
+        if unit == 'week':
+            unit, units = 'day', units * 7
+        start = _shift(end_timestamp, unit, units).strftime('%Y-%m-%d %H:%M:%S.%f')
+        return f"(\"{column}\" >= '{start}' AND \"{column}\" <= '{end}')"
+
+    def translate(self, dbms:str, select:str, include:list=None, extend:list=None):
+        """
+        Convert an AnyLog SELECT statement into SQLite
+        :return:
+            (sqlite statement, output columns)
+        """
+        conn = self._connection(dbms)
+        statement = DUPLICATE_ALIAS.sub(r'\1', select.strip())
+        statement = TIMESTAMP_LITERAL.sub(lambda match: f"'{_normalize_timestamp(match.group(0)[1:-1])}'", statement)
+        clauses = _split_statement(statement)
+
+        table = clauses['from'].split()[0].strip('"')
+        if (dbms, table) not in self.columns:
+            raise LookupError(f"Table {dbms}.{table} does not exist")
+        extend_table = bool(extend) and '@table_name' in extend
+        source = self._source(dbms, table, include or [], extend_table)
+
+        # SELECT list - casts, increments and extend
+        columns = []
+        groups = []
+        for column in _split_columns(clauses['select']):
+            increments = INCREMENTS.fullmatch(column)
+            if increments:
+                unit, units, ts_column = increments.group(1).lower(), int(increments.group(2)), increments.group(3)
+                if unit not in INCREMENT_UNITS:
+                    raise ValueError(f"Unsupported increments unit {unit}")
+                prefix, (start, length) = INCREMENT_UNITS[unit]
+                if prefix:
+                    groups.append(f'substr("{ts_column}", 1, {prefix})')
+                groups.append(f'CAST(substr("{ts_column}", {start}, {length}) AS INTEGER) / {units}')
+                continue
+
+            def _cast(match):
+                expression, function, size, alias = match.group(1), match.group(2).lower(), match.group(3), match.group(4)
+                if function == 'ljust':
+                    converted = f"substr(replace({expression}, ' ', 'T'), 1, {size})"
+                else:
+                    converted = f"float_round({expression}, {size})"
+                return f'{converted}{alias}' if alias else f'{converted} AS "{expression}"'
+            columns.append(CAST.sub(_cast, column))
+        if extend_table:
+            columns.insert(0, 'table_name')
+
+        # WHERE - period
+        where = clauses.get('where')
+        if where:
+            where = PERIOD.sub(lambda match: self._period_condition(conn, source, match), where)
+
+        # GROUP BY / ORDER BY
+        group_by = clauses.get('group by')
+        if extend_table and AGGREGATE.search(clauses['select']):
+            groups.insert(0, 'table_name')
+        if groups:
+            group_by = ', '.join(groups + ([group_by] if group_by else []))
+        order = clauses.get('order')
+        if order is not None:
+            if order.upper().startswith('BY '):
+                order = _order_by(order[3:].strip())
+            else:  # AnyLog ignores `ORDER` without `BY` - rows come back in group order
+                order = group_by
+
+        sql = f"SELECT {', '.join(columns)} FROM {source}"
+        if where:
+            sql += f" WHERE {where}"
+        if group_by:
+            sql += f" GROUP BY {group_by}"
+        if order:
+            sql += f" ORDER BY {order}"
+        if clauses.get('limit'):
+            sql += f" LIMIT {clauses['limit']}"
+        return sql
+
+    def query(self, dbms:str, select:str, include:list=None, extend:list=None):
+        """
+        Execute an AnyLog SELECT
+        :return:
+            (column names, rows)
+        """
+        with self.lock:
+            sql = self.translate(dbms=dbms, select=select, include=include, extend=extend)
+            cursor = self._connection(dbms).execute(sql)
+            return [column[0] for column in cursor.description], cursor.fetchall()
+
+    def sql_command(self, command:str)->(str, str):
+        """
+        Process `sql [dbms] [options] SELECT ...`
+        :return:
+            (content type, body)
+        """
+        match = SQL_COMMAND.match(command.strip())
+        if not match:
+            raise ValueError(f"Unsupported sql command: {command}")
+        dbms, options, select = match.group(1), match.group(2), match.group(3)
+
+        params = {}
+        for option in re.split(r'\s+and\s+', options.strip(), flags=re.IGNORECASE):
+            if '=' in option:
+                key, value = option.split('=', 1)
+                params[key.strip().lower()] = value.strip()
+        include = [name.strip() for name in params.get('include', '').strip('()').split(',') if name.strip()]
+        extend = [name.strip() for name in params.get('extend', '').strip('()').split(',') if name.strip()]
+
+        columns, rows = self.query(dbms=dbms, select=select, include=include, extend=extend)
+        if params.get('format', 'json') == 'table':
+            return 'text/plain', format_table(columns, rows)
+        records = [{column: ('' if value is None else value) for column, value in zip(columns, row)} for row in rows]
+        return 'application/json', json.dumps({"Query": records})
+
+    # ---------------- blockchain ----------------
+    def add_policy(self, payload:bytes)->str:
+        """
+        Store a policy - the id is the md5 of the policy (as AnyLog does) unless the policy has one
+        :return:
+            policy id
+        """
+        text = payload.decode('utf-8').strip()
+        if text.startswith('<') and text.endswith('>'):
+            text = text[1:-1].split('=', 1)[-1]
+        try:
+            policy = json.loads(text)
+        except ValueError as error:
+            raise ValueError(f"Invalid policy (Error: {error})")
+        if not isinstance(policy, dict) or len(policy) != 1 or not isinstance(next(iter(policy.values())), dict):
+            raise ValueError("Invalid policy - expected {policy type: {...}}")
+
+        info = next(iter(policy.values()))
+        if not info.get('id'):
+            info['id'] = hashlib.md5(json.dumps(policy, sort_keys=True).encode('utf-8')).hexdigest()
+        info.setdefault('date', datetime.datetime.now(datetime.timezone.utc).strftime('%Y-%m-%dT%H:%M:%S.%fZ'))
+        info.setdefault('ledger', 'global')
+        with self.lock:
+            if info['id'] in self.policy_ids:
+                raise ValueError(f"Policy {info['id']} already exists")
+            entry = (time.monotonic() + self.sync_delay, policy)
+            self.policies.append(entry)
+            self.policy_ids[info['id']] = entry
+        return info['id']
+
+    def blockchain_get(self, command:str)->(str, str):
+        match = BLOCKCHAIN_GET.match(' '.join(command.strip().split()))
+        if not match:
+            raise ValueError(f"Unsupported blockchain command: {command}")
+        types, conditions, bring = match.groups()
+        types = None if types == '*' else {name.strip() for name in types.strip('()').split(',') if name.strip()}
+        where = {}
+        for key, value in CONDITION.findall(conditions or ''):
+            where[key] = value.strip('"\'')
+
+        now = time.monotonic()
+        with self.lock:
+            if 'id' in where:
+                entry = self.policy_ids.get(where['id'])
+                candidates = [entry] if entry else []
+            else:
+                candidates = list(self.policies)
+        policies = []
+        for visible_at, policy in candidates:
+            policy_type = next(iter(policy))
+            if visible_at > now or (types is not None and policy_type not in types):
+                continue
+            info = policy[policy_type]
+            if all(str(info.get(key)) == value for key, value in where.items()):
+                policies.append(policy)
+
+        if bring is None:
+            return 'application/json', json.dumps(policies)
+        if bring.lower() == 'count':
+            return 'text/plain', str(len(policies))
+        if bring.lower() in ('first', 'last'):
+            return 'application/json', json.dumps(policies[:1] if bring.lower() == 'first' else policies[-1:])
+        raise ValueError(f"Unsupported bring.{bring}")
+
+    def command(self, command:str, body:bytes=b'')->(str, str):
+        """
+        Process a `command` header
+        :return:
+            (content type, body)
+        """
+        normalized = ' '.join(command.strip().split()).lower()
+        if normalized.startswith('sql '):
+            return self.sql_command(command)
+        if normalized.startswith('blockchain get '):
+            return self.blockchain_get(command)
+        if normalized.startswith('blockchain insert ') or normalized.startswith('blockchain push '):
+            if not body:
+                raise ValueError("Missing policy (request body)")
+            return 'text/plain', self.add_policy(body)
+        if normalized.startswith('get status'):
+            status = f"{self.node_name} running"
+            if 'format=json' in normalized:
+                return 'application/json', json.dumps({"Status": status, "status": status})
+            return 'text/plain', f"'{status}'"
+        if normalized == 'flush buffers':
+            self.flush()
+            return 'text/plain', ''
+        raise ValueError(f"Unsupported command: {command}")
+
+
+class StandinRequestHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'  # keep-alive, same as a real node
+    disable_nagle_algorithm = True  # small replies are not held back waiting for a delayed ACK
+
+    def _reply(self, status:int, body:str, content_type:str='text/plain'):
+        content = body.encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(content)))
+        self.end_headers()
+        self.wfile.write(content)
+
+    def _body(self)->bytes:
+        length = int(self.headers.get('Content-Length') or 0)
+        return self.rfile.read(length) if length else b''
+
+    def _command(self):
+        payload = self._body()
+        command = self.headers.get('command')
+        if not command:
+            self._reply(400, 'Missing command header')
+            return
+        try:
+            content_type, body = self.server.node.command(command, payload)
+        except LookupError as error:
+            self._reply(404, str(error))
+        except (ValueError, sqlite3.Error) as error:
+            self._reply(400, f"Failed to process `{command}` (Error: {error})")
+        else:
+            self._reply(200, body, content_type)
+
+    def do_GET(self):
+        self._command()
+
+    def do_POST(self):
+        self._command()
+
+    def do_PUT(self):
+        payload = self._body()
+        dbms = self.headers.get('dbms')
+        table = self.headers.get('table')
+        if not dbms or not table:
+            self._reply(400, 'Missing dbms / table header')
+            return
+        try:
+            self.server.node.put(dbms=dbms, table=table, mode=self.headers.get('mode', 'streaming'), payload=payload)
+        except (ValueError, sqlite3.Error) as error:
+            self._reply(400, f"Failed to store data in {dbms}.{table} (Error: {error})")
+        else:
+            self._reply(200, json.dumps({"AnyLog.status": "Success"}), 'application/json')
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+
+class StandinServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, host:str='127.0.0.1', port:int=32149, data_dir:str=None, verbose:bool=False, sync_delay:float=0):
+        super().__init__((host, port), StandinRequestHandler)
+        self.node = StandinNode(data_dir=data_dir, node_name=f"standin@{host}:{self.server_address[1]}", sync_delay=sync_delay)
+        self.verbose = verbose
+
+    @property
+    def conn(self)->str:
+        """
+        REST connection info (IP:port) to use with rest_call
+        """
+        return f"{self.server_address[0]}:{self.server_address[1]}"
+
+
+def start_server(host:str='127.0.0.1', port:int=0, data_dir:str=None, verbose:bool=False, sync_delay:float=0)->StandinServer:
+    """
+    Start a stand-in in a background thread - port 0 picks a free port (see `server.conn`); call `server.shutdown()`
+    when done
+    """
+    server = StandinServer(host=host, port=port, data_dir=data_dir, verbose=verbose, sync_delay=sync_delay)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def main():
+    parse = argparse.ArgumentParser(description="Local stand-in for an AnyLog node REST API")
+    parse.add_argument('--host', type=str, default='127.0.0.1', help='IP to listen on')
+    parse.add_argument('--port', type=int, default=32149, help='REST port to listen on')
+    parse.add_argument('--data-dir', type=str, default=None, help='Directory for SQLite files (default: in memory)')
+    parse.add_argument('--verbose', type=bool, nargs='?', const=True, default=False, help='Print each request')
+    parse.add_argument('--sync-delay', type=float, default=0, help='Seconds before a new policy is visible (simulated blockchain sync)')
+    args = parse.parse_args()
+
+    if args.data_dir:
+        os.makedirs(os.path.expanduser(os.path.expandvars(args.data_dir)), exist_ok=True)
+    server = StandinServer(host=args.host, port=args.port, data_dir=args.data_dir, verbose=args.verbose,
+                           sync_delay=args.sync_delay)
+    print(f"AnyLog stand-in listening on {server.conn}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == '__main__':
+    main()
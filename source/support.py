@@ -1,6 +1,16 @@
+import json
+import mmap
 import os
 import shutil
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+STREAM_CHUNK = 64 * 1024   # bytes per response chunk when comparing a streamed result against an expect file
+CONTEXT_CHARS = 80         # max characters shown past the first difference in a mismatch report
+
 def create_dir(dir_name:str):
     full_path = os.path.expanduser(os.path.expandvars(dir_name))
     if not os.path.isdir(full_path):
@@ -39,3 +49,135 @@ def read_file(content_file:str):
             return f.read()
     except Exception as err:
         raise Exception(f"Failed to read content in {content_file} (error: {err})")
+
+def read_lines(file_path:str):
+    """
+    Lazily read a data file - yields each (non-empty) line without surrounding whitespace and trailing comma
+    """
+    try:
+        with open(file_path, "r") as f:
+            for line in f:
+                line = line.strip()  # remove whitespace at both ends
+                line = line.rstrip(",")  # remove any trailing comma
+                if line:
+                    yield line
+    except Exception as error:
+        raise Exception(f"Failed to read content from {file_path} (Error: {error})")
+
+def decode_line(line:str, file_path:str, encoder:str='json')->dict:
+    try:
+        return orjson.loads(line) if encoder == 'orjson' else json.loads(line)
+    except Exception as error:
+        raise Exception(f"Failed to read content from {file_path} (line: {line} | Error: {error})")
+
+def read_rows(file_path:str, encoder:str='json'):
+    """
+    Lazily read a data file - yields one decoded row per (non-empty) line
+    """
+    for line in read_lines(file_path):
+        yield decode_line(line, file_path, encoder)
+
+def _line_context(content, start:int, end:int)->str:
+    line = bytes(content[start:end]).split(b'\n', 1)[0]
+    return line.decode('utf-8', errors='replace')[:CONTEXT_CHARS]
+
+
+def compare_stream(chunks, expect_file:str, actual_file:str=None, write_actual:bool=False)->dict:
+    """
+    Compare a streamed result (ex. response.iter_content()) against an expect file without reading either into
+    memory - the expect file is memory-mapped and compared chunk by chunk, stopping at the first difference
+    :args:
+        chunks - iterable of bytes
+        expect_file:str - file with the expected content
+        actual_file:str - where the result is written when it differs (the matched prefix comes from the expect file)
+        write_actual:bool - write actual_file even when the result matches
+    :return:
+        None if identical, otherwise {offset, line, column (1-based), expected, actual} - expected / actual hold the
+        differing line on each side (up to CONTEXT_CHARS characters past the difference)
+    """
+    full_path = os.path.expanduser(os.path.expandvars(expect_file))
+    if not os.path.isfile(full_path):
+        raise FileNotFoundError(f"Failed to locate {expect_file}")
+
+    try:
+        with open(full_path, 'rb') as f:
+            size = os.fstat(f.fileno()).st_size
+            expected = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) if size else b''
+            try:
+                offset = 0
+                line = 1
+                mismatch = None
+                chunks = iter(chunks)
+                for chunk in chunks:
+                    if not chunk:
+                        continue
+                    end = offset + len(chunk)
+                    window = expected[offset:end]
+                    if window == chunk:
+                        line += chunk.count(b'\n')
+                        offset = end
+                        continue
+                    index = next((i for i, (a, b) in enumerate(zip(window, chunk)) if a != b), min(len(window), len(chunk)))
+                    mismatch = _mismatch(expected, offset + index, line + chunk.count(b'\n', 0, index), chunk[index:])
+                    if actual_file:
+                        _write_actual(actual_file, expected[:offset + index], [chunk[index:]], chunks)
+                    break
+                else:
+                    if offset < size:
+                        mismatch = _mismatch(expected, offset, line, b'')
+                        if actual_file:
+                            _write_actual(actual_file, expected[:offset], [], [])
+                    elif actual_file and write_actual:
+                        _write_actual(actual_file, expected[:size], [], [])
+            finally:
+                if size:
+                    expected.close()
+    except OSError as err:
+        raise Exception(f"Failed to compare content against {expect_file} (Error: {err})")
+    return mismatch
+
+
+def _mismatch(expected, position:int, line:int, actual:bytes)->dict:
+    line_start = expected.rfind(b'\n', 0, position) + 1
+    prefix = bytes(expected[line_start:position]).decode('utf-8', errors='replace')
+    return {
+        'offset': position,
+        'line': line,
+        'column': len(prefix) + 1,
+        'expected': prefix + _line_context(expected, position, position + CONTEXT_CHARS * 4),
+        'actual': prefix + _line_context(actual, 0, CONTEXT_CHARS * 4)
+    }
+
+
+def _write_actual(actual_file:str, prefix:bytes, pending:list, chunks):
+    full_path = os.path.expanduser(os.path.expandvars(actual_file))
+    create_dir(os.path.dirname(full_path))
+    try:
+        with open(full_path, 'wb') as f:
+            f.write(prefix)
+            for chunk in pending:
+                f.write(chunk)
+            for chunk in chunks:
+                f.write(chunk)
+    except Exception as err:
+        raise Exception(f"Failed to write content into {actual_file} (Error: {err})")
+
+
+def format_mismatch(mismatch:dict, expect_file:str=None, actual_file:str=None)->str:
+    message = f"result differs from {expect_file or 'expected'} at line {mismatch['line']}, column {mismatch['column']} (byte {mismatch['offset']})"
+    message += f"\n  expected: {mismatch['expected']!r}\n  actual:   {mismatch['actual']!r}"
+    if actual_file:
+        message += f"\n  full result: {actual_file}"
+    return message
+
+def percentile(values:list, percent:float)->float:
+    """
+    Percentile (0-100) with linear interpolation between the closest ranks - 0.0 for an empty list
+    """
+    if not values:
+        return 0.0
+    values = sorted(values)
+    rank = (len(values) - 1) * percent / 100
+    lower = int(rank)
+    upper = min(lower + 1, len(values) - 1)
+    return values[lower] + (values[upper] - values[lower]) * (rank - lower)
@@ -0,0 +1,181 @@
+"""
+AnyLog `format=table` output - rendering (for the expect files), parsing into typed rows and a tolerance / order
+aware comparison of two tables
+"""
+TABLE_BLOCK_ROWS = 25  # header and column widths are (re)computed every 25 rows
+EMPTY_DATA_SET = '{"reply" : "Empty data set"}'
+FLOAT_SLACK = 1e-9     # relative slack for binary float error when comparing numbers against a tolerance
+DIFF_LIMIT = 20        # max differences collected by compare_tables
+
+
+def format_table(columns:list, rows:list)->str:
+    """
+    Render rows the way AnyLog does for `format=table` - blocks of 25 rows, each starting with a blank line, the
+    column names and a dashed line. Numbers are right aligned, everything else is left aligned.
+    """
+    if not rows:
+        return EMPTY_DATA_SET
+
+    output = []
+    for block_start in range(0, len(rows), TABLE_BLOCK_ROWS):
+        block = [['' if value is None else str(value) for value in row] for row in rows[block_start:block_start + TABLE_BLOCK_ROWS]]
+        numeric = [all(isinstance(row[i], (int, float)) and not isinstance(row[i], bool) for row in rows[block_start:block_start + TABLE_BLOCK_ROWS] if row[i] is not None)
+                   for i in range(len(columns))]
+        widths = [max([len(column)] + [len(row[i]) for row in block]) for i, column in enumerate(columns)]
+
+        output.append('')
+        output.append(' '.join(column if i == len(columns) - 1 else column.ljust(widths[i]) for i, column in enumerate(columns)))
+        output.append(''.join('-' * width + ' ' for width in widths))
+        for row in block:
+            output.append(''.join((value.rjust(widths[i]) if numeric[i] else value.ljust(widths[i])) + ' ' for i, value in enumerate(row)))
+    return '\n'.join(output) + '\n'
+
+
+def _spans(dashes:str)->list:
+    spans = []
+    start = dashes.find('-')
+    while start != -1:
+        end = dashes.find(' ', start)
+        end = len(dashes) if end == -1 else end
+        spans.append((start, end))
+        start = dashes.find('-', end)
+    return spans
+
+
+def _typed(values:list)->list:
+    """
+    Convert a column to int, else float, else keep the strings - '' becomes None
+    """
+    for kind in (int, float):
+        try:
+            return [kind(value) if value else None for value in values]
+        except ValueError:
+            continue
+    return [value if value else None for value in values]
+
+
+def parse_table(text:str)->tuple:
+    """
+    Parse AnyLog `format=table` output (see format_table) into typed rows - column boundaries come from the dashed line
+    of each block, so padding / alignment changes and values with spaces (timestamps) are handled
+    :return:
+        (columns, rows) - ([], []) for an empty data set
+    :raise:
+        ValueError - text is not a table
+    """
+    if text.strip() == EMPTY_DATA_SET or not text.strip():
+        return [], []
+
+    lines = text.split('\n')
+    columns = None
+    raw_rows = []
+    index = 0
+    while index < len(lines):
+        line = lines[index]
+        if not line.strip():
+            index += 1
+            continue
+        if index + 1 >= len(lines) or not lines[index + 1].startswith('-'):
+            raise ValueError(f"Invalid table output - expected a header and dashed line at line {index + 1}")
+        spans = _spans(lines[index + 1])
+        slices = [slice(start, end) for start, end in spans[:-1]] + [slice(spans[-1][0], None)] if spans else []
+        header = [line[column].strip() for column in slices]
+        if columns is None:
+            columns = header
+        elif header != columns:
+            raise ValueError(f"Invalid table output - header at line {index + 1} differs from the first header")
+        index += 2
+        while index < len(lines) and lines[index].strip():
+            row = lines[index]
+            raw_rows.append([row[column].strip() for column in slices])
+            index += 1
+
+    if columns is None:
+        return [], []
+    typed = [_typed([row[i] for row in raw_rows]) for i in range(len(columns))]
+    return columns, [list(row) for row in zip(*typed)] if raw_rows else []
+
+
+def _same(expected, actual, tolerance:float, rel_tolerance:float)->bool:
+    if expected == actual:
+        return True
+    numbers = (int, float)
+    if isinstance(expected, numbers) and isinstance(actual, numbers) and not isinstance(expected, bool) and not isinstance(actual, bool):
+        if not tolerance and not rel_tolerance:
+            return False
+        # FLOAT_SLACK keeps a difference of exactly `tolerance` (ex. 182.591 vs 182.59 with 0.001) within tolerance
+        limit = max(tolerance, rel_tolerance * max(abs(expected), abs(actual)))
+        return abs(expected - actual) <= limit + FLOAT_SLACK * max(1.0, abs(expected), abs(actual))
+    return False
+
+
+def _mixed_key(row:list, order:list)->tuple:
+    # None < numbers < strings, so mixed columns still sort
+    return tuple((0, 0) if row[i] is None else (1, row[i]) if isinstance(row[i], (int, float)) else (2, str(row[i])) for i in order)
+
+
+def _sort_key(rows:list, order:list):
+    """
+    Row sort key - plain column values when every column holds one type (no None), otherwise a (rank, value) tuple
+    """
+    for i in order:
+        kinds = {float if isinstance(row[i], int) and not isinstance(row[i], bool) else type(row[i]) for row in rows}
+        if len(kinds) > 1 or type(None) in kinds:
+            return lambda row: _mixed_key(row, order)
+    return lambda row: tuple(row[i] for i in order)
+
+
+def compare_tables(expected:tuple, actual:tuple, tolerance:float=0.0, rel_tolerance:float=0.0, ignore_order:bool=False,
+                   max_differences:int=DIFF_LIMIT)->list:
+    """
+    Row / column level comparison of two parsed tables
+    :args:
+        expected:tuple - (columns, rows) from parse_table (or the reference engine)
+        actual:tuple - (columns, rows)
+        tolerance:float - max absolute difference between numbers
+        rel_tolerance:float - max difference relative to the larger number
+        ignore_order:bool - compare the rows as a multiset - rows are sorted by the int / str columns first and the
+                            float columns last, so rows whose floats differ within the tolerance still pair up
+        max_differences:int - stop after this many differences
+    :return:
+        list of differences - {'kind': columns | row_count | value, 'row', 'column', 'expected', 'actual'}, empty
+        when the tables match
+    """
+    expected_columns, expected_rows = expected
+    actual_columns, actual_rows = actual
+    if list(expected_columns) != list(actual_columns):
+        return [{'kind': 'columns', 'row': None, 'column': None, 'expected': list(expected_columns), 'actual': list(actual_columns)}]
+
+    differences = []
+    if len(expected_rows) != len(actual_rows):
+        differences.append({'kind': 'row_count', 'row': None, 'column': None, 'expected': len(expected_rows), 'actual': len(actual_rows)})
+
+    if ignore_order:
+        floats = [i for i in range(len(expected_columns))
+                  if any(isinstance(row[i], float) for row in expected_rows) or any(isinstance(row[i], float) for row in actual_rows)]
+        order = [i for i in range(len(expected_columns)) if i not in floats] + floats
+        key = _sort_key(expected_rows + actual_rows, order)
+        expected_rows = sorted(expected_rows, key=key)
+        actual_rows = sorted(actual_rows, key=key)
+
+    for index, (expected_row, actual_row) in enumerate(zip(expected_rows, actual_rows)):
+        if expected_row == actual_row:
+            continue
+        for column, expected_value, actual_value in zip(expected_columns, expected_row, actual_row):
+            if not _same(expected_value, actual_value, tolerance, rel_tolerance):
+                differences.append({'kind': 'value', 'row': index + 1, 'column': column, 'expected': expected_value, 'actual': actual_value})
+                if len(differences) >= max_differences:
+                    return differences
+    return differences
+
+
+def format_differences(differences:list)->str:
+    lines = []
+    for difference in differences:
+        if difference['kind'] == 'columns':
+            lines.append(f"columns differ - expected {difference['expected']}, actual {difference['actual']}")
+        elif difference['kind'] == 'row_count':
+            lines.append(f"row count differs - expected {difference['expected']}, actual {difference['actual']}")
+        else:
+            lines.append(f"row {difference['row']}, column {difference['column']}: expected {difference['expected']!r}, actual {difference['actual']!r}")
+    return '\n'.join(lines)
@@ -0,0 +1,184 @@
+"""
+Run unittest suites with a pool of worker threads - the test cases are (mostly) waiting on the network, so running
+them concurrently cuts wall-clock time to roughly the slowest tests rather than the sum of all of them.
+
+Each test writes its result line, and anything it prints, into its own buffer. Buffers are written out in suite
+order once all tests finish, followed by one combined unittest-style report.
+"""
+import io
+import sys
+import threading
+import time
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+
+
+class _ThreadLocalStream:
+    """
+    Replacement for sys.stdout / sys.stderr - writes from a worker thread go to that thread's buffer, writes from any
+    other thread go to the original stream
+    """
+    def __init__(self, stream):
+        self._stream = stream
+        self._local = threading.local()
+
+    def set_buffer(self, buffer):
+        self._local.buffer = buffer
+
+    def write(self, data):
+        buffer = getattr(self._local, 'buffer', None)
+        return (buffer or self._stream).write(data)
+
+    def flush(self):
+        buffer = getattr(self._local, 'buffer', None)
+        (buffer or self._stream).flush()
+
+    def __getattr__(self, name):
+        return getattr(self._stream, name)
+
+
+class _Stream:
+    """
+    Stream for unittest.TextTestResult - adds writeln() to a file-like object
+    """
+    def __init__(self, stream):
+        self._stream = stream
+
+    def write(self, data):
+        return self._stream.write(data)
+
+    def writeln(self, data:str=''):
+        self._stream.write(f"{data}\n")
+
+    def flush(self):
+        self._stream.flush()
+
+    def __getattr__(self, name):
+        return getattr(self._stream, name)
+
+
+class _FixtureError:
+    """
+    Stands in for the test in a result entry when setUpClass / tearDownClass fails (there is no single test to blame)
+    """
+    failureException = None
+
+    def __init__(self, description:str):
+        self.description = description
+
+    def id(self)->str:
+        return self.description
+
+    def shortDescription(self):
+        return None
+
+    def __str__(self):
+        return self.description
+
+
+def _flatten(suite)->list:
+    tests = []
+    for test in suite:
+        if isinstance(test, unittest.TestSuite):
+            tests.extend(_flatten(test))
+        else:
+            tests.append(test)
+    return tests
+
+
+def _run_test(test, verbosity:int, stdout:_ThreadLocalStream, stderr:_ThreadLocalStream):
+    buffer = io.StringIO()
+    stdout.set_buffer(buffer)
+    stderr.set_buffer(buffer)
+    try:
+        result = unittest.TextTestResult(_Stream(buffer), descriptions=True, verbosity=verbosity)
+        result.startTestRun()
+        test(result)
+        result.stopTestRun()
+    finally:
+        stdout.set_buffer(None)
+        stderr.set_buffer(None)
+    return result, buffer.getvalue()
+
+
+def _class_fixture(tests:list, method:str, result:unittest.TestResult)->list:
+    """
+    Call setUpClass / tearDownClass once per test class (a TestSuite would normally do this)
+    :return:
+        classes whose fixture failed
+    """
+    failed = []
+    for cls in dict.fromkeys(test.__class__ for test in tests):
+        if getattr(cls, '__unittest_skip__', False):
+            continue
+        try:
+            getattr(cls, method)()
+        except Exception:
+            failed.append(cls)
+            result.addError(_FixtureError(f"{method} ({cls.__module__}.{cls.__qualname__})"), sys.exc_info())
+    return failed
+
+
+def run_parallel(suite, workers:int, verbosity:int=2, stream=None)->unittest.TestResult:
+    """
+    Run every test in `suite` using up to `workers` threads and print a single combined report
+    :args:
+        suite - unittest.TestSuite (may be nested)
+        workers:int - number of concurrent tests
+        verbosity:int - unittest verbosity level (0, 1, 2)
+        stream - where to write the report (default: sys.stderr, same as unittest.TextTestRunner)
+    :return:
+        merged test result
+    """
+    stream = _Stream(stream or sys.stderr)
+    combined = unittest.TextTestResult(stream, descriptions=True, verbosity=verbosity)
+    tests = _flatten(suite)
+
+    start = time.perf_counter()
+    failed_classes = _class_fixture(tests, 'setUpClass', combined)
+    tests = [test for test in tests if test.__class__ not in failed_classes]
+
+    stdout = _ThreadLocalStream(sys.stdout)
+    stderr = _ThreadLocalStream(sys.stderr)
+    sys.stdout, sys.stderr = stdout, stderr
+    try:
+        with ThreadPoolExecutor(max_workers=max(workers, 1)) as executor:
+            outputs = list(executor.map(lambda test: _run_test(test, verbosity, stdout, stderr), tests))
+    finally:
+        sys.stdout, sys.stderr = stdout._stream, stderr._stream
+
+    _class_fixture(tests, 'tearDownClass', combined)
+    duration = time.perf_counter() - start
+
+    for result, output in outputs:
+        stream.write(output)
+        combined.testsRun += result.testsRun
+        combined.failures.extend(result.failures)
+        combined.errors.extend(result.errors)
+        combined.skipped.extend(result.skipped)
+        combined.expectedFailures.extend(result.expectedFailures)
+        combined.unexpectedSuccesses.extend(result.unexpectedSuccesses)
+    if verbosity == 1:
+        stream.writeln()
+
+    combined.printErrors()
+    stream.writeln(combined.separator2)
+    stream.writeln(f"Ran {combined.testsRun} test{'s' if combined.testsRun != 1 else ''} in {duration:.3f}s ({workers} workers)")
+    stream.writeln()
+
+    infos = []
+    if combined.failures:
+        infos.append(f"failures={len(combined.failures)}")
+    if combined.errors:
+        infos.append(f"errors={len(combined.errors)}")
+    if combined.skipped:
+        infos.append(f"skipped={len(combined.skipped)}")
+    if combined.expectedFailures:
+        infos.append(f"expected failures={len(combined.expectedFailures)}")
+    if combined.unexpectedSuccesses:
+        infos.append(f"unexpected successes={len(combined.unexpectedSuccesses)}")
+    status = "OK" if combined.wasSuccessful() else "FAILED"
+    stream.writeln(f"{status} ({', '.join(infos)})" if infos else status)
+    stream.flush()
+
+    return combined
@@ -0,0 +1,103 @@
+"""
+Blockchain policy scale testing - publishes a batch of synthetic cluster / table / operator policies (see
+source.policy_load) and validates that they reach the query node, keep their relationships and can still be read
+within the configured limits.
+
+The policies stay on the ledger - run against a local / test master or source.standin_server, not a production network.
+"""
+import unittest
+from contextlib import contextmanager
+
+from source import policy_load
+from source.policy_snapshot import SNAPSHOT_COMMAND, PolicySnapshot
+
+
+class TestBlockchainScale(unittest.TestCase):
+    # Class variables to be set before running tests
+    query = None            # query node - policies are read from it
+    publisher = None        # node the policies are sent to (default: query)
+    master = None           # master node IP:port used by `blockchain insert` (default: publisher's local ledger)
+    policy_count = 1000     # synthetic policies published (whole families - may be slightly more)
+    sync_timeout = policy_load.SYNC_TIMEOUT  # max seconds for published policies to reach the query node
+    max_get_ms = 5000       # max p95 latency of a `blockchain get` at this scale
+    run_id = None
+    published = None        # publish stats - policies are published once per run and shared by all tests
+    policies = None
+
+    def setUp(self):
+        # Ensure required parameters are set
+        assert self.query
+        if TestBlockchainScale.published is None:
+            TestBlockchainScale.run_id = policy_load.new_run_id()
+            TestBlockchainScale.policies, _ = policy_load.synthetic_policies(self.policy_count, self.run_id)
+            TestBlockchainScale.published = policy_load.publish_policies(self.publisher or self.query, self.policies,
+                                                                        master=self.master)
+        self.where = f"company={policy_load.company(self.run_id)}"
+
+    @contextmanager
+    def query_context(self, query:str):
+        """Context manager to print query if an assertion fails."""
+        try:
+            yield
+        except AssertionError:
+            print("\n❌ Assertion failed for query:\n", query)
+            raise
+
+    """
+    Every synthetic policy was accepted by the publishing node
+    """
+    def test_publish_policies(self):
+        self.assertEqual(self.published['errors'], 0, f"Failed to publish policies (first error: {self.published['first_error']})")
+        print(f"\n  published {self.published['policies']} policies in {self.published['seconds']:.2f} seconds "
+              f"({self.published['policies_sec']:.0f} policies/sec)")
+
+    """
+    All of the run's policies become visible on the query node
+    """
+    def test_policies_visible(self):
+        seconds = policy_load.wait_for_count(self.query, len(self.policies), where=self.where, timeout=self.sync_timeout)
+        with self.query_context(f"blockchain get * where {self.where} bring.count"):
+            self.assertIsNotNone(seconds, f"{len(self.policies)} policies not visible after {self.sync_timeout} seconds")
+
+    """
+    Relationships of the run's policies hold on the query node's copy of the ledger - each table has a child cluster,
+    each child cluster's parent exists and is a root, each operator is assigned to a root cluster
+    """
+    def test_policy_relationships(self):
+        policy_load.wait_for_count(self.query, len(self.policies), where=self.where, timeout=self.sync_timeout)
+        snapshot = PolicySnapshot.fetch(self.query)
+        with self.query_context(SNAPSHOT_COMMAND):
+            for policy in self.policies:
+                policy_type = next(iter(policy))
+                info = policy[policy_type]
+                self.assertIsNotNone(snapshot.policy(info['id'], policy_type), f"Missing {policy_type} policy {info['id']}")
+                if policy_type == 'table':
+                    self.assertGreaterEqual(len(snapshot.table_policies(info['dbms'], info['name'], 'cluster')), 1,
+                                            f"No associated cluster for table {info['dbms']}.{info['name']}")
+                elif policy_type == 'cluster' and info.get('parent'):
+                    parent = snapshot.policy(info['parent'], 'cluster')
+                    self.assertIsNotNone(parent, f"Missing parent cluster {info['parent']}")
+                    self.assertEqual(parent['cluster'].get('parent'), None)
+                elif policy_type == 'operator':
+                    cluster = snapshot.policy(info['cluster'], 'cluster')
+                    self.assertIsNotNone(cluster, f"Missing cluster {info['cluster']}")
+                    self.assertEqual(cluster['cluster'].get('parent'), None)
+
+    """
+    `blockchain get` (full dump, by type, by dbms and by id) stays within max_get_ms at this policy count
+    """
+    def test_get_latency(self):
+        results = policy_load.measure_gets(self.query, policy_load.get_commands(self.policies), iterations=5)
+        for name, result in results.items():
+            with self.subTest(name):
+                with self.query_context(result['command']):
+                    self.assertLessEqual(result['p95_ms'], self.max_get_ms)
+
+    """
+    A single new policy becomes visible on the query node within sync_timeout
+    """
+    def test_sync_latency(self):
+        result = policy_load.sync_latency(self.publisher or self.query, self.query, self.run_id, samples=3,
+                                          master=self.master, timeout=self.sync_timeout)
+        print(f"\n  policy visible on {self.query} after p50 {result['p50'] * 1000:.1f} / max {result['max'] * 1000:.1f} ms")
+        self.assertEqual(result['timeouts'], 0, f"Policy not visible after {self.sync_timeout} seconds")
@@ -10,18 +10,22 @@ from typing import Any, Dict, List, Optional
 
 """
 This unittest simulates:
- - multiple insert threads
- - multiple query threads
+ - an open-loop insert stream (constant / poisson / step / ramp rate)
+ - an open-loop query stream
  - 2-minute run
  - final verification of COUNT, summary, aggregates
 """
 
+# balancer / load_generator do not import source.rest_call - the mocks below replace it when it cannot be imported
+from source.balancer import get_balancer, print_distribution
+from source.load_generator import arrivals, poisson_arrivals, print_load_results, run_streams
+
 # ----------------------------------------------------------
 # Try importing real API; fallback to mocks for local testing
 # ----------------------------------------------------------
 
 try:
-    from source.rest_call import put_data, flush_buffer, get_data
+    from source.rest_call import put_data, flush_buffer, get_data, available_conns
 except Exception:
     logging.warning("Using internal MOCKS (source.rest_call not found)")
 
@@ -37,12 +41,15 @@ except Exception:
             def json(self): return {"ok": True}
         return R()
 
-    def flush_buffer(conn: Optional[str]):
+    def flush_buffer(conn: Optional[str], **kwargs):
         class R:
             status_code = 200
             def json(self): return {"flushed": True}
         return R()
 
+    def available_conns(conns):
+        return list(conns)
+
     def get_data(conn: str, query: str):
         with _MOCK_DB_LOCK:
             rows = list(_MOCK_DB.get(conn, []))
@@ -88,7 +95,6 @@ except Exception:
 
 DATA: List[Dict[str, Any]] = []
 DATA_LOCK = threading.Lock()
-STOP_EVENT = threading.Event()
 TIMESTAMP_FMT = "%Y-%m-%d %H:%M:%S.%f"
 
 
@@ -112,44 +118,36 @@ def safe_json_dumps(row):
 
 
 # ----------------------------------------------------------
-# Insert Worker
+# Insert Request
 # ----------------------------------------------------------
 
-def insert_worker(conns, db_name, table, max_sleep):
-    while not STOP_EVENT.is_set():
-        conn = random.choice(conns)
-        pre_conn = None
-
-        row = generate_row()
-        payload = safe_json_dumps(row)
-
+def insert_once(conns, db_name, table, balancer):
+    """
+    Send one row - called by the load generator on its own schedule (no sleeping between requests); `balancer` picks
+    the operator, leaving out operators whose circuit breaker is open until they recover
+    """
+    conn = balancer.pick(available_conns(conns) or conns)
+    row = generate_row()
+    payload = safe_json_dumps(row)
+
+    balancer.start(conn)
+    start = time.perf_counter()
+    try:
+        put_data(conn=conn, dbms=db_name, table=table, payload=payload)
+        with DATA_LOCK:
+            DATA.append(copy.deepcopy(row))
+    except Exception as e:
+        balancer.finish(conn, time.perf_counter() - start, ok=False)
+        logging.exception("put_data failed on %s: %s", conn, e)
+        raise
+    balancer.finish(conn, time.perf_counter() - start, table=table, rows=1)
+
+    # flush ~33% chance
+    if random.randint(1, 100) % 3 == 0:
         try:
-            put_data(conn=conn, dbms=db_name, table=table, payload=payload)
-            with DATA_LOCK:
-                DATA.append(copy.deepcopy(row))
+            flush_buffer(conn, sleep_time=0)
         except Exception as e:
-            logging.exception("put_data failed on %s: %s", conn, e)
-
-        if len(conns) > 1:
-            pre_conn = conn
-            tries = 0
-            while True:
-                next_conn = random.choice(conns)
-                if next_conn != pre_conn or tries > 10:
-                    conn = next_conn
-                    break
-                tries += 1
-
-        # flush ~33% chance
-        if random.randint(1, 100) % 3 == 0:
-            try:
-                flush_buffer(conn)
-                if pre_conn:
-                    flush_buffer(pre_conn)
-            except Exception as e:
-                logging.exception("flush_buffer failed: %s", e)
-
-        time.sleep(random.random() * max_sleep)
+            logging.exception("flush_buffer failed: %s", e)
 
 
 # ----------------------------------------------------------
@@ -187,38 +185,36 @@ def parse_agg(r):
     }
 
 
-def query_worker(conns, db_name, table, sleep_choices):
-    queries = {
-        "count":
-            f"SELECT COUNT(*) AS row_count FROM {table}",
-        "summary":
-            f"SELECT MIN(timestamp) as min_ts, MAX(timestamp) as max_ts, COUNT(*) as count FROM {table}",
-        "aggregates":
-            f"SELECT MIN(value) as min_val, MAX(value) AS max_val, AVG(value) AS avg_val FROM {table}",
-    }
-
-    while not STOP_EVENT.is_set():
-        conn = random.choice(conns)
-        qname = random.choice(list(queries))
-        sql = f"sql {db_name} format=json and stat=false {queries[qname]}"
+QUERIES = {
+    "count":
+        "SELECT COUNT(*) AS row_count FROM {table}",
+    "summary":
+        "SELECT MIN(timestamp) as min_ts, MAX(timestamp) as max_ts, COUNT(*) as count FROM {table}",
+    "aggregates":
+        "SELECT MIN(value) as min_val, MAX(value) AS max_val, AVG(value) AS avg_val FROM {table}",
+}
 
-        try:
-            resp = get_data(conn, sql).json()
-            # Logging only lightly
-            if qname == "count":
-                _ = parse_count_response(resp)
-            elif qname == "summary":
-                _ = parse_summary(resp)
-            else:
-                _ = parse_agg(resp)
-        except Exception as e:
-            logging.exception("query failed: %s", e)
 
-        sleep_time = random.choice(sleep_choices)
-        for _ in range(sleep_time):
-            if STOP_EVENT.is_set():
-                break
-            time.sleep(1)
+def query_once(conns, db_name, table):
+    """
+    Send one (random) query - called by the load generator on its own schedule
+    """
+    conn = random.choice(conns)
+    qname = random.choice(list(QUERIES))
+    sql = f"sql {db_name} format=json and stat=false {QUERIES[qname].format(table=table)}"
+
+    try:
+        resp = get_data(conn, sql).json()
+        # Logging only lightly
+        if qname == "count":
+            _ = parse_count_response(resp)
+        elif qname == "summary":
+            _ = parse_summary(resp)
+        else:
+            _ = parse_agg(resp)
+    except Exception as e:
+        logging.exception("query failed: %s", e)
+        raise
 
 
 # ----------------------------------------------------------
@@ -280,57 +276,42 @@ def final_verification(conns, db_name, table):
 # ----------------------------------------------------------
 
 class TestContinuousLoad(unittest.TestCase):
+    conns = ["conn1", "conn2"]
+    db_name = "testdb"
+    table = "continuous_data"
+    duration = 2 * 60       # seconds
+    profile = "poisson"     # insert arrivals: constant, poisson, step or ramp
+    insert_rate = 1.0       # inserts/sec (start rate for ramp)
+    insert_end_rate = None  # final inserts/sec for ramp
+    insert_steps = None     # [(seconds, rate)] for step
+    query_rate = 0.2        # queries/sec (poisson)
+    balancer = "random"     # operator choice per insert (see source.balancer)
+    weights = None          # {conn: weight} for the weighted balancer
 
     def test_continuous_load(self):
         """
-        Runs:
-          - 2 insert workers
-          - 2 query workers
-          - 2 minutes
+        Runs (open loop - requests are sent on schedule however long the node takes to answer):
+          - inserts at `insert_rate` following `profile`
+          - queries at `query_rate`
+          - `duration` seconds
         Then flushes and asserts DB matches memory
         """
-        conns = ["conn1", "conn2"]
-        db = "testdb"
-        table = "continuous_data"
-
-        STOP_EVENT.clear()
-
-        insert_threads = []
-        query_threads = []
-
-        # Start insert workers
-        for i in range(2):
-            t = threading.Thread(
-                target=insert_worker,
-                args=(conns, db, table, 5.0),   # max insert sleep
-                daemon=True,
-            )
-            t.start()
-            insert_threads.append(t)
-
-        # Start query workers
-        for i in range(2):
-            t = threading.Thread(
-                target=query_worker,
-                args=(conns, db, table, [5, 10, 15, 25]),  # your new sleep choices
-                daemon=True,
-            )
-            t.start()
-            query_threads.append(t)
-
-        # ---- Run for 2 minutes ----
-        runtime = 2 * 60
-        end_ts = time.time() + runtime
-
-        while time.time() < end_ts:
-            time.sleep(1)
-
-        # Signal stop
-        STOP_EVENT.set()
-
-        # Join workers
-        for t in insert_threads + query_threads:
-            t.join(timeout=3)
+        conns = self.conns
+        db = self.db_name
+        table = self.table
+
+        with DATA_LOCK:
+            DATA.clear()
+        balancer = get_balancer(self.balancer, conns, weights=self.weights)
+
+        streams = {
+            "insert": (lambda: insert_once(conns, db, table, balancer),
+                       arrivals(self.profile, self.insert_rate, self.duration, end_rate=self.insert_end_rate, steps=self.insert_steps)),
+            "query": (lambda: query_once(conns, db, table), poisson_arrivals(self.query_rate)),
+        }
+        results = run_streams(streams, duration=self.duration)
+        print_load_results(results)
+        print_distribution(balancer.distribution())
 
         # ---- Verification ----
         final_verification(conns, db, table)
@@ -338,78 +319,3 @@ class TestContinuousLoad(unittest.TestCase):
 
 if __name__ == "__main__":
     unittest.main()
-
-#------- Original -----
-import datetime
-import json
-import random
-import time
-from source.rest_call import put_data,flush_buffer, get_data
-
-DATA = []
-
-
-def generate_row():
-    """
-    Generate new row to be inserted
-    """
-    global DATA
-    uname = f"User{random.choice([1, 2, 3 ,4, 5])}"
-    timestamp = datetime.datetime.now()
-    value = random.choice([round(random.random() * 100, random.choice(list(range(10)))), random.randint(1, 100)])
-
-    row = {"uname": uname, "timestamp": timestamp, "value": value}
-    DATA.append(row)
-    row['timestamp'] = row['timestamp'].strftime('%Y-%m-%d %H:$M:$S.$f')
-
-    return json.dumps(row)
-
-def insert_data(conns:list, db_name:str):
-    """
-    Actual process to insert data (as a thread)
-    :todo:
-        add while and have it run for 5 minutes
-        in main configure as a thread
-    """
-    conn = random.choice(conns)
-    pre_conn = None
-
-    row = generate_row()
-    put_data(conn=conn, dbms=db_name, table="continuous_data", payload=row)
-
-    if len(conns) > 1:
-        while pre_conn is None or pre_conn == conn:
-            pre_conn = conn
-            conn = random.choice(conns)
-
-    if random.randint(1, 100) % 3 == 0: # this is lise `commit` in PSQL
-        flush_buffer(conn=conn)
-        flush_buffer(conn=pre_conn)
-
-    time.sleep(random.choice([x * 0.25 for x in range(int(5 / 0.25) + 1)]))
-
-
-def query_data(conn:str, db_name:str):
-    """
-    Randomly execute queries against the network
-    :todo:
-        1. integrate assertion
-        2. when `insert_data` has stopped  then do the following:
-            - flush the buffers
-            - run all 3 queries and assert they get the same results as DATA
-    """
-    global DATA
-    queries = {
-        "row count": "SELECT COUNT(*) AS row_count FROM continuous_data",
-        "summary": "SELECT MIN(timestamp) as min_ts, MAX(TIMESTAMP) as max_ts, COUNT(*) FROM continuous_data",
-        "aggregates": "SELECT MIN(value) as min_val, MAX(value) AS max_val, AVG(value) AS avg_val  FROM continuous_data",
-    }
-
-    while True:
-        query_title = random.choice(list(queries))
-        query = f"sql {db_name} format=json and stat=false {queries[query_title]}"
-        with subTest(query):
-            results = get_data(conn, query)
-            data = results.json()
-
-        time.sleep(random.choice[25, 30, 50, 60, 75, 90])
\ No newline at end of file
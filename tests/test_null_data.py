@@ -16,12 +16,18 @@ DATA = [
 ]
 
 
-def insert_data(conn:str, db_name:str):
+def insert_data(conn:str, db_name:str, query:str=None):
+    baseline = rest_call.row_counts(conn=query, db_name=db_name, tables=["t1"]) if query else None
     for row in DATA:
         rest_call.put_data(conn=conn, payload=json.dumps(row), dbms=db_name, table="t1")
         if DATA.index(row) == 1:
-            rest_call.flush_buffer(conn=conn)
-    rest_call.flush_buffer(conn=conn)
+            rest_call.flush_buffer(conn=conn, sleep_time=0)  # split data into separate flushes - no need to wait
+
+    ready = None
+    if query:  # rows with a timestamp are always stored, once they're visible the buffer has been flushed
+        ready = rest_call.rows_ready(conn=query, db_name=db_name, expected={"t1": len([row for row in DATA if "timestamp" in row])},
+                                     baseline=baseline)
+    rest_call.flush_buffer(conn=conn, ready=ready)
 
 
 
@@ -41,7 +47,7 @@ class TestNullData(unittest.TestCase):
         assert self.skip_insert in [True, False]
 
         if not self.skip_insert:
-            insert_data(conn=self.operator, db_name=self.db_name)
+            insert_data(conn=self.operator, db_name=self.db_name, query=self.query)
 
     @contextmanager
     def query_context(self, query:str):
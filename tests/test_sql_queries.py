@@ -10,27 +10,77 @@ The following tests basic AnyLog functionality
 
 import os.path
 import unittest
+from concurrent.futures import ThreadPoolExecutor
 from source.rest_call import get_data
+from source.reference_engine import get_engine
+from source.table_format import format_table, parse_table, compare_tables, format_differences
 from source import support
 from contextlib import contextmanager
 
 
 ROOT_DIR = os.path.dirname(__file__).rsplit('tests', 1)[0]
+REFERENCE_TOLERANCE = 0.001  # min absolute tolerance against the reference engine - last digit of ::float(3) rounding
+INCREMENT_COLUMNS = ['min(timestamp)::ljust(19) as min_ts', 'max(timestamp)::ljust(19) as max_ts', 'min(value) as min_val',
+                     'avg(value)::float(3) as avg_val', 'max(value) as max_val']
+
+# query catalogue - {db_name}, {increment} and {period} are filled in by the tests (and benchmarks/query_benchmark.py)
+QUERIES = {
+    'row_count_complete': 'sql {db_name} format=json and stat=false and include=(rand_data, power_plant_pv) "SELECT COUNT(*) AS row_count FROM power_plant;"',
+    'row_count_per_table_complete': 'sql {db_name} format=json and stat=false and include=(rand_data, power_plant_pv) and extend=(@table_name) "SELECT COUNT(*) AS row_count FROM power_plant;"',
+    'aggregations': 'sql {db_name} format=json and stat=false "SELECT min(timestamp) as min_ts, max(timestamp) as max_ts,  MIN(value) as min_val, MAX(value) as max_val, AVG(value) as avg_val, COUNT(*) as row_count FROM rand_data"',
+    'aggregations_group_by': "sql {db_name} format=json and stat=false and include=(power_plant_pv) SELECT monitor_id, min(timestamp)::ljust(19) as min_ts, max(timestamp)::ljust(19) as max_ts, count(*) as row_count as row_count FROM power_plant GROUP BY monitor_id ORDER min_ts, monitor_id DESC",
+    'small_increments': "sql {db_name} format=table and stat=false SELECT increments({increment}, timestamp), min(timestamp)::ljust(19) as min_ts, max(timestamp)::ljust(19) as max_ts, min(value) as min_val, avg(value)::float(3) as avg_val, max(value) as max_val FROM rand_data WHERE timestamp >= '2024-12-20 00:00:00' AND timestamp <= '2025-01-10 23:59:59' ORDER BY min_ts DESC",
+    'increments': 'sql {db_name} format=table and stat=false "SELECT increments({increment}, timestamp), min(timestamp)::ljust(19) as min_ts, max(timestamp)::ljust(19) as max_ts, min(value) as min_val, avg(value)::float(3) as avg_val, max(value) as max_val FROM rand_data ORDER BY max_ts ASC;"',
+    'increments_group_by': "sql {db_name} format=table and stat=false and include=(power_plant_pv) SELECT increments(year, 1, timestamp), monitor_id, min(timestamp)::ljust(19) as min_ts, max(timestamp)::ljust(19) as max_ts, count(*) as row_count as row_count FROM power_plant GROUP BY monitor_id ORDER min_ts, monitor_id DESC",
+    'period': "sql {db_name} format=table and stat=false SELECT timestamp, pv FROM power_plant_pv WHERE period({period}, timestamp) ORDER BY timestamp DESC",
+    'period_and': "sql {db_name} format=table and stat=false SELECT timestamp, a_current, b_current, c_current FROM power_plant WHERE period({period}, timestamp) AND monitor_id='DF2' ORDER BY timestamp DESC",
+    'period_complex': "sql {db_name} format=table and stat=false SELECT monitor_id, min(timestamp) as timestamp, avg(a_current), avg(b_current) as b_current, avg(c_current) as c_current FROM power_plant WHERE period({period}, timestamp) AND (monitor_id='DF2' OR monitor_id='BSP') GROUP BY monitor_id ORDER BY timestamp, monitor_id  DESC",
+}
+SMALL_INCREMENTS = ['second, 1', 'second, 30', 'minute, 1', 'minute, 5', 'minute, 15', 'minute, 30', 'hour, 1', 'hour, 6',
+                    'hour, 12', 'hour, 24']
+INCREMENTS = ['day, 1', 'day, 7', 'day, 30', 'day, 90', 'day, 180', 'day, 365', 'year, 1']
+PERIODS = {
+    'period': ['minute, 1, "2023-03-12 13:42:58"', 'hour, 12, "2026-01-01 00:00:00"', 'day, 30, "2024-02-15 20:18:29"'],
+    # first 2 cases return empty set (expected)
+    'period_and': ['minute, 1, "2023-03-12 13:42:58"', 'hour, 36, "2026-01-01 00:00:00"', 'day, 30, "2024-02-15 20:18:29"'],
+    'period_complex': ['minute, 1, "2023-03-12 13:42:58"', 'hour, 36, "2026-01-01 00:00:00"', 'day, 30, "2024-02-15 20:18:29"'],
+}
+
+
+def query_catalogue(db_name:str)->list:
+    """
+    :return:
+        (name, query) for every query sent by TestSQLCommands
+    """
+    catalogue = []
+    for name, query in QUERIES.items():
+        if name == 'small_increments' or name == 'increments':
+            for increment in (SMALL_INCREMENTS if name == 'small_increments' else INCREMENTS):
+                catalogue.append((f"{name}[{increment}]", query.format(db_name=db_name, increment=increment)))
+        elif name in PERIODS:
+            for period in PERIODS[name]:
+                catalogue.append((f"{name}[{period.rsplit(',', 1)[0]}]", query.format(db_name=db_name, period=period)))
+        else:
+            catalogue.append((name, query.format(db_name=db_name)))
+    return catalogue
 
 class TestSQLCommands(unittest.TestCase):
     conn = None
     db_name = None
+    max_workers = 4  # concurrent queries per parameter sweep (increments / period)
+    write_actual = False  # write actual/*.out for every result (by default only results that differ are written)
+    tolerance = 0.0       # max absolute difference between numbers in table results (ex. 0.001 for ::float(3) rounding)
+    rel_tolerance = 0.0   # max relative difference between numbers in table results
+    ignore_order = False  # compare table results as a set of rows
 
     def setUp(self):
         assert self.conn
         assert self.db_name
 
-        self.query_base = f"sql {self.db_name} format=json and stat=false"
 
         self.expect_dir = os.path.join(ROOT_DIR, 'expect')
         support.create_dir(self.expect_dir)
         self.actual_dir = os.path.join(ROOT_DIR, 'actual')
-        support.create_dir(self.actual_dir)
 
     @contextmanager
     def query_context(self, query:str):
@@ -41,13 +91,79 @@ class TestSQLCommands(unittest.TestCase):
             print("\n❌ Assertion failed for query:\n", query)
             raise
 
+    def fetch_all(self, queries:list)->list:
+        """
+        Send a set of queries through a bounded pool
+        :return:
+            futures in the same order as queries - call .result() inside the subTest so a failed request is reported
+            against its own increment / period
+        """
+        with ThreadPoolExecutor(max_workers=max(1, min(self.max_workers, len(queries)))) as executor:
+            return [executor.submit(get_data, self.conn, query, stream=True) for query in queries]
+
+    def assert_expect(self, results, fname:str, reference):
+        """
+        Compare a (streamed) result against expect/[fname] and against the reference engine's table for the same query
+        (computed from data/*.json on every run) - a missing expect file is generated from the reference engine
+
+        The result is compared chunk by chunk against the memory-mapped expect file, stopping at the first difference,
+        and written to actual/[fname] only when it differs (or with write_actual). A result that is not byte-identical
+        is parsed and compared row by row / column by column, so padding changes, numbers within tolerance /
+        rel_tolerance and (with ignore_order) row order differences still pass. The stored result (the expect file
+        when identical) is then checked against the reference engine, with numbers within
+        max(tolerance, REFERENCE_TOLERANCE), so expect files that no longer match the data are reported
+        :args:
+            results - response returned by get_data(..., stream=True)
+            fname:str - expect / actual file name
+            reference - callable returning (columns, rows) for the query, see source.reference_engine
+        """
+        expect_file = os.path.join(self.expect_dir, fname)
+        actual_file = os.path.join(self.actual_dir, fname)
+        expected = None
+        try:
+            if not os.path.isfile(expect_file):
+                expected = format_table(*reference())
+                support.write_file(expect_file, expected)
+            mismatch = support.compare_stream(results.iter_content(support.STREAM_CHUNK), expect_file,
+                                              actual_file=actual_file, write_actual=self.write_actual)
+        finally:
+            results.close()
+
+        failures = []
+        result_file = expect_file
+        if mismatch:
+            result_file = actual_file
+            message = support.format_mismatch(mismatch, expect_file=expect_file, actual_file=actual_file)
+            try:
+                differences = compare_tables(parse_table(support.read_file(expect_file)), parse_table(support.read_file(actual_file)),
+                                             tolerance=self.tolerance, rel_tolerance=self.rel_tolerance, ignore_order=self.ignore_order)
+            except ValueError:  # not a table (ex. an error reply) - keep the byte level report
+                self.fail(message)
+            if differences:
+                failures.append(f"{message}\n{format_differences(differences)}")
+
+        try:
+            differences = compare_tables(parse_table(expected or format_table(*reference())), parse_table(support.read_file(result_file)),
+                                         tolerance=max(self.tolerance, REFERENCE_TOLERANCE), rel_tolerance=self.rel_tolerance,
+                                         ignore_order=self.ignore_order)
+        except ValueError as error:
+            differences = None
+            failures.append(f"{result_file} is not a table ({error})")
+        if differences:
+            failures.append(f"result differs from the reference engine (data/*.json) - see {result_file}\n{format_differences(differences)}")
+
+        if failures:
+            self.fail('\n'.join(failures))
+        if mismatch and not self.write_actual:
+            os.remove(actual_file)
+
     """
     Get rows count for tables in network
     """
     def test_row_count_complete(self):
         expected_count = 1500 + 1500 + 100
 
-        query = f'{self.query_base} and include=(rand_data, power_plant_pv) "SELECT COUNT(*) AS row_count FROM power_plant;"'
+        query = QUERIES['row_count_complete'].format(db_name=self.db_name)
 
         results = get_data(self.conn, query)
         data = results.json()
@@ -68,7 +184,7 @@ class TestSQLCommands(unittest.TestCase):
             'power_plant': 1500
         }
 
-        query = f'{self.query_base} and include=(rand_data, power_plant_pv) and extend=(@table_name) "SELECT COUNT(*) AS row_count FROM power_plant;"'
+        query = QUERIES['row_count_per_table_complete'].format(db_name=self.db_name)
 
         results = get_data(self.conn, query)
         data = results.json()
@@ -82,17 +198,12 @@ class TestSQLCommands(unittest.TestCase):
                 self.assertEqual(row_count, expected_count[table])
 
     def test_aggregations(self):
-        self.skipTest("avg differs with partitioning")
-        expected = {
-            'min_ts': '2023-01-01 00:00:00.000000',
-            'max_ts': '2025-12-31 23:59:59.000000',
-            'min_val': 0.053,
-            'max_val': 974.959,
-            'avg_val': 248.76575133333333,
-            'row_count': 1500
-        }
+        columns, rows = get_engine().query(table='rand_data', columns=['min(timestamp) as min_ts', 'max(timestamp) as max_ts',
+                                                                        'min(value) as min_val', 'max(value) as max_val',
+                                                                        'avg(value) as avg_val', 'count(*) as row_count'])
+        expected = dict(zip(columns, rows[0]))
 
-        query = f'{self.query_base} "SELECT min(timestamp) as min_ts, max(timestamp) as max_ts,  MIN(value) as min_val, MAX(value) as max_val, AVG(value) as avg_val, COUNT(*) as row_count FROM rand_data"'
+        query = QUERIES['aggregations'].format(db_name=self.db_name)
         results = get_data(self.conn, query)
         data = results.json()
 
@@ -100,44 +211,18 @@ class TestSQLCommands(unittest.TestCase):
             self.assertIn("Query", data)
             for row in data.get('Query'):
                 for key in expected:
-                    self.assertEqual(row.get(key), expected.get(key))
+                    if key == 'avg_val':  # summation order differs with partitioning
+                        self.assertAlmostEqual(row.get(key), expected.get(key), places=6)
+                    else:
+                        self.assertEqual(row.get(key), expected.get(key))
 
     def test_aggregations_group_by(self):
-        expected = [
-            {'monitor_id': 'BCT', 'min_ts': '2023-01-31T14:34:48', 'max_ts': '2025-12-06T18:38:24', 'row_count': 50},
-            {'monitor_id': 'BF1', 'min_ts': '2023-02-07T21:28:48', 'max_ts': '2025-11-25T14:27:36', 'row_count': 50},
-            {'monitor_id': 'BF2', 'min_ts': '2023-01-14T08:39:00', 'max_ts': '2025-12-29T20:29:24', 'row_count': 50},
-            {'monitor_id': 'BF3', 'min_ts': '2023-01-05T03:06:36', 'max_ts': '2025-12-12T20:23:24', 'row_count': 50},
-            {'monitor_id': 'BF4', 'min_ts': '2023-01-31T08:45:00', 'max_ts': '2025-12-24T23:53:24', 'row_count': 50},
-            {'monitor_id': 'BG10', 'min_ts': '2023-01-01T23:19:12', 'max_ts': '2025-12-25T05:43:12', 'row_count': 50},
-            {'monitor_id': 'BG11', 'min_ts': '2023-01-28T10:47:24', 'max_ts': '2025-12-22T07:45:36', 'row_count': 50},
-            {'monitor_id': 'BG8', 'min_ts': '2023-02-02T13:13:12', 'max_ts': '2025-11-16T20:34:48', 'row_count': 50},
-            {'monitor_id': 'BG9', 'min_ts': '2023-02-07T21:28:48', 'max_ts': '2025-12-23T07:04:48', 'row_count': 50},
-            {'monitor_id': 'BSP', 'min_ts': '2023-01-17T06:36:36', 'max_ts': '2025-12-18T04:39:00', 'row_count': 52},
-            {'monitor_id': 'CBT', 'min_ts': '2023-02-04T17:41:24', 'max_ts': '2025-12-04T20:00:00', 'row_count': 50},
-            {'monitor_id': 'CDT', 'min_ts': '2023-01-16T07:17:24', 'max_ts': '2025-12-17T16:59:24', 'row_count': 50},
-            {'monitor_id': 'CF1', 'min_ts': '2023-01-05T08:56:24', 'max_ts': '2025-12-07T23:47:24', 'row_count': 50},
-            {'monitor_id': 'CF2', 'min_ts': '2023-01-07T07:34:48', 'max_ts': '2025-12-15T12:31:12', 'row_count': 50},
-            {'monitor_id': 'CF3', 'min_ts': '2023-02-04T00:12:00', 'max_ts': '2025-12-24T00:34:12', 'row_count': 50},
-            {'monitor_id': 'CG12', 'min_ts': '2023-01-01T17:29:24', 'max_ts': '2025-12-07T23:47:24', 'row_count': 50},
-            {'monitor_id': 'CG7', 'min_ts': '2023-02-01T19:43:48', 'max_ts': '2025-12-06T12:48:36', 'row_count': 50},
-            {'monitor_id': 'CSP', 'min_ts': '2023-02-13T23:13:48', 'max_ts': '2025-12-23T12:54:36', 'row_count': 50},
-            {'monitor_id': 'DCT', 'min_ts': '2023-01-27T17:18:00', 'max_ts': '2025-11-26T13:46:48', 'row_count': 50},
-            {'monitor_id': 'DF1', 'min_ts': '2023-01-06T02:25:48', 'max_ts': '2025-12-28T15:20:24', 'row_count': 50},
-            {'monitor_id': 'DF2', 'min_ts': '2023-01-27T05:38:24', 'max_ts': '2025-12-27T21:51:00', 'row_count': 50},
-            {'monitor_id': 'DF3', 'min_ts': '2023-02-02T13:13:12', 'max_ts': '2025-12-11T03:34:48', 'row_count': 50},
-            {'monitor_id': 'DF4', 'min_ts': '2023-02-08T14:58:12', 'max_ts': '2025-11-08T14:21:36', 'row_count': 50},
-            {'monitor_id': 'DG2', 'min_ts': '2023-03-14T21:00:00', 'max_ts': '2025-11-30T16:53:24', 'row_count': 50},
-            {'monitor_id': 'DG3', 'min_ts': '2023-01-16T18:57:00', 'max_ts': '2025-12-31T23:59:59', 'row_count': 50},
-            {'monitor_id': 'DG4', 'min_ts': '2023-01-20T04:34:12', 'max_ts': '2025-12-17T16:59:24', 'row_count': 49},
-            {'monitor_id': 'DG5', 'min_ts': '2023-01-01T00:00:00', 'max_ts': '2025-12-24T18:03:36', 'row_count': 50},
-            {'monitor_id': 'DG6', 'min_ts': '2023-02-08T09:08:24', 'max_ts': '2025-12-05T19:19:12', 'row_count': 49},
-            {'monitor_id': 'DSP', 'min_ts': '2023-01-03T10:18:00', 'max_ts': '2025-12-30T02:19:12', 'row_count': 50},
-            {'monitor_id': 'InconLoadTapChangerAI', 'min_ts': '2023-01-01T00:00:00', 'max_ts': '2023-12-28T05:12:36', 'row_count': 100},
-            {'monitor_id': 'KPL', 'min_ts': '2023-01-12T04:10:48', 'max_ts': '2025-12-05T07:39:36', 'row_count': 50},
-        ]
-
-        query = f"{self.query_base} and include=(power_plant_pv) SELECT monitor_id, min(timestamp)::ljust(19) as min_ts, max(timestamp)::ljust(19) as max_ts, count(*) as row_count as row_count FROM power_plant GROUP BY monitor_id ORDER min_ts, monitor_id DESC"
+        columns, rows = get_engine().query(table='power_plant', include=['power_plant_pv'], group_by=['monitor_id'],
+                                           columns=['monitor_id', 'min(timestamp)::ljust(19) as min_ts',
+                                                    'max(timestamp)::ljust(19) as max_ts', 'count(*) as row_count'])
+        expected = [dict(zip(columns, row)) for row in rows]
+
+        query = QUERIES['aggregations_group_by'].format(db_name=self.db_name)
         results = get_data(self.conn, query)
         data = results.json()
 
@@ -153,119 +238,82 @@ class TestSQLCommands(unittest.TestCase):
     increment testing
     """
     def test_small_increments(self):
-        query = f"sql {self.db_name} format=table and stat=false SELECT increments(%s, timestamp), min(timestamp)::ljust(19) as min_ts, max(timestamp)::ljust(19) as max_ts, min(value) as min_val, avg(value)::float(3) as avg_val, max(value) as max_val FROM rand_data WHERE timestamp >= '2024-12-20 00:00:00' AND timestamp <= '2025-01-10 23:59:59' ORDER BY min_ts DESC"
-        for increment in ['second, 1', 'second, 30', 'minute, 1', 'minute, 5', 'minute, 15', 'minute, 30',
-                          'hour, 1', 'hour, 6', 'hour, 12', 'hour, 24']:
-
-            fname = f"small_increments_{increment.strip().replace(' ', '').replace(',', '_')}.out"
-            results_file = os.path.join(self.actual_dir, fname)
-            expect_file = os.path.join(self.expect_dir, fname)
-
-            results = get_data(self.conn, query % increment)
-            data = results.text
-
-            support.write_file(results_file, data)
-            support.copy_file(results_file, expect_file)
-            actual_content = support.read_file(results_file)
-            expect_content = support.read_file(expect_file)
-
-            with self.query_context(query):
-                self.assertEqual(actual_content, expect_content)
+        queries = [QUERIES['small_increments'].format(db_name=self.db_name, increment=increment) for increment in SMALL_INCREMENTS]
+        futures = self.fetch_all(queries)
+        for increment, query, future in zip(SMALL_INCREMENTS, queries, futures):
+            with self.subTest(increment=increment):
+                fname = f"small_increments_{increment.strip().replace(' ', '').replace(',', '_')}.out"
+                results = future.result()
+                unit, units = increment.split(',')
+                reference = lambda: get_engine().query(table='rand_data', columns=INCREMENT_COLUMNS, increments=(unit.strip(), int(units), 'timestamp'),
+                                                       between=('timestamp', '2024-12-20 00:00:00', '2025-01-10 23:59:59'), order_by=[('min_ts', True)])
+                with self.query_context(query):
+                    self.assert_expect(results, fname, reference)
 
     def test_increments(self):
-        query = f'sql {self.db_name} format=table and stat=false "SELECT increments(%s, timestamp), min(timestamp)::ljust(19) as min_ts, max(timestamp)::ljust(19) as max_ts, min(value) as min_val, avg(value)::float(3) as avg_val, max(value) as max_val FROM rand_data ORDER BY max_ts ASC;"'
-        for increment in ['day, 1', 'day, 7', 'day, 30', 'day, 90', 'day, 180', 'day, 365', 'year, 1']:
-
-            fname = f"increments_{increment.strip().replace(' ', '').replace(',', '_')}.out"
-            results_file = os.path.join(self.actual_dir, fname)
-            expect_file = os.path.join(self.expect_dir, fname)
-
-            results = get_data(self.conn, query % increment)
-            data = results.text
-
-            support.write_file(results_file, data)
-            support.copy_file(results_file, expect_file)
-            actual_content = support.read_file(results_file)
-            expect_content = support.read_file(expect_file)
-
-            self.assertEqual(actual_content, expect_content)
+        queries = [QUERIES['increments'].format(db_name=self.db_name, increment=increment) for increment in INCREMENTS]
+        futures = self.fetch_all(queries)
+        for increment, query, future in zip(INCREMENTS, queries, futures):
+            with self.subTest(increment=increment):
+                fname = f"increments_{increment.strip().replace(' ', '').replace(',', '_')}.out"
+                results = future.result()
+                unit, units = increment.split(',')
+                reference = lambda: get_engine().query(table='rand_data', columns=INCREMENT_COLUMNS, increments=(unit.strip(), int(units), 'timestamp'),
+                                                       order_by=[('max_ts', False)])
+                self.assert_expect(results, fname, reference)
 
     def test_increments_group_by(self):
-        query = f"sql {self.db_name} format=table and stat=false and include=(power_plant_pv) SELECT increments(year, 1, timestamp), monitor_id, min(timestamp)::ljust(19) as min_ts, max(timestamp)::ljust(19) as max_ts, count(*) as row_count as row_count FROM power_plant GROUP BY monitor_id ORDER min_ts, monitor_id DESC"
+        query = QUERIES['increments_group_by'].format(db_name=self.db_name)
         fname = "increments_group_by_year_1.out"
 
-        results_file = os.path.join(self.actual_dir, fname)
-        expect_file = os.path.join(self.expect_dir, fname)
-
-        results = get_data(self.conn, query)
-        data = results.text
-
-        support.write_file(results_file, data)
-        support.copy_file(results_file, expect_file)
-        actual_content = support.read_file(results_file)
-        expect_content = support.read_file(expect_file)
-
-        self.assertEqual(actual_content, expect_content)
+        results = get_data(self.conn, query, stream=True)
+        reference = lambda: get_engine().query(table='power_plant', include=['power_plant_pv'], increments=('year', 1, 'timestamp'), group_by=['monitor_id'],
+                                               columns=['monitor_id', 'min(timestamp)::ljust(19) as min_ts', 'max(timestamp)::ljust(19) as max_ts', 'count(*) as row_count'])
+        self.assert_expect(results, fname, reference)
 
     def test_period(self):
-        for period in ['minute, 1, "2023-03-12 13:42:58"', 'hour, 12, "2026-01-01 00:00:00"', 'day, 30, "2024-02-15 20:18:29"']:
-            query = f"sql {self.db_name} format=table and stat=false SELECT timestamp, pv FROM power_plant_pv WHERE period({period}, timestamp) ORDER BY timestamp DESC"
-            fname = f"period_{period.strip().rsplit(',',1)[0].replace(' ', '').replace(',', '_')}.out"
-
-            results_file = os.path.join(self.actual_dir, fname)
-            expect_file = os.path.join(self.expect_dir, fname)
-
-            results = get_data(self.conn, query)
-            data = results.text
-
-            support.write_file(results_file, data)
-            support.copy_file(results_file, expect_file)
-            actual_content = support.read_file(results_file)
-            expect_content = support.read_file(expect_file)
-
-            with self.query_context(query):
-                self.assertEqual(actual_content, expect_content)
+        queries = [QUERIES['period'].format(db_name=self.db_name, period=period) for period in PERIODS['period']]
+        futures = self.fetch_all(queries)
+        for period, query, future in zip(PERIODS['period'], queries, futures):
+            with self.subTest(period=period):
+                fname = f"period_{period.strip().rsplit(',',1)[0].replace(' ', '').replace(',', '_')}.out"
+
+                results = future.result()
+                unit, units, date = [value.strip().strip('"') for value in period.split(',')]
+                reference = lambda: get_engine().query(table='power_plant_pv', columns=['timestamp', 'pv'], period=(unit, int(units), date, 'timestamp'),
+                                                       order_by=[('timestamp', True)])
+                with self.query_context(query):
+                    self.assert_expect(results, fname, reference)
 
     def test_period_and(self):
-        # first 2 cases return empty set (expected) 
-        for period in ['minute, 1, "2023-03-12 13:42:58"', 'hour, 36, "2026-01-01 00:00:00"', 'day, 30, "2024-02-15 20:18:29"']:
-            query = f"sql {self.db_name} format=table and stat=false SELECT timestamp, a_current, b_current, c_current FROM power_plant WHERE period({period}, timestamp) AND monitor_id='DF2' ORDER BY timestamp DESC"
-            fname = f"period_and_condition_{period.strip().rsplit(',',1)[0].replace(' ', '').replace(',', '_')}.out"
-
-            results_file = os.path.join(self.actual_dir, fname)
-            expect_file = os.path.join(self.expect_dir, fname)
-
-            results = get_data(self.conn, query)
-            data = results.text
-
-            support.write_file(results_file, data)
-            support.copy_file(results_file, expect_file)
-            actual_content = support.read_file(results_file)
-            expect_content = support.read_file(expect_file)
-
-            with self.query_context(query):
-                self.assertEqual(actual_content, expect_content)
+        queries = [QUERIES['period_and'].format(db_name=self.db_name, period=period) for period in PERIODS['period_and']]
+        futures = self.fetch_all(queries)
+        for period, query, future in zip(PERIODS['period_and'], queries, futures):
+            with self.subTest(period=period):
+                fname = f"period_and_condition_{period.strip().rsplit(',',1)[0].replace(' ', '').replace(',', '_')}.out"
+
+                results = future.result()
+                unit, units, date = [value.strip().strip('"') for value in period.split(',')]
+                reference = lambda: get_engine().query(table='power_plant', columns=['timestamp', 'a_current', 'b_current', 'c_current'],
+                                                       where={'monitor_id': 'DF2'}, period=(unit, int(units), date, 'timestamp'),
+                                                       order_by=[('timestamp', True)])
+                with self.query_context(query):
+                    self.assert_expect(results, fname, reference)
             
     def test_period_complex(self):
-        # first 2 cases return empty set (expected) 
-        for period in ['minute, 1, "2023-03-12 13:42:58"', 'hour, 36, "2026-01-01 00:00:00"', 'day, 30, "2024-02-15 20:18:29"']:
-            query = f"sql {self.db_name} format=table and stat=false SELECT monitor_id, min(timestamp) as timestamp, avg(a_current), avg(b_current) as b_current, avg(c_current) as c_current FROM power_plant WHERE period({period}, timestamp) AND (monitor_id='DF2' OR monitor_id='BSP') GROUP BY monitor_id ORDER BY timestamp, monitor_id  DESC"
-            fname = f"period_complex_{period.strip().rsplit(',',1)[0].replace(' ', '').replace(',', '_')}.out"
-
-            results_file = os.path.join(self.actual_dir, fname)
-            expect_file = os.path.join(self.expect_dir, fname)
-
-
-            results = get_data(self.conn, query)
-            data = results.text
-
-            support.write_file(results_file, data)
-            support.copy_file(results_file, expect_file)
-            actual_content = support.read_file(results_file)
-            expect_content = support.read_file(expect_file)
-
-            with self.query_context(query):
-                self.assertEqual(actual_content, expect_content)
+        queries = [QUERIES['period_complex'].format(db_name=self.db_name, period=period) for period in PERIODS['period_complex']]
+        futures = self.fetch_all(queries)
+        for period, query, future in zip(PERIODS['period_complex'], queries, futures):
+            with self.subTest(period=period):
+                fname = f"period_complex_{period.strip().rsplit(',',1)[0].replace(' ', '').replace(',', '_')}.out"
+
+                results = future.result()
+                unit, units, date = [value.strip().strip('"') for value in period.split(',')]
+                reference = lambda: get_engine().query(table='power_plant', where={'monitor_id': ['DF2', 'BSP']}, group_by=['monitor_id'],
+                                                       columns=['monitor_id', 'min(timestamp) as timestamp', 'avg(a_current)', 'avg(b_current) as b_current', 'avg(c_current) as c_current'],
+                                                       period=(unit, int(units), date, 'timestamp'), order_by=[('timestamp', True), ('monitor_id', True)])
+                with self.query_context(query):
+                    self.assert_expect(results, fname, reference)
 
 
 
@@ -0,0 +1,56 @@
+"""
+Runs the sql tests (TestSQLCommands) against source.standin_server - inserts data/*.json into a local stand-in and
+expects every query to match the expect files and the reference engine, so differences between the stand-in and
+AnyLog (ordering, rounding, casts) are caught without a network.
+
+:sample:
+    python3 -m unittest tests.test_standin -v
+"""
+import io
+import unittest
+
+from source.insert_data import insert_data
+from source.rest_call import flush_buffer, rows_ready
+from source.standin_server import start_server
+from tests import test_sql_queries
+
+DB_NAME = 'test'
+
+
+class TestStandin(unittest.TestCase):
+    server = None
+
+    @classmethod
+    def setUpClass(cls):
+        cls.server = start_server()
+        stats = insert_data([cls.server.conn], DB_NAME, batch_size=100)
+        ready = rows_ready(conn=cls.server.conn, db_name=DB_NAME, expected={table: table_stats['rows'] for table, table_stats in stats.items()})
+        assert flush_buffer(conn=cls.server.conn, ready=ready), "inserted data not visible on the stand-in"
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+
+    """
+    Every sql test passes against the stand-in with the default (strict) comparison
+    """
+    def test_sql_queries(self):
+        settings = {name: getattr(test_sql_queries.TestSQLCommands, name) for name in ['conn', 'db_name', 'tolerance', 'rel_tolerance', 'ignore_order', 'write_actual']}
+        try:
+            test_sql_queries.TestSQLCommands.conn = self.server.conn
+            test_sql_queries.TestSQLCommands.db_name = DB_NAME
+            test_sql_queries.TestSQLCommands.tolerance = 0.0
+            test_sql_queries.TestSQLCommands.rel_tolerance = 0.0
+            test_sql_queries.TestSQLCommands.ignore_order = False
+            test_sql_queries.TestSQLCommands.write_actual = False
+            output = io.StringIO()
+            result = unittest.TextTestRunner(stream=output, verbosity=1).run(unittest.TestLoader().loadTestsFromTestCase(test_sql_queries.TestSQLCommands))
+        finally:
+            for name, value in settings.items():
+                setattr(test_sql_queries.TestSQLCommands, name, value)
+        self.assertTrue(result.wasSuccessful(), output.getvalue())
+        self.assertGreater(result.testsRun, 0)
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)